@@ -16,11 +16,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-# import time
 # import json
+import time
+import random
 from plural import Plural
 from plural import Edge
-# from plural import codec
+from plural import codec
+from plural.exceptions import CodecNotAvailable
 
 # from datetime import datetime
 
@@ -31,6 +33,7 @@ class Tag(Edge):
 
 def run_benchmark(item_count, commit_every_create=False):
     store = Plural('benchmark-{}'.format(item_count))
+    started = time.time()
 
     for x in range(item_count):
         name = bytes(x)
@@ -39,6 +42,59 @@ def run_benchmark(item_count, commit_every_create=False):
             store.commit()
 
     store.commit()
+    print('create {} items: {:.2f}s'.format(item_count, time.time() - started))
+
+
+def run_bulk_load_benchmark(item_count):
+    store = Plural('benchmark-bulk-{}'.format(item_count))
+    started = time.time()
+
+    store.bulk_load(Tag, ({'name': bytes(x)} for x in range(item_count)))
+    print('bulk_load {} items: {:.2f}s'.format(item_count, time.time() - started))
+
+
+def run_set_membership_benchmark(item_count, lookups=100000):
+    tags = [Tag(name=bytes(x)) for x in range(item_count)]
+    started = time.time()
+    tag_set = set(tags)
+    print('set of {} items: {:.2f}s'.format(item_count, time.time() - started))
+
+    started = time.time()
+    for x in range(lookups):
+        tags[x % item_count] in tag_set
+
+    elapsed = time.time() - started
+    print('{} set lookups: {:.2f}s ({:.0f} lookups/s)'.format(lookups, elapsed, lookups / elapsed))
+
+
+def run_compression_benchmark(value_size, rounds=200):
+    words = [bytes(x) for x in range(1000)] + ['lorem', 'ipsum', 'dolor', 'sit', 'amet']
+    value = ' '.join(random.choice(words) for _ in range(value_size // 4))[:value_size]
+    for name in ('Gzip', 'Bzip2', 'Zstd', 'LZ4'):
+        for level in (1, None, 9):
+            try:
+                compressed = getattr(codec, name)(level=level)
+            except CodecNotAvailable:
+                print('{}: not available'.format(name))
+                break
+
+            started = time.time()
+            for _ in range(rounds):
+                encoded = compressed.encode(value)
+            encode_elapsed = time.time() - started
+
+            started = time.time()
+            for _ in range(rounds):
+                compressed.decode(encoded)
+            decode_elapsed = time.time() - started
+
+            megabytes = float(len(value) * rounds) / (1024 * 1024)
+            print('{} level={}: ratio {:.2f}, encode {:.1f}MB/s, decode {:.1f}MB/s'.format(
+                name, level, float(len(encoded)) / len(value),
+                megabytes / encode_elapsed, megabytes / decode_elapsed))
 
 
 run_benchmark(10000, commit_every_create=False)
+run_bulk_load_benchmark(10000)
+run_set_membership_benchmark(10000)
+run_compression_benchmark(64 * 1024)
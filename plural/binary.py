@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import struct
+import zlib
+from datetime import date
+from datetime import datetime
+from datetime import time
+from decimal import Decimal
+
+from dateutil.parser import parse as parse_datetime
+
+from plural.codec import parse_isoformat
+from plural.serializer import Serializer
+from plural.serializer import JSONSerializer
+from plural.exceptions import ObjectSchemaNotFound
+
+
+MARKER = b'\xc1'
+VERSION = 1
+
+TAG_MISSING = 0
+TAG_NONE = 1
+TAG_FALSE = 2
+TAG_TRUE = 3
+TAG_INT = 4
+TAG_LONG = 5
+TAG_FLOAT = 6
+TAG_BYTES = 7
+TAG_UNICODE = 8
+TAG_DATETIME = 9
+TAG_DATETIME_TZ = 10
+TAG_DATE = 11
+TAG_TIME = 12
+TAG_DECIMAL = 13
+TAG_JSON = 14
+
+INT64 = struct.Struct('>q')
+FLOAT64 = struct.Struct('>d')
+UINT32 = struct.Struct('>I')
+DATETIME = struct.Struct('>HBBBBBI')
+DATE = struct.Struct('>HBB')
+TIME = struct.Struct('>BBBI')
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+JSON_SERIALIZER = JSONSerializer()
+
+
+def schema_fingerprint(layout):
+    """
+    :param layout: a sequence of field names
+    :returns: ``int`` - the 32 bits checksum of the field names
+    """
+    return zlib.crc32('\n'.join(layout)) & 0xffffffff
+
+
+def encode_length(length):
+    if length < 0xff:
+        return chr(length)
+
+    return b'\xff' + UINT32.pack(length)
+
+
+def decode_length(blob, position):
+    length = ord(blob[position])
+    if length < 0xff:
+        return length, position + 1
+
+    return UINT32.unpack_from(blob, position + 1)[0], position + 5
+
+
+def is_native(value):
+    """
+    :param value: the decoded value of a field
+    :returns: ``True`` for the values :py:func:`encode_value` keeps in
+      their own type, dates, times and numbers, rather than as strings
+    """
+    if isinstance(value, time):
+        return value.tzinfo is None
+
+    return isinstance(value, (bool, int, long, float, Decimal, date))
+
+
+def encode_value(value):
+    """encodes a value as a type tag followed by its bytes
+
+    :param value: the value of a field
+    :returns: ``bytes``
+    """
+    if value is None:
+        return chr(TAG_NONE)
+
+    if value is True:
+        return chr(TAG_TRUE)
+
+    if value is False:
+        return chr(TAG_FALSE)
+
+    if isinstance(value, (int, long)):
+        if INT64_MIN <= value <= INT64_MAX:
+            return chr(TAG_INT) + INT64.pack(value)
+
+        string = bytes(value)
+        return chr(TAG_LONG) + encode_length(len(string)) + string
+
+    if isinstance(value, float):
+        return chr(TAG_FLOAT) + FLOAT64.pack(value)
+
+    if isinstance(value, unicode):
+        string = value.encode('utf-8')
+        return chr(TAG_UNICODE) + encode_length(len(string)) + string
+
+    if isinstance(value, bytes):
+        return chr(TAG_BYTES) + encode_length(len(value)) + value
+
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            string = value.isoformat()
+            return chr(TAG_DATETIME_TZ) + encode_length(len(string)) + string
+
+        return chr(TAG_DATETIME) + DATETIME.pack(
+            value.year, value.month, value.day,
+            value.hour, value.minute, value.second, value.microsecond,
+        )
+
+    if isinstance(value, date):
+        return chr(TAG_DATE) + DATE.pack(value.year, value.month, value.day)
+
+    if isinstance(value, time) and value.tzinfo is None:
+        return chr(TAG_TIME) + TIME.pack(value.hour, value.minute, value.second, value.microsecond)
+
+    if isinstance(value, Decimal):
+        string = bytes(value)
+        return chr(TAG_DECIMAL) + encode_length(len(string)) + string
+
+    string = JSON_SERIALIZER.dumps(value)
+    return chr(TAG_JSON) + encode_length(len(string)) + string
+
+
+def decode_string(blob, position):
+    length, position = decode_length(blob, position)
+    end = position + length
+    return blob[position:end], end
+
+
+def decode_int(blob, position):
+    return INT64.unpack_from(blob, position)[0], position + 8
+
+
+def decode_long(blob, position):
+    string, position = decode_string(blob, position)
+    return long(string), position
+
+
+def decode_float(blob, position):
+    return FLOAT64.unpack_from(blob, position)[0], position + 8
+
+
+def decode_unicode(blob, position):
+    string, position = decode_string(blob, position)
+    return string.decode('utf-8'), position
+
+
+def decode_datetime(blob, position):
+    return datetime(*DATETIME.unpack_from(blob, position)), position + DATETIME.size
+
+
+def decode_datetime_tz(blob, position):
+    string, position = decode_string(blob, position)
+    return parse_isoformat(string) or parse_datetime(string), position
+
+
+def decode_date(blob, position):
+    return date(*DATE.unpack_from(blob, position)), position + DATE.size
+
+
+def decode_time(blob, position):
+    return time(*TIME.unpack_from(blob, position)), position + TIME.size
+
+
+def decode_decimal(blob, position):
+    string, position = decode_string(blob, position)
+    return Decimal(string), position
+
+
+def decode_json(blob, position):
+    string, position = decode_string(blob, position)
+    return JSON_SERIALIZER.loads(string), position
+
+
+DECODERS = {
+    TAG_NONE: lambda blob, position: (None, position),
+    TAG_FALSE: lambda blob, position: (False, position),
+    TAG_TRUE: lambda blob, position: (True, position),
+    TAG_INT: decode_int,
+    TAG_LONG: decode_long,
+    TAG_FLOAT: decode_float,
+    TAG_BYTES: decode_string,
+    TAG_UNICODE: decode_unicode,
+    TAG_DATETIME: decode_datetime,
+    TAG_DATETIME_TZ: decode_datetime_tz,
+    TAG_DATE: decode_date,
+    TAG_TIME: decode_time,
+    TAG_DECIMAL: decode_decimal,
+    TAG_JSON: decode_json,
+}
+
+
+def decode_value(blob, position):
+    """
+    :param blob: ``bytes``
+    :param position: ``int`` - the offset of the type tag
+    :returns: a tuple ``(value, next_position)``
+    """
+    return DECODERS[ord(blob[position])](blob, position + 1)
+
+
+def is_binary(blob):
+    """
+    :param blob: ``bytes``
+    :returns: ``True`` if the blob was written by :py:class:`BinaryFormat`
+    """
+    return blob[:1] == MARKER
+
+
+class BinaryFormat(Serializer):
+    """schema-aware binary format of objects, selected per edge
+    class with ``object_format = 'binary'``.
+
+    Instead of repeating the field names in every blob, a blob has a
+    header with the name of its definition and the fingerprint of its
+    ``__layout__``, followed by the type-tagged values of the fields
+    in the order of the layout, and then the fields outside of it. The
+    header starts with a marker byte that is never the first byte of a
+    JSON or msgpack document, any other blob is read by ``fallback``.
+
+    :param fallback: the :py:class:`~plural.serializer.Serializer` of
+      the objects without the binary format
+    :param load_schema: an optional callable that takes the definition
+      name and the fingerprint of a layout that is not registered and
+      returns the layout or ``None``
+    :param schemas: an optional ``dict`` of the registered layouts
+    """
+    name = 'binary'
+
+    def __init__(self, fallback=None, load_schema=None, schemas=None):
+        self.fallback = fallback or JSON_SERIALIZER
+        self.load_schema = load_schema
+        self.schemas = schemas or {}
+
+    def __reduce__(self):
+        return self.__class__, (self.fallback, None, self.schemas)
+
+    def register(self, name, layout):
+        """registers the layout of a definition
+
+        :param name: the definition name
+        :param layout: a tuple of field names
+        :returns: ``int`` - the fingerprint of the layout
+        """
+        fingerprint = schema_fingerprint(layout)
+        self.schemas[(name, fingerprint)] = tuple(layout)
+        return fingerprint
+
+    def get_schema(self, name, fingerprint):
+        """
+        :param name: the definition name
+        :param fingerprint: ``int`` - the fingerprint of the layout
+        :returns: the layout
+        :raises: :py:class:`~plural.exceptions.ObjectSchemaNotFound`
+        """
+        key = (name, fingerprint)
+        layout = self.schemas.get(key)
+        if layout is None and self.load_schema is not None:
+            layout = self.load_schema(name, fingerprint)
+            if layout is not None:
+                layout = self.schemas[key] = tuple(layout)
+
+        if layout is None:
+            raise ObjectSchemaNotFound('unknown schema {:08x} of {}'.format(fingerprint, name))
+
+        return layout
+
+    def dumps_layout(self, name, layout, data):
+        """serializes the data of an object with the given layout
+
+        :param name: the definition name
+        :param layout: a tuple of field names
+        :param data: a ``dict``
+        :returns: ``bytes``
+        """
+        fingerprint = self.register(name, layout)
+        parts = [MARKER, chr(VERSION), encode_length(len(name)), bytes(name), UINT32.pack(fingerprint)]
+
+        missing = chr(TAG_MISSING)
+        for key in layout:
+            parts.append(key in data and encode_value(data[key]) or missing)
+
+        extra = sorted(set(data).difference(layout))
+        parts.append(encode_length(len(extra)))
+        for key in extra:
+            encoded_key = isinstance(key, unicode) and key.encode('utf-8') or bytes(key)
+            parts.extend([encode_length(len(encoded_key)), encoded_key, encode_value(data[key])])
+
+        return b''.join(parts)
+
+    def dumps(self, data):
+        return self.fallback.dumps(data)
+
+    def loads(self, blob):
+        if not is_binary(blob):
+            return self.fallback.loads(blob)
+
+        name, position = decode_string(blob, 2)
+        fingerprint = UINT32.unpack_from(blob, position)[0]
+        layout = self.get_schema(name, fingerprint)
+        position += 4
+
+        data = {}
+        for key in layout:
+            tag = ord(blob[position])
+            if tag == TAG_MISSING:
+                position += 1
+                continue
+
+            data[key], position = DECODERS[tag](blob, position + 1)
+
+        count, position = decode_length(blob, position)
+        for _ in xrange(count):
+            key, position = decode_string(blob, position)
+            data[key.decode('utf-8')], position = decode_value(blob, position)
+
+        return data
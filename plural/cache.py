@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """bounded mapping that evicts its least recently used items, safe
+    to share between threads.
+
+    :param max_items: ``int`` - the maximum number of items
+    :param max_size: ``int`` - the maximum total size of the values,
+      as measured by ``sizeof``, ``None`` means unbounded.
+    :param sizeof: a callable that returns the size of a value
+    """
+
+    def __init__(self, max_items=1024, max_size=None, sizeof=len):
+        self.max_items = max_items
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        """retrieves a value, marking it as the most recently used
+
+        :param key: a hashable object
+        :returns: the cached value or ``default``
+        """
+        with self.lock:
+            try:
+                value = self.items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self.items[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None):
+        """caches a value, evicting the least recently used ones when
+        any of the limits is exceeded.
+
+        :param key: a hashable object
+        :param value: the value
+        :param size: ``int`` - the size of the value, measured with ``sizeof`` when not given
+        """
+        if self.max_size is not None and size is None:
+            size = self.sizeof(value)
+
+        with self.lock:
+            if self.items.pop(key, None) is not None and self.max_size is not None:
+                self.size -= self.sizes.pop(key)
+
+            self.items[key] = value
+            if self.max_size is not None:
+                self.sizes[key] = size
+                self.size += size
+
+            while self.items and (len(self.items) > self.max_items or (self.max_size is not None and self.size > self.max_size)):
+                key, evicted = self.items.popitem(last=False)
+                if self.max_size is not None:
+                    self.size -= self.sizes.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.size = 0
@@ -15,11 +15,100 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
 import bz2
 import json
 import zlib
+from base64 import b64decode
+from base64 import b64encode
+from calendar import timegm
+from datetime import datetime as DateTimeType
+from datetime import timedelta
 from decimal import Decimal
 from dateutil.parser import parse as parse_datetime
+from dateutil.tz import tzoffset
+from dateutil.tz import tzutc
+
+from plural.exceptions import CodecNotAvailable
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+
+HEADER_RAW = b'\x00'
+HEADER_ZLIB = b'\x01'
+HEADER_BZ2 = b'\x02'
+HEADER_ZSTD = b'\x03'
+HEADER_LZ4 = b'\x04'
+
+COMPRESSION_HEADERS = {
+    HEADER_ZLIB: 'zlib',
+    HEADER_BZ2: 'bzip2',
+    HEADER_ZSTD: 'zstandard',
+    HEADER_LZ4: 'lz4',
+}
+COMPRESSORS = {
+    HEADER_ZLIB: lambda data, level: zlib.compress(data, zlib.Z_DEFAULT_COMPRESSION if level is None else level),
+    HEADER_BZ2: lambda data, level: bz2.compress(data, 9 if level is None else level),
+}
+DECOMPRESSORS = {
+    HEADER_ZLIB: zlib.decompress,
+    HEADER_BZ2: bz2.decompress,
+}
+
+if zstandard is not None:
+    COMPRESSORS[HEADER_ZSTD] = lambda data, level: zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    DECOMPRESSORS[HEADER_ZSTD] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+
+if lz4 is not None:
+    COMPRESSORS[HEADER_LZ4] = lambda data, level: lz4.frame.compress(data, compression_level=level or 0)
+    DECOMPRESSORS[HEADER_LZ4] = lz4.frame.decompress
+
+ISO_DATETIME = re.compile(
+    r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?(Z|[+-]\d\d:?\d\d)?$'
+)
+EPOCH = DateTimeType(1970, 1, 1)
+UTC = tzutc()
+
+
+def parse_isoformat(string):
+    """parses the ISO-8601 layouts written by ``datetime.isoformat()``
+    without going through ``dateutil``.
+
+    :param string: ``string``
+    :returns: a ``datetime`` or ``None`` for any other layout
+    """
+    match = ISO_DATETIME.match(string)
+    if match is None:
+        return None
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    tzinfo = None
+    if offset == 'Z':
+        tzinfo = UTC
+    elif offset:
+        seconds = (int(offset[1:3]) * 60 + int(offset[-2:])) * 60
+        if offset[0] == '-':
+            seconds = -seconds
+
+        tzinfo = seconds and tzoffset(None, seconds) or UTC
+
+    try:
+        return DateTimeType(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            fraction and int(fraction.ljust(6, '0')) or 0,
+            tzinfo,
+        )
+    except ValueError:
+        return None
 
 
 class Codec(object):  # pragma: no cover
@@ -35,6 +124,24 @@ class Codec(object):  # pragma: no cover
 
         return self.loads(string)
 
+    def encode_many(self, values):
+        """encodes a column of values
+
+        :param values: a list of values
+        :returns: a list with the encoded values, in the same order
+        """
+        encode = self.encode
+        return [encode(value) for value in values]
+
+    def decode_many(self, strings):
+        """decodes a column of values
+
+        :param strings: a list of encoded values
+        :returns: a list with the decoded values, in the same order
+        """
+        decode = self.decode
+        return [decode(string) for string in strings]
+
     def loads(self, string):
         raise NotImplementedError
 
@@ -50,20 +157,97 @@ class Binary(Codec):
         return binary
 
 
-class Gzip(Codec):
-    def loads(self, binary):
-        return zlib.deompress(binary)
+def decompress_legacy(binary):
+    """decompresses the values written before the compression codecs
+    had a header byte, returning any other value as it is.
+
+    :param binary: ``bytes``
+    :returns: ``bytes``
+    """
+    try:
+        if binary.startswith(b'BZh'):
+            return bz2.decompress(binary)
+
+        if len(binary) > 1 and binary[0] == b'x' and (ord(binary[0]) << 8 | ord(binary[1])) % 31 == 0:
+            return zlib.decompress(binary)
+
+    except (IOError, zlib.error):
+        pass
+
+    return binary
+
+
+class Compressed(Codec):
+    """base of the compression codecs.
+
+    Encoded values start with a control character telling how the
+    rest was written: values shorter than ``threshold`` bytes, or that
+    would not get any smaller, are kept as they are, compressed values
+    are base64-encoded so they can be stored in JSON objects. Any of
+    the compression codecs decodes the values written by the others,
+    values without a header are taken as uncompressed.
+
+    Unicode values are compressed as UTF-8, values are always decoded
+    into ``bytes``.
+
+    :param level: ``int`` - the compression level, the default of the algorithm when ``None``
+    :param threshold: ``int`` - the minimum size, in bytes, of the values to compress
+    """
+    header = None
+
+    def __init__(self, level=None, threshold=256):
+        if self.header not in COMPRESSORS:
+            raise CodecNotAvailable('the {} codec is not available, make sure its module is installed'.format(self.__class__.__name__))
+
+        self.level = level
+        self.threshold = threshold
 
     def dumps(self, binary):
-        return zlib.compress(binary)
+        if isinstance(binary, unicode):
+            binary = binary.encode('utf-8')
 
+        if len(binary) >= self.threshold:
+            compressed = b64encode(COMPRESSORS[self.header](binary, self.level))
+            if len(compressed) < len(binary):
+                return self.header + compressed
+
+        return HEADER_RAW + binary
 
-class Bzip2(Codec):
     def loads(self, binary):
-        return bz2.deompress(binary)
+        header = binary[:1]
+        if not header:
+            return binary
 
-    def dumps(self, binary):
-        return bz2.compress(binary)
+        if header == HEADER_RAW:
+            return binary[1:]
+
+        if header in DECOMPRESSORS:
+            return DECOMPRESSORS[header](b64decode(binary[1:]))
+
+        if header in COMPRESSION_HEADERS:
+            raise CodecNotAvailable('cannot decode a value compressed with {}, make sure its module is installed'.format(COMPRESSION_HEADERS[header]))
+
+        return decompress_legacy(binary)
+
+
+class Gzip(Compressed):
+    """zlib compression, ``level`` from 1 (fastest) to 9 (smallest)"""
+    header = HEADER_ZLIB
+
+
+class Bzip2(Compressed):
+    """bzip2 compression, ``level`` from 1 to 9 (smallest)"""
+    header = HEADER_BZ2
+
+
+class Zstd(Compressed):
+    """zstandard compression, requires the ``zstandard`` package"""
+    header = HEADER_ZSTD
+
+
+class LZ4(Compressed):
+    """lz4 frame compression, requires the ``lz4`` package"""
+    header = HEADER_LZ4
 
 
 class Unicode(Codec):
@@ -78,12 +262,53 @@ class Unicode(Codec):
 
 
 class DateTime(Codec):
-    """codec for datetime objects"""
+    """codec for datetime objects.
+
+    Values are written in ISO-8601, or as zero-padded integer epoch
+    microseconds with ``epoch=True``, which are shorter and sort like
+    the timestamps themselves (for dates after 1970). Epoch values are
+    in UTC: timezone-aware datetimes are converted and decoded back as
+    naive UTC datetimes. Either way the ISO-8601 values are still read.
+
+    :param epoch: ``bool`` - write timestamps as epoch microseconds
+    """
+    epoch_digits = 17
+
+    def __init__(self, epoch=False):
+        self.epoch = epoch
+
     def dumps(self, datetime):
-        return datetime.isoformat()
+        if not self.epoch:
+            return datetime.isoformat()
+
+        if datetime.tzinfo is not None:
+            datetime = datetime.astimezone(UTC).replace(tzinfo=None)
+
+        microseconds = timegm(datetime.timetuple()) * 1000000 + datetime.microsecond
+        return bytes(microseconds).zfill(self.epoch_digits)
 
     def loads(self, string):
-        return parse_datetime(string)
+        if self.epoch and string.lstrip('-').isdigit():
+            return EPOCH + timedelta(microseconds=int(string))
+
+        return parse_isoformat(string) or parse_datetime(string)
+
+    def decode_many(self, strings):
+        # columns of timestamps are full of repeated values, parse each one once
+        parsed = {}
+        result = []
+        for string in strings:
+            if not isinstance(string, basestring):
+                result.append(string)
+                continue
+
+            value = parsed.get(string)
+            if value is None:
+                value = parsed[string] = self.loads(string)
+
+            result.append(value)
+
+        return result
 
 
 class Number(Codec):
@@ -103,3 +328,14 @@ class JSON(Codec):
 
     def loads(self, string):
         return json.loads(string)
+
+
+def get_codec(codec):
+    """
+    :param codec: a :py:class:`Codec` subclass or instance
+    :returns: a :py:class:`Codec` instance
+    """
+    if isinstance(codec, Codec):
+        return codec
+
+    return codec()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import functools
+import threading
+
+from plural.exceptions import CommitTimeout
+
+
+def synchronized(method):
+    """decorates a method so that it runs holding the ``lock`` of its instance"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kw):
+        with self.lock:
+            return method(self, *args, **kw)
+
+    return wrapper
+
+
+class CommitFuture(object):
+    """the eventual result of a commit requested through a
+    :py:class:`GroupCommitter`
+
+    :param query: an optional commit message to combine into the group commit
+    """
+
+    def __init__(self, query=None):
+        self.query = query
+        self.commit_id = None
+        self.error = None
+        self.event = threading.Event()
+
+    def done(self):
+        return self.event.is_set()
+
+    def set_result(self, commit_id):
+        self.commit_id = commit_id
+        self.event.set()
+
+    def set_exception(self, error):
+        self.error = error
+        self.event.set()
+
+    def result(self, timeout=None):
+        """waits for the group commit
+
+        :param timeout: ``float`` - seconds to wait, ``None`` waits forever
+        :returns: the id of the commit that includes the changes of the caller
+        """
+        if not self.event.wait(timeout):
+            raise CommitTimeout('the commit was not done within {} seconds'.format(timeout))
+
+        if self.error is not None:
+            raise self.error
+
+        return self.commit_id
+
+
+class GroupCommitter(object):
+    """batches the commits requested by many callers into a single one.
+
+    A background thread waits for the first request, then keeps
+    collecting requests for up to ``delay`` seconds or until there are
+    ``max_size`` of them, and makes one commit for all of them, holding
+    ``lock`` meanwhile.
+
+    :param commit: a callable that takes the combined commit message,
+      or ``None``, and returns the commit id
+    :param lock: the lock that serializes the writes of the store
+    :param delay: ``float`` - the maximum seconds to wait for more requests
+    :param max_size: ``int`` - the maximum number of requests per commit
+    """
+
+    def __init__(self, commit, lock, delay=0.01, max_size=64):
+        self.commit = commit
+        self.lock = lock
+        self.delay = delay
+        self.max_size = max_size
+        self.pending = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def submit(self, query=None):
+        """requests a commit
+
+        :param query: an optional commit message
+        :returns: a :py:class:`CommitFuture`
+        """
+        future = CommitFuture(query)
+        with self.condition:
+            self.pending.append(future)
+            if self.thread is None:
+                self.start()
+
+            self.condition.notify()
+
+        return future
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='plural-group-commit')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """commits all the pending requests and stops the background thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+            thread, self.thread = self.thread, None
+
+        if thread is not None:
+            thread.join()
+
+    def next_batch(self):
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+
+            deadline = time.time() + self.delay
+            while self.running and len(self.pending) < self.max_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+
+                self.condition.wait(remaining)
+
+            batch = self.pending[:self.max_size]
+            del self.pending[:self.max_size]
+            return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                return
+
+            self.commit_batch(batch)
+
+    def commit_batch(self, batch):
+        """makes a single commit for all the given requests and resolves their futures
+
+        :param batch: a list of :py:class:`CommitFuture`
+        """
+        query = '\n'.join([future.query for future in batch if future.query]) or None
+        try:
+            with self.lock:
+                commit_id = self.commit(query)
+        except Exception as error:
+            for future in batch:
+                future.set_exception(error)
+        else:
+            for future in batch:
+                future.set_result(commit_id)
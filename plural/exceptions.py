@@ -39,3 +39,23 @@ class VertexDefinitionNotFound(ElementDefinitionNotFound):
 
 class EdgeDefinitionNotFound(ElementDefinitionNotFound):
     """raised when a :py:class:`Edge` has an invalid definition"""
+
+
+class CommitTimeout(Exception):
+    """raised when a :py:class:`~plural.concurrency.CommitFuture` is not
+    resolved within the given timeout"""
+
+
+class SerializerNotAvailable(Exception):
+    """raised when the module required by a
+    :py:class:`~plural.serializer.Serializer` is not installed"""
+
+
+class ObjectSchemaNotFound(Exception):
+    """raised when a blob written by
+    :py:class:`~plural.binary.BinaryFormat` refers to an unknown schema"""
+
+
+class CodecNotAvailable(Exception):
+    """raised when the module required by a codec from
+    :py:mod:`plural.codec` is not installed"""
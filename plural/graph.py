@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+from array import array
+from collections import defaultdict
+from collections import namedtuple
+
+from plural.index import split_path
+
+
+DIRECTIONS = ('incoming', 'outgoing', 'indirect')
+
+Neighbor = namedtuple('Neighbor', ['uuid', 'name', 'label', 'direction'])
+Relationship = namedtuple('Relationship', ['name', 'other_name', 'label', 'direction', 'uuid'])
+Hop = namedtuple('Hop', ['uuid', 'name', 'depth', 'parent', 'edge'])
+
+
+def parse_relationship_path(path):
+    """parses the ``<Edge>/<direction>/<label>/<Edge>/<uuid>`` paths
+    written by :py:meth:`~plural.store.PluralStore.create_vertex`,
+    whose blob is the uuid of the other end of the relationship.
+
+    The edge of the uuid in the path is the last one of the path in
+    ``incoming`` relationships and the first one in the others, the
+    uuid in the blob belongs to the other edge.
+
+    :param path: ``string``
+    :returns: a :py:class:`Relationship` or ``None``
+    """
+    parts = split_path(path)
+    if len(parts) != 5 or parts[1] not in DIRECTIONS:
+        return None
+
+    first, direction, label, last, uuid = parts
+    if direction == 'incoming':
+        return Relationship(last, first, label, direction, uuid)
+
+    return Relationship(first, last, label, direction, uuid)
+
+
+def format_relationship_path(relationship):
+    """the inverse of :py:func:`parse_relationship_path`
+
+    :param relationship: a :py:class:`Relationship`
+    :returns: ``string``
+    """
+    if relationship.direction == 'incoming':
+        first, last = relationship.other_name, relationship.name
+    else:
+        first, last = relationship.name, relationship.other_name
+
+    return os.sep.join([first, relationship.direction, relationship.label, last, relationship.uuid])
+
+
+class AdjacencyIndex(object):
+    """in-memory adjacency lists of the relationships between edges.
+
+    Every uuid is interned as an ``int`` once, along with the name of
+    its edge, and the relationships of each label and direction are
+    kept as arrays of those ints, in both directions, so the
+    neighbors of a node are found in time proportional to its degree.
+
+    :param read_blob: a callable that takes a blob id and returns its data
+    """
+
+    def __init__(self, read_blob):
+        self.read_blob = read_blob
+        self.ids = {}
+        self.uuids = []
+        self.names = []
+        self.forward = defaultdict(dict)
+        self.backward = defaultdict(dict)
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def intern(self, uuid, name):
+        """
+        :param uuid: the uuid of a node
+        :param name: the name of its edge
+        :returns: ``int`` - the interned id of the node
+        """
+        node = self.ids.get(uuid)
+        if node is None:
+            node = self.ids[uuid] = len(self.uuids)
+            self.uuids.append(uuid)
+            self.names.append(name)
+
+        return node
+
+    def add(self, path, oid):
+        """adds the relationship of a path, ignoring any other path
+
+        :param path: ``string`` - the full path of the blob
+        :param oid: the blob id
+        """
+        relationship = parse_relationship_path(path)
+        if relationship is None:
+            return
+
+        key = (relationship.label, relationship.direction)
+        node = self.intern(relationship.uuid, relationship.name)
+        other = self.intern(self.read_blob(oid), relationship.other_name)
+        self.forward[key].setdefault(node, array('l')).append(other)
+        self.backward[key].setdefault(other, array('l')).append(node)
+
+    def remove(self, path, oid):
+        """removes the relationship of a path, ignoring any other path
+
+        :param path: ``string`` - the full path of the blob
+        :param oid: the blob id
+        """
+        relationship = parse_relationship_path(path)
+        if relationship is None:
+            return
+
+        key = (relationship.label, relationship.direction)
+        node = self.ids.get(relationship.uuid)
+        other = self.ids.get(self.read_blob(oid))
+        for lists, start, end in ((self.forward[key], node, other), (self.backward[key], other, node)):
+            nodes = lists.get(start)
+            if nodes is not None and end in nodes:
+                nodes.remove(end)
+
+    def get_lists(self, label=None, direction=None):
+        for key in sorted(self.forward.keys()):
+            if (label is None or key[0] == label) and (direction is None or key[1] == direction):
+                yield key, self.forward[key], self.backward[key]
+
+    def get_relationships(self, uuid):
+        """
+        :param uuid: the uuid of a node
+        :returns: a list of ``(relationship, other_uuid)`` tuples of
+          every relationship path keyed by the node or by one of its
+          neighbors, along with the uuid their blob should have.
+        """
+        node = self.ids.get(uuid)
+        if node is None:
+            return []
+
+        result = []
+        for (label, direction), forward, backward in self.get_lists():
+            for other in forward.get(node, ()):
+                relationship = Relationship(self.names[node], self.names[other], label, direction, uuid)
+                result.append((relationship, self.uuids[other]))
+
+            for other in backward.get(node, ()):
+                relationship = Relationship(self.names[other], self.names[node], label, direction, self.uuids[other])
+                result.append((relationship, uuid))
+
+        return result
+
+    def iter_neighbor_ids(self, node, label=None, direction=None):
+        """
+        :param node: ``int`` - the interned id of a node
+        :returns: a generator of the interned ids of its neighbors, possibly repeated
+        """
+        for key, forward, backward in self.get_lists(label, direction):
+            for lists in (forward, backward):
+                nodes = lists.get(node)
+                if nodes:
+                    for other in nodes:
+                        yield other
+
+    def get_step(self, pattern, depth):
+        if not pattern:
+            return None, None
+
+        return pattern[(depth - 1) % len(pattern)]
+
+    def traverse(self, uuid, pattern=None, max_depth=None, batch_size=256):
+        """walks the relationships of a node breadth-first, one depth
+        at a time, visiting every reachable node once.
+
+        Visited nodes are flagged in a bitmap indexed by their interned
+        ids and the nodes are yielded in batches as the frontier is
+        expanded, so only the current and the next frontiers are kept
+        in memory.
+
+        :param uuid: the uuid of the starting node, which is not yielded
+        :param pattern: an optional list of ``(label, direction)``
+          tuples, the hop at depth ``n`` follows the relationships
+          matching ``pattern[(n - 1) % len(pattern)]``, ``None`` in
+          either position matches any.
+        :param max_depth: ``int`` - defaults to the length of the pattern or ``1``
+        :param batch_size: ``int`` - the maximum number of nodes per batch
+        :returns: a generator of lists of :py:class:`Hop`
+        """
+        if max_depth is None:
+            max_depth = pattern and len(pattern) or 1
+
+        start = self.ids.get(uuid)
+        if start is None:
+            return
+
+        visited = bytearray((len(self.uuids) >> 3) + 1)
+        visited[start >> 3] |= 1 << (start & 7)
+        frontier = array('l', [start])
+        batch = []
+        for depth in range(1, max_depth + 1):
+            label, direction = self.get_step(pattern, depth)
+            next_frontier = array('l')
+            for node in frontier:
+                for other in self.iter_neighbor_ids(node, label, direction):
+                    if other >> 3 >= len(visited):
+                        visited.extend(bytearray((other >> 3) - len(visited) + 1))
+                    elif visited[other >> 3] & (1 << (other & 7)):
+                        continue
+
+                    visited[other >> 3] |= 1 << (other & 7)
+                    next_frontier.append(other)
+                    batch.append(Hop(self.uuids[other], self.names[other], depth, self.uuids[node], None))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+
+            if not next_frontier:
+                break
+
+            frontier = next_frontier
+
+        if batch:
+            yield batch
+
+    def shortest_path(self, uuid, other_uuid, pattern=None, max_depth=6):
+        """finds one of the shortest paths between two nodes with a
+        breadth-first search.
+
+        :param uuid: the uuid of the starting node
+        :param other_uuid: the uuid of the destination node
+        :param pattern: the same of :py:meth:`traverse`
+        :param max_depth: ``int`` - the maximum number of hops
+        :returns: a list of uuids from ``uuid`` to ``other_uuid`` or ``None``
+        """
+        start = self.ids.get(uuid)
+        end = self.ids.get(other_uuid)
+        if start is None or end is None:
+            return None
+
+        parents = {start: None}
+        frontier = array('l', [start])
+        for depth in range(1, max_depth + 1):
+            if end in parents:
+                break
+
+            label, direction = self.get_step(pattern, depth)
+            next_frontier = array('l')
+            for node in frontier:
+                for other in self.iter_neighbor_ids(node, label, direction):
+                    if other not in parents:
+                        parents[other] = node
+                        next_frontier.append(other)
+
+            frontier = next_frontier
+
+        if end not in parents:
+            return None
+
+        path = []
+        node = end
+        while node is not None:
+            path.append(self.uuids[node])
+            node = parents[node]
+
+        return path[::-1]
+
+    def neighbors(self, uuid, label=None, direction=None):
+        """
+        :param uuid: the uuid of a node
+        :param label: an optional relationship label
+        :param direction: an optional relationship direction: ``incoming``, ``outgoing`` or ``indirect``
+        :returns: a list of :py:class:`Neighbor`, on either end of the relationships of the node
+        """
+        node = self.ids.get(uuid)
+        if node is None:
+            return []
+
+        result = []
+        seen = set()
+        for (label, direction), forward, backward in self.get_lists(label, direction):
+            for lists in (forward, backward):
+                for other in lists.get(node, ()):
+                    if (other, label, direction) in seen:
+                        continue
+
+                    seen.add((other, label, direction))
+                    result.append(Neighbor(self.uuids[other], self.names[other], label, direction))
+
+        return result
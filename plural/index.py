@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from bisect import bisect_left
+from bisect import insort
+from collections import defaultdict
+from collections import namedtuple
+from fnmatch import fnmatch
+
+
+PathEntry = namedtuple('PathEntry', ['path', 'oid'])
+
+
+def has_wildcard(pattern):
+    """
+    :param pattern: a ``fnmatch`` pattern
+    :returns: ``True`` if the pattern has any wildcard character
+    """
+    return '*' in pattern or '?' in pattern or '[' in pattern
+
+
+def split_path(path):
+    if isinstance(path, unicode):
+        path = path.encode('utf-8')
+
+    return [part for part in path.split(os.sep) if part]
+
+
+def tree_order(item):
+    """sort key of the ``(name, child)`` items of a :py:class:`PathIndex`
+    node that lists the trees like git does, as if their name ended
+    with a ``/``, so the blob paths come out in the sorted order of the
+    repository index.
+    """
+    name, child = item
+    if isinstance(child, dict):
+        return name + os.sep
+
+    return name
+
+
+def sorted_items(node):
+    """
+    :param node: a :py:class:`PathNode` or a plain ``dict`` of ``(name, child)`` items
+    :returns: the items of the node sorted by :py:func:`tree_order`
+    """
+    if not isinstance(node, PathNode):
+        return sorted(node.items(), key=tree_order)
+
+    if node.order is None:
+        node.order = sorted(node.items(), key=tree_order)
+
+    return node.order
+
+
+class PathNode(dict):
+    """a tree of a :py:class:`PathIndex`, keeping its items sorted by
+    :py:func:`tree_order` once they were iterated, until the next
+    change of the node itself.
+    """
+    __slots__ = ('order',)
+
+    def __init__(self, *args, **kw):
+        super(PathNode, self).__init__(*args, **kw)
+        self.order = None
+
+    def __setitem__(self, name, child):
+        self.order = None
+        super(PathNode, self).__setitem__(name, child)
+
+    def __delitem__(self, name):
+        self.order = None
+        super(PathNode, self).__delitem__(name)
+
+
+def parse_index_path(path):
+    """parses a ``<Edge>/indexes/<field>/<object_hash>`` path
+
+    :param path: ``string``
+    :returns: a tuple ``((edge_name, field_name), object_hash)`` or ``(None, None)``
+    """
+    parts = split_path(path)
+    if len(parts) != 4 or parts[1] != 'indexes':
+        return None, None
+
+    return (parts[0], parts[2]), parts[3]
+
+
+class PathIndex(object):
+    """in-memory trie of blob paths, one level per tree in the path.
+
+    Every node is a :py:class:`PathNode` that maps a path segment
+    either to another node or, in the case of blobs, to their oid. Lookups of
+    exact paths cost as many dictionary lookups as there are segments
+    in the path, and prefix scans only visit the entries under the
+    given prefix.
+
+    :param entries: an iterable of ``(path, oid)`` tuples
+    """
+
+    def __init__(self, entries=()):
+        self.root = PathNode()
+        self.count = 0
+        for path, oid in entries:
+            self.add(path, oid)
+
+    @classmethod
+    def from_index(cls, index):
+        """builds a :py:class:`PathIndex` with all the entries of a ``pygit2.Index``
+
+        :param index: a ``pygit2.Index``
+        :returns: a :py:class:`PathIndex`
+        """
+        return cls(((entry.path, entry.oid) for entry in index))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def __iter__(self):
+        return self.iter_prefix('')
+
+    def add(self, path, oid):
+        """adds or replaces the oid of a blob path
+
+        :param path: ``string`` - the full path of the blob
+        :param oid: the blob id
+        """
+        parts = split_path(path)
+        node = self.root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = PathNode()
+
+            node = child
+
+        name = parts[-1]
+        existing = node.get(name)
+        if existing is None or isinstance(existing, dict):
+            self.count += 1
+
+        node[name] = oid
+
+    def remove(self, path):
+        """removes a blob path, pruning the trees left empty
+
+        :param path: ``string`` - the full path of the blob
+        :returns: the removed oid or ``None``
+        """
+        parts = split_path(path)
+        trail = []
+        node = self.root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                return None
+
+            trail.append((node, part))
+            node = child
+
+        oid = node.get(parts[-1])
+        if oid is None or isinstance(oid, dict):
+            return None
+
+        del node[parts[-1]]
+        self.count -= 1
+        for parent, part in reversed(trail):
+            if parent[part]:
+                break
+            del parent[part]
+
+        return oid
+
+    def get(self, path, default=None):
+        """retrieves the oid of a blob path
+
+        :param path: ``string`` - the full path of the blob
+        :returns: the oid or ``default``
+        """
+        node = self.root
+        for part in split_path(path):
+            if not isinstance(node, dict):
+                return default
+
+            node = node.get(part)
+            if node is None:
+                return default
+
+        if isinstance(node, dict):
+            return default
+
+        return node
+
+    def subtree(self, prefix):
+        """
+        :param prefix: ``string`` - the path of a tree
+        :returns: the ``dict`` node of the given tree or ``None``
+        """
+        node = self.root
+        for part in split_path(prefix):
+            node = node.get(part)
+            if not isinstance(node, dict):
+                return None
+
+        return node
+
+    def iter_prefix(self, prefix):
+        """iterates over all the blobs under a tree, in sorted path order
+
+        :param prefix: ``string`` - the path of a tree
+        :returns: a generator of :py:class:`PathEntry`
+        """
+        node = self.subtree(prefix)
+        if node is None:
+            return iter(())
+
+        return self.iter_node(node, os.sep.join(split_path(prefix)))
+
+    def iter_node(self, node, prefix):
+        stack = [(prefix, iter(sorted_items(node)))]
+        while stack:
+            base, children = stack[-1]
+            for name, child in children:
+                path = base and os.sep.join([base, name]) or name
+                if isinstance(child, dict):
+                    stack.append((path, iter(sorted_items(child))))
+                    break
+
+                yield PathEntry(path, child)
+            else:
+                stack.pop()
+
+    def glob(self, pattern):
+        """matches blob paths against a ``fnmatch`` pattern, only
+        visiting the entries under the longest literal prefix of the
+        pattern.
+
+        :param pattern: ``string``
+        :returns: a generator of :py:class:`PathEntry`
+        """
+        if not has_wildcard(pattern):
+            oid = self.get(pattern)
+            if oid is not None:
+                yield PathEntry(pattern, oid)
+            return
+
+        prefix = []
+        for part in pattern.split(os.sep)[:-1]:
+            if has_wildcard(part):
+                break
+            prefix.append(part)
+
+        for entry in self.iter_prefix(os.sep.join(prefix)):
+            if fnmatch(entry.path, pattern):
+                yield entry
+
+
+class TreeIndex(PathIndex):
+    """read-only :py:class:`PathIndex` of the blob paths of a git tree.
+
+    Trees are only read when a query reaches them and the entries of
+    each one are kept once read, the tree of a commit never changes so
+    they are never invalidated. Exact paths are resolved by libgit2
+    unless their tree was already read.
+
+    In the nodes returned by :py:meth:`subtree` the child trees are
+    empty ``dict`` objects.
+
+    :param repository: a ``pygit2.Repository``
+    :param tree: a ``pygit2.Tree`` or ``None`` for an empty tree
+    """
+
+    def __init__(self, repository, tree):
+        self.repository = repository
+        self.tree = tree
+        self.nodes = {}
+
+    @property
+    def root(self):
+        return self.subtree('') or {}
+
+    def __len__(self):
+        return sum(1 for entry in self.iter_prefix(''))
+
+    def get_tree(self, prefix):
+        """
+        :param prefix: ``string`` - the normalized path of a tree
+        :returns: a ``pygit2.Tree`` or ``None``
+        """
+        if self.tree is None or not prefix:
+            return self.tree
+
+        try:
+            entry = self.tree[prefix]
+        except KeyError:
+            return None
+
+        if entry.type != 'tree':
+            return None
+
+        return self.repository[entry.id]
+
+    def get(self, path, default=None):
+        path = os.sep.join(split_path(path))
+        parent, name = os.path.split(path)
+        node = self.nodes.get(parent)
+        if node is None:
+            if self.tree is None or not name:
+                return default
+
+            try:
+                entry = self.tree[path]
+            except KeyError:
+                return default
+
+            return entry.type != 'tree' and entry.id or default
+
+        oid = node.get(name)
+        if oid is None or isinstance(oid, dict):
+            return default
+
+        return oid
+
+    def subtree(self, prefix):
+        prefix = os.sep.join(split_path(prefix))
+        node = self.nodes.get(prefix)
+        if node is None:
+            tree = self.get_tree(prefix)
+            if tree is None:
+                return None
+
+            node = {}
+            for entry in tree:
+                node[entry.name] = {} if entry.type == 'tree' else entry.id
+
+            self.nodes[prefix] = node
+
+        return node
+
+    def iter_prefix(self, prefix):
+        prefix = os.sep.join(split_path(prefix))
+        tree = self.get_tree(prefix)
+        if tree is None:
+            return iter(())
+
+        return self.iter_tree(tree, prefix)
+
+    def iter_tree(self, tree, prefix):
+        # git already sorts the entries of a tree like tree_order()
+        stack = [(prefix, iter(tree))]
+        while stack:
+            base, entries = stack[-1]
+            for entry in entries:
+                path = base and os.sep.join([base, entry.name]) or entry.name
+                if entry.type == 'tree':
+                    stack.append((path, iter(self.repository[entry.id])))
+                    break
+
+                yield PathEntry(path, entry.id)
+            else:
+                stack.pop()
+
+    def add(self, path, oid):
+        raise TypeError('{} is read-only'.format(self.__class__.__name__))
+
+    def remove(self, path):
+        raise TypeError('{} is read-only'.format(self.__class__.__name__))
+
+
+class ValueIndex(object):
+    """inverted index of the indexed predicates of a :py:class:`PathIndex`.
+
+    The blob of every ``<Edge>/indexes/<field>/<object_hash>`` entry
+    is the value of the field itself, so git already gives the same
+    blob id to equal values. This index groups the object hashes of
+    each field by the blob id of their value, making equality queries
+    a single dictionary lookup. The distinct values of a field are
+    only read when a prefix query needs them, and then kept sorted.
+
+    Fields are loaded lazily on their first query and kept up to date
+    through :py:meth:`add` and :py:meth:`remove`.
+
+    :param path_index: a :py:class:`PathIndex`
+    :param read_blob: a callable that takes a blob id and returns its data
+    """
+
+    def __init__(self, path_index, read_blob):
+        self.path_index = path_index
+        self.read_blob = read_blob
+        self.objects = {}
+        self.values = {}
+
+    def get_objects(self, name, field):
+        """
+        :param name: the edge or vertex name
+        :param field: the field name
+        :returns: a ``dict`` mapping value blob ids to sets of object hashes
+        """
+        key = (name, field)
+        if key not in self.objects:
+            objects = defaultdict(set)
+            node = self.path_index.subtree(os.sep.join([name, 'indexes', field])) or {}
+            for object_hash, oid in node.items():
+                if not isinstance(oid, dict):
+                    objects[oid].add(object_hash)
+
+            self.objects[key] = objects
+
+        return self.objects[key]
+
+    def get_values(self, name, field):
+        """
+        :param name: the edge or vertex name
+        :param field: the field name
+        :returns: a sorted list of ``(value, value_blob_id)`` tuples
+        """
+        key = (name, field)
+        if key not in self.values:
+            objects = self.get_objects(name, field)
+            self.values[key] = sorted([(self.read_blob(oid), oid) for oid in objects])
+
+        return self.values[key]
+
+    def add(self, path, oid):
+        key, object_hash = parse_index_path(path)
+        if key not in self.objects:
+            return
+
+        objects = self.objects[key]
+        is_new_value = oid not in objects
+        objects[oid].add(object_hash)
+        if is_new_value and key in self.values:
+            insort(self.values[key], (self.read_blob(oid), oid))
+
+    def remove(self, path, oid):
+        key, object_hash = parse_index_path(path)
+        if key not in self.objects or oid not in self.objects[key]:
+            return
+
+        objects = self.objects[key]
+        objects[oid].discard(object_hash)
+        if objects[oid]:
+            return
+
+        del objects[oid]
+        if key in self.values:
+            values = self.values[key]
+            values.pop(values.index((self.read_blob(oid), oid)))
+
+    def equals(self, name, field, value_oid):
+        """
+        :param value_oid: the blob id of the value
+        :returns: the set of object hashes whose field has the given value
+        """
+        return set(self.get_objects(name, field).get(value_oid, ()))
+
+    def startswith(self, name, field, prefix):
+        """
+        :param prefix: ``string``
+        :returns: the set of object hashes whose field value starts with ``prefix``
+        """
+        objects = self.get_objects(name, field)
+        values = self.get_values(name, field)
+
+        result = set()
+        position = bisect_left(values, (prefix, ))
+        while position < len(values) and values[position][0].startswith(prefix):
+            result.update(objects[values[position][1]])
+            position += 1
+
+        return result
+
+    def match(self, name, field, match_callback):
+        """calls ``match_callback`` once per distinct value of the field
+
+        :param match_callback: a callable that takes the value and returns a ``bool``
+        :returns: the set of object hashes whose field value matches
+        """
+        result = set()
+        for oid, object_hashes in self.get_objects(name, field).items():
+            if match_callback(self.read_blob(oid)):
+                result.update(object_hashes)
+
+        return result
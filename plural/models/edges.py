@@ -15,6 +15,8 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import warnings
+
 from plural.models.meta.edges import MetaEdge
 from plural.models.meta.edges import SUBJECTS
 from plural.models.meta.edges import is_edge_subclass
@@ -64,8 +66,14 @@ def resolve_edge(edge):
 
 
 class Edge(Element):
-    """represents a node type (or "model", if you will)."""
+    """represents a node type (or "model", if you will).
+
+    Setting ``object_format = 'binary'`` in a definition writes its
+    objects with :py:class:`~plural.binary.BinaryFormat` instead of
+    the serializer of the store.
+    """
     __metaclass__ = MetaEdge
+    object_format = None
 
     @staticmethod
     def definition(name):
@@ -80,17 +88,29 @@ class Edge(Element):
         except KeyError:
             raise EdgeDefinitionNotFound('there are no edge subclass defined with the name "{}"'.format(name))
 
-    def get_related_blob_paths(self, repository):
+    def get_related_blob_paths(self, repository, blob_id=None):
         """
         returns a list of all possible blob paths of a :py:class:`Edge` instance.
 
+        Deprecated: it only sees the paths of the repository index, not
+        the ones staged by the store, and only the declared indexes. Use
+        :py:meth:`~plural.store.PluralStore.get_related_paths` instead.
+
         :param repository: a ``pygit2.Repository``
-        :returns: the given :py:class:`Edge` subclass
+        :param blob_id: the id of the object blob, read from the ``_ids`` index of the repository when not given
+        :returns: a list of paths
         """
+        warnings.warn(
+            'get_related_blob_paths() is deprecated, use PluralStore.get_related_paths() instead',
+            DeprecationWarning,
+            stacklevel=2,
+        )
         edge_name = self.__class__.__name__
         uuid = self.uuid
-        blob_id_path = '{edge_name}/_ids/{uuid}'.format(**locals())
-        blob_id = repository[repository.index[blob_id_path].oid].data
+        if blob_id is None:
+            blob_id_path = '{edge_name}/_ids/{uuid}'.format(**locals())
+            blob_id = repository[repository.index[blob_id_path].oid].data
+
         context = {
             'edge_name': edge_name,
             'blob_id': blob_id,
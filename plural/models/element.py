@@ -17,36 +17,120 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import json
-from collections import OrderedDict
-from hashlib import sha256
 from plural.util import generate_uuid
 from plural.util import AutoCodec
+from plural.serializer import JSONSerializer
+
+
+AUTO_CODEC = AutoCodec()
+CANONICAL_JSON = JSONSerializer()
+MISSING = object()
+
+
+def define_layout(cls, fields, codecs):
+    """gives an :py:class:`Element` subclass the fixed layout of its
+    declared fields, called by the metaclasses of edges and vertices.
+
+    :param cls: the :py:class:`Element` subclass
+    :param fields: the names of the indexed fields
+    :param codecs: a ``dict`` mapping field names to codec instances
+    """
+    layout = ('uuid', ) + tuple(sorted(set(fields).union(codecs).difference({'uuid'})))
+    cls.__layout__ = layout
+    cls.__positions__ = dict([(name, position) for position, name in enumerate(layout)])
+    cls.__codecs__ = codecs
+
+
+def rebuild_element(cls):
+    return cls.__new__(cls)
 
 
 class Element(object):
-    """json-serializable data-model for Edges and Vertices"""
+    """json-serializable data-model for Edges and Vertices
+
+    Instances keep the decoded values of the fields declared by their
+    definition in a list, in the order of ``__layout__``, and the
+    values of any other fields in the ``__extra__`` dict, only created
+    when needed.
+    """
+    __slots__ = ('__values__', '__extra__', '__dict__')
+    __layout__ = ('uuid', )
+    __positions__ = {'uuid': 0}
+    __codecs__ = {}
+    __fields__ = {'uuid'}
 
     def __init__(self, uuid=None, **kw):
-        self.uuid = kw.get('uuid', uuid)
-        self.__data__ = OrderedDict([(k, self.decode_field(k, v)) for k, v in kw.items()])
-        self.__data__['uuid'] = uuid or generate_uuid()
+        self.__values__ = [MISSING] * len(self.__layout__)
+        self.__extra__ = None
+        for key, value in kw.items():
+            self.set_value(key, self.decode_field(key, value))
+
+        self.set_value('uuid', uuid or generate_uuid())
+
+    def set_value(self, key, value):
+        """stores the decoded value of a field
+
+        :param key: the field name
+        :param value: the decoded value
+        """
+        position = self.__positions__.get(key)
+        if position is not None:
+            self.__values__[position] = value
+            return
+
+        if self.__extra__ is None:
+            self.__extra__ = {}
+
+        self.__extra__[key] = value
+
+    def get_value(self, key):
+        """
+        :param key: the field name
+        :returns: the decoded value of the field
+        :raises: ``KeyError`` when the field is not set
+        """
+        position = self.__positions__.get(key)
+        if position is not None:
+            value = self.__values__[position]
+            if value is not MISSING:
+                return value
+        elif self.__extra__ is not None and key in self.__extra__:
+            return self.__extra__[key]
+
+        raise KeyError(key)
+
+    def iter_values(self):
+        """
+        :returns: a generator of ``(field_name, decoded_value)`` tuples of the fields that are set
+        """
+        for key, value in zip(self.__layout__, self.__values__):
+            if value is not MISSING:
+                yield key, value
+
+        if self.__extra__:
+            for item in self.__extra__.items():
+                yield item
 
     def __setitem__(self, key, value):
-        self.__data__[key] = self.encode_field(key, value)
+        self.set_value(key, self.decode_field(key, self.encode_field(key, value)))
 
     def __contains__(self, key):
-        return key in self.__data__
+        try:
+            self.get_value(key)
+        except KeyError:
+            return False
+
+        return True
 
     def __getitem__(self, key):
-        value = self.__data__[key]
-        return self.decode_field(key, value)
+        return self.get_value(key)
 
     def __setattr__(self, key, value):
         if key.startswith('_'):
             return object.__setattr__(self, key, value)
 
-        if key in self.__fields__:
-            self.__data__[key] = self.encode_field(key, value)
+        if key in self.__positions__ or (self.__extra__ is not None and key in self.__extra__):
+            self[key] = value
         else:
             object.__setattr__(self, key, value)
 
@@ -54,36 +138,52 @@ class Element(object):
         if key.startswith('_'):
             return super(Element, self).__getattribute__(key)
 
-        if key not in self.__data__:
+        try:
+            return self.get_value(key)
+        except KeyError:
             raise AttributeError('key not found: {}'.format(key))
 
-        value = self.__data__[key]
-        return self.decode_field(key, value)
+    def __reduce__(self):
+        return rebuild_element, (self.__class__, ), self.__getstate__()
+
+    def __getstate__(self):
+        attributes = dict(getattr(self, '__dict__', None) or {})
+        for cls in type(self).__mro__[:-2]:
+            for name in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, name):
+                    attributes[name] = getattr(self, name)
+
+        return dict(self.iter_values()), attributes
+
+    def __setstate__(self, state):
+        values, attributes = state
+        self.__values__ = [MISSING] * len(self.__layout__)
+        self.__extra__ = None
+        for key, value in values.items():
+            self.set_value(key, value)
+
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
 
     def to_dict(self):
-        return dict([(k, self.encode_field(k, v)) for k, v in self.__data__.items()])
+        return dict([(k, self.encode_field(k, v)) for k, v in self.iter_values()])
 
     def to_json(self, **kw):
+        if not kw:
+            return CANONICAL_JSON.dumps(self.to_dict())
+
         kw['sort_keys'] = True
-        kw['default'] = AutoCodec().encode
+        kw['default'] = AUTO_CODEC.encode
         return json.dumps(self.to_dict(), **kw)
 
     def decode_field(self, name, value):
-        codec = self.__codecs__.get(name, AutoCodec())
-        if not codec:
-            return value
-
-        return codec.decode(value)
+        return self.__codecs__.get(name, AUTO_CODEC).decode(value)
 
     def encode_field(self, name, value):
-        codec = self.__codecs__.get(name, AutoCodec())
-        if not codec:
-            return value or ''
-
-        return codec.encode(value)
+        return self.__codecs__.get(name, AUTO_CODEC).encode(value)
 
     def __hash__(self):
-        return int(sha256(self.to_json()).hexdigest(), 16)
+        return hash((self.__class__.__name__, self.get_value('uuid')))
 
     def __str__(self):
         return ''.join([self.__class__.__name__, self.to_json()])
@@ -92,7 +192,22 @@ class Element(object):
         return ".".join([self.__class__.__module__, bytes(self)])
 
     def __eq__(self, other):
-        return isinstance(other, Element) and self.to_dict() == other.to_dict()
+        if other is self:
+            return True
+
+        if not isinstance(other, Element) or self.__class__.__name__ != other.__class__.__name__:
+            return False
+
+        if self.get_value('uuid') != other.get_value('uuid'):
+            return False
+
+        if self.__values__ == other.__values__ and self.__extra__ == other.__extra__:
+            return True
+
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
 
     @classmethod
     def from_data(cls, ___name___=None, **kw):
@@ -107,6 +222,41 @@ class Element(object):
         Definition = cls.definition(name)
         return Definition(**kw)
 
+    @classmethod
+    def build_many(Definition, rows):
+        """creates many instances at once, decoding the values of each
+        field with a single call to the ``decode_many`` of its codec.
+
+        :param rows: a list of dictionaries, like the ``**kw`` of the constructor
+        :returns: a list of instances of the given :py:class:`Element` subclass
+        """
+        elements = []
+        columns = {}
+        size = len(Definition.__layout__)
+        for row in rows:
+            element = Definition.__new__(Definition)
+            element.__values__ = [MISSING] * size
+            element.__extra__ = None
+            elements.append(element)
+            for key, value in row.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = ([], [])
+
+                column[0].append(element)
+                column[1].append(value)
+
+        for key, (owners, values) in columns.items():
+            codec = Definition.__codecs__.get(key, AUTO_CODEC)
+            for element, value in zip(owners, codec.decode_many(values)):
+                element.set_value(key, value)
+
+        for element in elements:
+            if not element.__values__[0] or element.__values__[0] is MISSING:
+                element.__values__[0] = generate_uuid()
+
+        return elements
+
     @classmethod
     def from_dict(Definition, data):
         """
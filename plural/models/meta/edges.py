@@ -19,12 +19,15 @@
 from collections import defaultdict
 from collections import OrderedDict
 from plural.models.element import Element
+from plural.models.element import define_layout
+from plural.codec import get_codec
 from plural.exceptions import InvalidEdgeDefinition
 
 
 SUBJECTS = OrderedDict()
 SUBJECTS_BY_CLASS = OrderedDict()
 SUBJECT_VERTEXES = defaultdict(OrderedDict)
+OBJECT_FORMATS = (None, 'binary')
 
 
 def edge_has_index(name, key):
@@ -46,6 +49,10 @@ def validate_edge_definition(name, cls, members):
     if not isinstance(indexes, (set, list, tuple)):
         raise InvalidEdgeDefinition('the {} definition has an index property that is not a set, list or tuple: {}'.format(cls, type(indexes)))
 
+    object_format = get_attribute_from_meta_child('object_format', cls, members)
+    if object_format not in OBJECT_FORMATS:
+        raise InvalidEdgeDefinition('the {} definition has an unknown object_format: {}'.format(cls, repr(object_format)))
+
     return indexes
 
 
@@ -72,6 +79,10 @@ def is_edge_subclass(cls):
 
 
 class MetaEdge(type):
+    def __new__(mcs, name, bases, members):
+        members.setdefault('__slots__', ())
+        return super(MetaEdge, mcs).__new__(mcs, name, bases, members)
+
     def __init__(cls, name, bases, members):
         indexes = set()
         codecs = {}
@@ -98,6 +109,5 @@ class MetaEdge(type):
         codecs.update(getattr(cls, 'fields', {}))
         cls.indexes = fields
         cls.__fields__ = {'uuid'}.union(fields)
-        cls.__data__ = {}
-        cls.__codecs__ = dict([(n, Codec()) for n, Codec in codecs.items()])
+        define_layout(cls, fields, dict([(n, get_codec(codec)) for n, codec in codecs.items()]))
         super(MetaEdge, cls).__init__(name, bases, members)
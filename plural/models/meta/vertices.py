@@ -17,6 +17,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import OrderedDict
+from plural.models.element import define_layout
+from plural.codec import get_codec
 from plural.exceptions import InvalidVertexDefinition
 
 
@@ -49,6 +51,10 @@ def is_vertex_subclass(cls):
 
 
 class MetaVertex(type):
+    def __new__(mcs, name, bases, members):
+        members.setdefault('__slots__', ())
+        return super(MetaVertex, mcs).__new__(mcs, name, bases, members)
+
     def __init__(cls, name, bases, members):
         indexes = set()
         codecs = {}
@@ -79,8 +85,7 @@ class MetaVertex(type):
         codecs.update(getattr(cls, 'fields', {}))
         cls.indexes = fields
         cls.__fields__ = {'uuid'}.union(fields)
-        cls.__data__ = {}
-        cls.__codecs__ = dict([(n, Codec()) for n, Codec in codecs.items()])
+        define_layout(cls, fields, dict([(n, get_codec(codec)) for n, codec in codecs.items()]))
         super(MetaVertex, cls).__init__(name, bases, members)
 
 
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from plural.models.element import AUTO_CODEC
+
+
+class LazyElement(object):
+    """stands for an :py:class:`~plural.models.element.Element` whose
+    data is only read and decoded on the first attribute access.
+
+    :param Definition: the :py:class:`~plural.models.element.Element` subclass
+    :param read_data: a callable that returns the ``dict`` of the element data
+    """
+
+    def __init__(self, Definition, read_data):
+        self.__dict__['_Definition'] = Definition
+        self.__dict__['_read_data'] = read_data
+        self.__dict__['_element'] = None
+
+    @property
+    def __class__(self):
+        return self._Definition
+
+    def resolve(self):
+        """reads, decodes and caches the element
+
+        :returns: an instance of the element definition
+        """
+        if self._element is None:
+            self.__dict__['_element'] = self._Definition(**self._read_data())
+
+        return self._element
+
+    def __getattr__(self, key):
+        return getattr(self.resolve(), key)
+
+    def __setattr__(self, key, value):
+        setattr(self.resolve(), key, value)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __contains__(self, key):
+        return key in self.resolve()
+
+    def __eq__(self, other):
+        if isinstance(other, LazyElement):
+            other = other.resolve()
+
+        return self.resolve() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.resolve())
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        return repr(self.resolve())
+
+
+class LazyProjection(object):
+    """stands for some of the fields of an element, each one read and
+    decoded on its first access only.
+
+    :param Definition: the :py:class:`~plural.models.element.Element` subclass
+    :param fields: the names of the projected fields
+    :param read_field: a callable that takes a field name and returns its raw value, or ``None``
+    """
+
+    def __init__(self, Definition, fields, read_field):
+        self.__dict__['_Definition'] = Definition
+        self.__dict__['_fields'] = tuple(fields)
+        self.__dict__['_read_field'] = read_field
+        self.__dict__['_values'] = {}
+
+    @property
+    def __class__(self):
+        return self._Definition
+
+    def __getattr__(self, key):
+        if key.startswith('_') or key not in self._fields:
+            raise AttributeError('field not projected: {}'.format(key))
+
+        if key not in self._values:
+            value = self._read_field(key)
+            if value is not None:
+                value = self._Definition.__codecs__.get(key, AUTO_CODEC).decode(value)
+
+            self._values[key] = value
+
+        return self._values[key]
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def to_dict(self):
+        """
+        :returns: a ``dict`` with the values of the projected fields
+          that are set, encoded like in
+          :py:meth:`~plural.models.element.Element.to_dict`
+        """
+        codecs = self._Definition.__codecs__
+        result = {}
+        for key in self._fields:
+            value = getattr(self, key)
+            if value is not None:
+                result[key] = codecs.get(key, AUTO_CODEC).encode(value)
+
+        return result
+
+    def __repr__(self):
+        return '<{} projection of {}>'.format(self._Definition.__name__, ', '.join(self._fields))
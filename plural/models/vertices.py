@@ -15,6 +15,8 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import warnings
+
 from plural.models.meta.vertices import MetaVertex
 from plural.models.meta.vertices import VERTEXES
 from plural.models.meta.vertices import is_vertex_subclass
@@ -66,6 +68,7 @@ def resolve_vertex(vertex):
 class Vertex(Element):
     """represents a node type (or "model", if you will)."""
     __metaclass__ = MetaVertex
+    __slots__ = ('_origin', '_target')
 
     def __init__(self, origin, target, *args, **kw):
         self._origin = origin
@@ -85,17 +88,29 @@ class Vertex(Element):
         except KeyError:
             raise VertexDefinitionNotFound('there are no vertex subclass defined with the name "{}"'.format(name))
 
-    def get_related_blob_paths(self, repository):
+    def get_related_blob_paths(self, repository, blob_id=None):
         """
         returns a list of all possible blob paths of a :py:class:`Vertex` instance.
 
+        Deprecated: it only sees the paths of the repository index, not
+        the ones staged by the store, and only the declared indexes. Use
+        :py:meth:`~plural.store.PluralStore.get_related_paths` instead.
+
         :param repository: a ``pygit2.Repository``
-        :returns: the given :py:class:`Vertex` subclass
+        :param blob_id: the id of the object blob, read from the ``_ids`` index of the repository when not given
+        :returns: a list of paths
         """
+        warnings.warn(
+            'get_related_blob_paths() is deprecated, use PluralStore.get_related_paths() instead',
+            DeprecationWarning,
+            stacklevel=2,
+        )
         vertex_name = self.__class__.__name__
         uuid = self.uuid
-        blob_id_path = '{vertex_name}/_ids/{uuid}'.format(**locals())
-        blob_id = repository[repository.index[blob_id_path].oid].data
+        if blob_id is None:
+            blob_id_path = '{vertex_name}/_ids/{uuid}'.format(**locals())
+            blob_id = repository[repository.index[blob_id_path].oid].data
+
         context = {
             'vertex_name': vertex_name,
             'blob_id': blob_id,
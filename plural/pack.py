@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import zlib
+import struct
+import hashlib
+import tempfile
+
+import pygit2
+
+
+OBJ_BLOB = 3
+PACK_VERSION = 2
+IDX_SIGNATURE = b'\377tOc'
+IDX_VERSION = 2
+
+
+def encode_object_header(object_type, size):
+    """encodes the type and size header of an object inside a packfile
+
+    :param object_type: ``int`` - the git object type
+    :param size: ``int`` - the size of the uncompressed object
+    :returns: ``bytes``
+    """
+    byte = (object_type << 4) | (size & 0x0f)
+    size >>= 4
+    header = []
+    while size:
+        header.append(chr(byte | 0x80))
+        byte = size & 0x7f
+        size >>= 7
+
+    header.append(chr(byte))
+    return b''.join(header)
+
+
+def raw_oid(oid):
+    """
+    :param oid: a ``pygit2.Oid`` or its hex representation
+    :returns: ``bytes`` - the 20 bytes of the object id
+    """
+    if isinstance(oid, basestring):
+        return oid.decode('hex')
+
+    return oid.raw
+
+
+class PackWriter(object):
+    """buffers blobs in memory and writes all of them as a single git
+    packfile, with its index, into the object database of a repository.
+
+    Blob ids are computed with ``pygit2.hash`` so they can be referenced
+    by trees and index entries before the pack is written.
+
+    :param compression: ``int`` - the zlib compression level of the packed objects
+    """
+
+    def __init__(self, compression=zlib.Z_DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.objects = {}
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, oid):
+        return raw_oid(oid) in self.objects
+
+    def add_blob(self, data):
+        """buffers a blob
+
+        :param data: ``bytes``
+        :returns: the blob id
+        """
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+
+        oid = pygit2.hash(data)
+        self.objects.setdefault(oid.raw, data)
+        return oid
+
+    def get(self, oid, default=None):
+        """
+        :param oid: a ``pygit2.Oid`` or its hex representation
+        :returns: the data of a buffered blob or ``default``
+        """
+        return self.objects.get(raw_oid(oid), default)
+
+    def clear(self):
+        self.objects.clear()
+
+    def write(self, repository):
+        """writes all the buffered blobs as a packfile in the object
+        database of the given repository and clears the buffer.
+
+        Every call writes a new packfile and nothing here consolidates
+        them, the more packs there are the slower the object lookups
+        get, so repositories written this way need a periodical ``git
+        gc`` or ``git repack -a -d``.
+
+        :param repository: a ``pygit2.Repository``
+        :returns: the path of the packfile or ``None`` if there were no objects
+        """
+        if not self.objects:
+            return None
+
+        pack_dir = os.path.join(repository.path, 'objects', 'pack')
+        if not os.path.isdir(pack_dir):
+            os.makedirs(pack_dir)
+
+        fd, temporary_pack = tempfile.mkstemp(prefix='tmp_pack_', dir=pack_dir)
+        entries = []
+        checksum = hashlib.sha1()
+        with os.fdopen(fd, 'wb') as pack:
+            def write(chunk):
+                checksum.update(chunk)
+                pack.write(chunk)
+
+            write(b'PACK' + struct.pack('>II', PACK_VERSION, len(self.objects)))
+            offset = 12
+            for raw_oid, data in self.objects.items():
+                packed = encode_object_header(OBJ_BLOB, len(data)) + zlib.compress(data, self.compression)
+                write(packed)
+                entries.append((raw_oid, zlib.crc32(packed) & 0xffffffff, offset))
+                offset += len(packed)
+
+            pack_checksum = checksum.digest()
+            pack.write(pack_checksum)
+
+        # like git, the pack is moved into place before its index is
+        # written, so a reader never finds an index without its pack
+        name = os.path.join(pack_dir, 'pack-{}'.format(pack_checksum.encode('hex')))
+        os.rename(temporary_pack, name + '.pack')
+
+        fd, temporary_index = tempfile.mkstemp(prefix='tmp_idx_', dir=pack_dir)
+        with os.fdopen(fd, 'wb') as idx:
+            idx.write(self.build_index(entries, pack_checksum))
+
+        os.rename(temporary_index, name + '.idx')
+        self.clear()
+        return name + '.pack'
+
+    def build_index(self, entries, pack_checksum):
+        """builds a version 2 pack index
+
+        :param entries: a list of ``(raw_oid, crc32, offset)`` tuples
+        :param pack_checksum: ``bytes`` - the SHA-1 trailer of the packfile
+        :returns: ``bytes``
+        """
+        entries = sorted(entries)
+        fanout = [0] * 256
+        for raw_oid, crc, offset in entries:
+            fanout[ord(raw_oid[0])] += 1
+
+        total = 0
+        for position, count in enumerate(fanout):
+            total += count
+            fanout[position] = total
+
+        offsets = []
+        large_offsets = []
+        for raw_oid, crc, offset in entries:
+            if offset < 0x80000000:
+                offsets.append(offset)
+            else:
+                offsets.append(0x80000000 | len(large_offsets))
+                large_offsets.append(offset)
+
+        parts = [
+            IDX_SIGNATURE,
+            struct.pack('>I', IDX_VERSION),
+            struct.pack('>256I', *fanout),
+            b''.join([raw_oid for raw_oid, crc, offset in entries]),
+            struct.pack('>{}I'.format(len(entries)), *[crc for raw_oid, crc, offset in entries]),
+            struct.pack('>{}I'.format(len(offsets)), *offsets),
+            struct.pack('>{}Q'.format(len(large_offsets)), *large_offsets),
+            pack_checksum,
+        ]
+        data = b''.join(parts)
+        return data + hashlib.sha1(data).digest()
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import multiprocessing
+
+import pygit2
+
+from plural.models.edges import Edge
+from plural.models.edges import resolve_edge_name
+from plural.models.vertices import Vertex
+from plural.models.vertices import resolve_vertex_name
+from plural.serializer import JSONSerializer
+
+
+worker = {}
+
+
+def init_worker(path):
+    """opens the repository of the store in a worker process"""
+    worker['repository'] = pygit2.Repository(path)
+
+
+def get_tree(repository, tree_id, path):
+    """
+    :param repository: a ``pygit2.Repository``
+    :param tree_id: the id of the root tree
+    :param path: ``string`` - the path of a subtree
+    :returns: the ``pygit2.Tree`` at the given path or ``None``
+    """
+    try:
+        entry = repository[tree_id][path]
+    except KeyError:
+        return None
+
+    if entry.type != 'tree':
+        return None
+
+    return repository[entry.id]
+
+
+def iter_tree_prefix(tree, prefix):
+    """iterates over the entries of a tree whose name starts with
+    ``prefix``, finding the first one with a binary search since git
+    keeps the entries sorted by name.
+
+    :param tree: a ``pygit2.Tree``
+    :param prefix: ``string``
+    :returns: a generator of ``pygit2.TreeEntry``
+    """
+    low, high = 0, len(tree)
+    while low < high:
+        middle = (low + high) // 2
+        if tree[middle].name < prefix:
+            low = middle + 1
+        else:
+            high = middle
+
+    for position in xrange(low, len(tree)):
+        entry = tree[position]
+        if not entry.name.startswith(prefix):
+            break
+
+        yield entry
+
+
+def scan_partition(task):
+    """deserializes all the objects of a partition, runs in a worker process
+
+    :param task: a tuple ``(tree_id, name, prefix, serializer)``
+    :returns: a tuple ``(name, [data, ...])``
+    """
+    tree_id, name, prefix, serializer = task
+    repository = worker['repository']
+    tree = get_tree(repository, tree_id, os.path.join(name, 'objects'))
+    if tree is None:
+        return name, []
+
+    return name, [serializer.loads(repository[entry.id].data) for entry in iter_tree_prefix(tree, prefix)]
+
+
+def match_partition(task):
+    """deserializes the objects of a partition whose indexed field
+    matches a query, runs in a worker process.
+
+    :param task: a tuple ``(tree_id, name, field, prefix, match_callback, serializer)``
+    :returns: a tuple ``(name, [(object_hash, data), ...])``
+    """
+    tree_id, name, field, prefix, match_callback, serializer = task
+    repository = worker['repository']
+    tree = get_tree(repository, tree_id, os.path.join(name, 'indexes', field))
+    if tree is None:
+        return name, []
+
+    matches = {}
+    result = []
+    for entry in iter_tree_prefix(tree, prefix):
+        if entry.id not in matches:
+            matches[entry.id] = match_callback(repository[entry.id].data)
+
+        if matches[entry.id]:
+            result.append((entry.name, serializer.loads(repository[entry.name].data)))
+
+    return name, result
+
+
+class ParallelQuery(object):
+    """runs full scans and index matches of a
+    :py:class:`~plural.store.PluralStore` in a pool of processes.
+
+    The objects are partitioned by the prefix of their object hash and
+    every partition is read and deserialized by a worker process with
+    its own ``pygit2.Repository``. Only committed data is visible: the
+    queries run against the tree of the current ``HEAD``, or the
+    given ``treeish``.
+
+    Query callables are sent to the workers, so they must be
+    picklable, like the ones built with :py:class:`plural.query.predicate`.
+
+    :param store: a :py:class:`~plural.store.PluralStore`
+    :param processes: ``int`` - the number of worker processes, defaults to the number of cpus
+    :param ordered: ``bool`` - stream the results in object hash order
+      instead of as soon as each partition is ready
+    :param prefix_length: ``int`` - the length of the hex prefix of
+      the partitions, ``1`` makes 16 partitions, ``2`` makes 256
+    :param treeish: an optional ``pygit2.Tree`` or tree id
+    :param serializer: the :py:class:`~plural.serializer.Serializer` of the objects
+    """
+
+    def __init__(self, store, processes=None, ordered=True, prefix_length=1, treeish=None, serializer=None):
+        self.store = store
+        self.ordered = ordered
+        self.serializer = serializer or JSONSerializer()
+        self.prefixes = ['{:0{}x}'.format(number, prefix_length) for number in range(16 ** prefix_length)]
+        self.tree_id = None
+        if treeish is not None:
+            self.tree_id = getattr(treeish, 'hex', treeish)
+        elif store.repository.references.objects:
+            self.tree_id = store.repository[store.repository.head.target].tree.hex
+
+        self.pool = multiprocessing.Pool(processes, init_worker, (store.repository.path, ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """stops the worker processes"""
+        self.pool.close()
+        self.pool.join()
+
+    def get_names(self, name):
+        if name != '*':
+            return [name]
+
+        if self.tree_id is None:
+            return []
+
+        return [entry.name for entry in self.store.repository[self.tree_id] if entry.type == 'tree']
+
+    def get_fields(self, name, field_name):
+        if field_name:
+            return [field_name]
+
+        tree = get_tree(self.store.repository, self.tree_id, os.path.join(name, 'indexes'))
+        return tree is not None and [entry.name for entry in tree] or []
+
+    def run(self, function, tasks):
+        if self.tree_id is None or not tasks:
+            return iter(())
+
+        if self.ordered:
+            return self.pool.imap(function, tasks)
+
+        return self.pool.imap_unordered(function, tasks)
+
+    def scan_all(self, edge_name=None):
+        """scans all the edges of a type in parallel
+
+        :param edge_name: the edge name or type, ``None`` scans all of them
+        :returns: a generator of :py:class:`~plural.models.edges.Edge` instances
+        """
+        tasks = []
+        for name in self.get_names(resolve_edge_name(edge_name)):
+            tasks.extend([(self.tree_id, name, prefix, self.serializer) for prefix in self.prefixes])
+
+        for name, partition in self.run(scan_partition, tasks):
+            for edge in Edge.definition(name).build_many(partition):
+                yield edge
+
+    def match_data(self, name, field_name, match_callback):
+        tasks = []
+        for name in self.get_names(name):
+            for field in self.get_fields(name, field_name):
+                tasks.extend([(self.tree_id, name, field, prefix, match_callback, self.serializer) for prefix in self.prefixes])
+
+        seen = set()
+        for name, partition in self.run(match_partition, tasks):
+            for object_hash, data in partition:
+                key = (name, object_hash)
+                if key not in seen:
+                    seen.add(key)
+                    yield name, data
+
+    def match_edges_by_index(self, edge_name, field_name, match_callback):
+        """retrieves multiple edges by indexed field in parallel
+
+        :param edge_name: the edge name or type
+        :param field_name: the name of the indexed field, ``None`` matches any field
+        :param match_callback: a picklable callable that takes the value and returns a ``bool``
+        """
+        for name, data in self.match_data(resolve_edge_name(edge_name), field_name, match_callback):
+            yield Edge.from_data(name, **data)
+
+    def match_vertices_by_index(self, vertex_name, field_name, match_callback):
+        """retrieves multiple vertices by indexed field in parallel
+
+        :param vertex_name: the vertex name or type
+        :param field_name: the name of the indexed field, ``None`` matches any field
+        :param match_callback: a picklable callable that takes the value and returns a ``bool``
+        """
+        for name, data in self.match_data(resolve_vertex_name(vertex_name), field_name, match_callback):
+            yield Vertex.from_data(name, **data)
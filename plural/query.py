@@ -33,6 +33,58 @@ class Query(object):
         return self
 
 
+class Matcher(object):
+    """callable returned by :py:class:`predicate` queries.
+
+    Besides matching values when called, it exposes the ``kind`` of
+    comparison and the ``value`` it compares against so that the store
+    can resolve it through its indexes instead of calling it for every
+    indexed value.
+    """
+    kind = None
+
+    def __init__(self, predicate, value):
+        self.predicate = predicate
+        self.value = value
+
+    def __call__(self, value):
+        return self.match(self.predicate.get_value(value))
+
+    def match(self, value):
+        raise NotImplementedError
+
+
+class Equals(Matcher):
+    kind = 'equals'
+
+    def match(self, value):
+        return value == self.value
+
+
+class StartsWith(Matcher):
+    kind = 'prefix'
+
+    def match(self, value):
+        return value.startswith(self.value)
+
+
+class Contains(Matcher):
+    kind = 'contains'
+
+    def match(self, value):
+        return self.value in value
+
+
+class RegexMatch(Matcher):
+    kind = 'regex'
+
+    def __init__(self, predicate, pattern, *args, **kw):
+        super(RegexMatch, self).__init__(predicate, re.compile(pattern, *args, **kw))
+
+    def match(self, value):
+        return bool(self.value.search(unicode(value)))
+
+
 class predicate(Query):
     """creates matchers for predicates of edges
     """
@@ -51,10 +103,9 @@ class predicate(Query):
             >>> query = predicate('email').regex.matches('@gmail.com', IGNORECASE)
         """
         if self.regex_mode:
-            regex = re.compile(pattern, *args, **kw)
-            return lambda value: bool(regex.search(unicode(self.get_value(value))))
+            return RegexMatch(self, pattern, *args, **kw)
         else:
-            return lambda value: self.get_value(value) == pattern
+            return Equals(self, pattern)
 
     def get_value(self, value):
         return is_dict(value) and value[self.name] or value
@@ -71,4 +122,15 @@ class predicate(Query):
             >>>
             >>> query2 = predicate('email').regex.matches('@(g|hot|yahoo)mail.com$', IGNORECASE)
         """
-        return lambda value: member in self.get_value(value)
+        return Contains(self, member)
+
+    def startswith(self, prefix):
+        """match if a predicate value starts with the given prefix
+
+        ::
+
+            >>> from plural.query import predicate
+            >>>
+            >>> query = predicate('name').startswith('Chuck')
+        """
+        return StartsWith(self, prefix)
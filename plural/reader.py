@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pygit2
+from functools import partial
+from collections import OrderedDict
+from fnmatch import fnmatch
+
+from plural.models.edges import Edge
+from plural.models.vertices import Vertex
+from plural.models.edges import resolve_edge_name
+from plural.models.vertices import resolve_vertex_name
+from plural.models.proxy import LazyElement
+from plural.models.proxy import LazyProjection
+from plural.index import PathEntry
+from plural.index import ValueIndex
+from plural.index import has_wildcard
+from plural.graph import DIRECTIONS
+from plural.graph import AdjacencyIndex
+from plural.graph import format_relationship_path
+
+
+class PluralReader(object):
+    """the read operations of :py:class:`~plural.store.PluralStore`
+    and :py:class:`~plural.snapshot.Snapshot`.
+
+    Subclasses provide the :py:attr:`path_index` of the paths they
+    see, :py:meth:`read_blob`, the :py:attr:`serializer` and the
+    :py:attr:`binary_format` that deserialize the objects and the
+    :py:attr:`object_cache`.
+    """
+    _value_index = None
+    _adjacency_index = None
+
+    @property
+    def path_index(self):
+        raise NotImplementedError
+
+    def read_blob(self, oid):
+        raise NotImplementedError
+
+    def schema_path(self, name, fingerprint):
+        return os.path.join(name, '_schemas', '{:08x}'.format(fingerprint))
+
+    def load_schema(self, name, fingerprint):
+        """
+        :param name: the edge name
+        :param fingerprint: ``int`` - the fingerprint of a layout
+        :returns: the field names of the layout or ``None``
+        """
+        oid = self.path_index.get(self.schema_path(name, fingerprint))
+        if oid is None:
+            return None
+
+        return self.serializer.loads(self.read_blob(oid))
+
+    @property
+    def value_index(self):
+        """the :py:class:`~plural.index.ValueIndex` of the indexed
+        predicates, used to resolve queries from :py:mod:`plural.query`
+        """
+        if self._value_index is None:
+            self._value_index = ValueIndex(self.path_index, self.read_blob)
+
+        return self._value_index
+
+    @property
+    def adjacency_index(self):
+        """the :py:class:`~plural.graph.AdjacencyIndex` of the
+        relationships written by :py:meth:`~plural.store.PluralStore.create_vertex`,
+        used by :py:meth:`neighbors`
+        """
+        if self._adjacency_index is None:
+            adjacency_index = AdjacencyIndex(self.read_blob)
+            for name in sorted(self.path_index.root.keys()):
+                for direction in DIRECTIONS:
+                    for entry in self.path_index.iter_prefix(os.sep.join([name, direction])):
+                        adjacency_index.add(entry.path, entry.oid)
+
+            self._adjacency_index = adjacency_index
+
+        return self._adjacency_index
+
+    def deserialize(self, string):
+        """deserialize a string into an object, meant for internal use only.
+
+        :param string: a hashable object
+        :returns: ``a hashable object``
+        """
+        return self.binary_format.loads(string)
+
+    def trace_path(self, entries):
+        return map(lambda entry: (entry.path, bytes(entry.oid)), entries)
+
+    def glob(self, pattern, treeish=None):
+        """matches blob paths against a ``fnmatch`` pattern
+
+        :param pattern: ``string``
+        :param treeish: an optional iterable of entries to match
+          against, defaults to the :py:attr:`path_index` of the store.
+        :returns: an iterable of entries with ``path`` and ``oid``
+        """
+        if treeish is None:
+            return self.path_index.glob(pattern)
+
+        if not has_wildcard(pattern):
+            entry = self.lookup(pattern, treeish)
+            return entry and [entry] or []
+
+        return filter(lambda entry: fnmatch(entry.path, pattern), treeish)
+
+    def lookup(self, path, treeish=None):
+        """resolves an exact blob path with a direct keyed read, without
+        scanning any entries.
+
+        :param path: ``string`` - the full path of the blob
+        :param treeish: an optional ``pygit2.Index`` or ``pygit2.Tree``,
+          defaults to the :py:attr:`path_index` of the store.
+        :returns: a :py:class:`~plural.index.PathEntry` or ``None``
+        """
+        if treeish is None:
+            oid = self.path_index.get(path)
+            return oid is not None and PathEntry(path, oid) or None
+
+        try:
+            entry = treeish[path]
+        except KeyError:
+            return None
+
+        return PathEntry(path, entry.id)
+
+    def scan_all(self, edge_name=None, treeish=None, pattern='*', fields=None, lazy=False, batch_size=256):
+        """scans all nodes
+
+        :param fields: an optional list of field names to project. Their
+          values are read from the ``indexes/<field>`` blobs of each
+          object instead of the whole object, so the yielded edges only
+          have these fields and their ``uuid``.
+        :param lazy: ``bool`` - yield proxies that only read and decode
+          the data of the edge on their first attribute access, see
+          :py:class:`~plural.models.proxy.LazyElement` and
+          :py:class:`~plural.models.proxy.LazyProjection`.
+        :param batch_size: ``int`` - how many objects to read before
+          building their edges with :py:meth:`~plural.models.element.Element.build_many`
+        :returns: a generator that produces :py:class:`Edge` instances with the scanned data
+        """
+        edge_name = resolve_edge_name(edge_name)
+        pattern = os.path.join(edge_name, 'objects', pattern)
+        batch_name = None
+        batch = []
+        for entry in self.glob(pattern, treeish):
+            name = edge_name
+            if has_wildcard(name):
+                name = entry.path.split(os.sep)[0]
+
+            if fields is not None:
+                yield self.project(name, os.path.basename(entry.path), fields, treeish, lazy)
+            elif lazy:
+                yield LazyElement(Edge.definition(name), partial(self.read_object, entry.oid))
+            else:
+                if batch and (name != batch_name or len(batch) >= batch_size):
+                    for edge in Edge.definition(batch_name).build_many(batch):
+                        yield edge
+
+                    batch = []
+
+                batch_name = name
+                batch.append(self.read_object(entry.oid))
+
+        if batch:
+            for edge in Edge.definition(batch_name).build_many(batch):
+                yield edge
+
+    def read_object(self, oid):
+        """reads and deserializes an object.
+
+        Objects are stored under the hash of their own data, so the
+        deserialized data of a blob id never changes and is kept in
+        :py:attr:`object_cache` without ever being invalidated. The
+        returned ``dict`` is shared and should not be modified.
+
+        :param oid: the blob id of an object
+        :returns: the deserialized ``dict`` of the object
+        """
+        key = getattr(oid, 'hex', oid)
+        data = self.object_cache.get(key)
+        if data is None:
+            blob = self.read_blob(oid)
+            data = self.deserialize(blob)
+            self.object_cache.set(key, data, len(blob))
+
+        return data
+
+    def read_field(self, name, object_hash, field, treeish=None):
+        """reads the value of a single field from its index blob
+
+        :param name: the edge or vertex name
+        :param object_hash: the blob id of the object
+        :param field: the field name
+        :returns: the raw value of the field or ``None``
+        """
+        entry = self.lookup(os.path.join(name, 'indexes', field, object_hash), treeish)
+        if entry is None:
+            return None
+
+        return self.read_blob(entry.oid)
+
+    def project(self, name, object_hash, fields, treeish=None, lazy=False):
+        """reads only the given fields of an object
+
+        :param name: the edge name
+        :param object_hash: the blob id of the object
+        :param fields: a list of field names
+        :param lazy: ``bool`` - return a :py:class:`~plural.models.proxy.LazyProjection`
+        :returns: an :py:class:`Edge` instance with the projected fields and the ``uuid``
+        """
+        fields = ['uuid'] + [field for field in fields if field != 'uuid']
+        read_field = partial(self.read_field, name, object_hash, treeish=treeish)
+        if lazy:
+            return LazyProjection(Edge.definition(name), fields, read_field)
+
+        data = {}
+        for field in fields:
+            value = read_field(field)
+            if value is not None:
+                data[field] = value
+
+        return Edge.from_data(name, **data)
+
+    def get_related_paths(self, name, uuid):
+        """resolves every blob path of a node with exact lookups, without
+        scanning the paths of any other node: its ``_ids``, ``_uuids``,
+        ``objects`` and ``indexes`` entries and the relationship paths
+        from :py:meth:`~plural.store.PluralStore.create_vertex` that
+        point to it or from it.
+
+        :param name: the edge or vertex name
+        :param uuid: the uuid of the node
+        :returns: a list of paths
+        """
+        paths = []
+        id_path = os.sep.join([name, '_ids', uuid])
+        oid = self.path_index.get(id_path)
+        if oid is not None:
+            object_hash = self.read_blob(oid)
+            paths.append(id_path)
+            paths.append(os.sep.join([name, '_uuids', object_hash]))
+            paths.append(os.sep.join([name, 'objects', object_hash]))
+            for field in sorted((self.path_index.subtree(os.sep.join([name, 'indexes'])) or {}).keys()):
+                paths.append(os.sep.join([name, 'indexes', field, object_hash]))
+
+        for relationship, other_uuid in self.adjacency_index.get_relationships(uuid):
+            path = format_relationship_path(relationship)
+            oid = self.path_index.get(path)
+            if oid is not None and self.read_blob(oid) == other_uuid:
+                paths.append(path)
+
+        result = []
+        for path in paths:
+            if path not in result and path in self.path_index:
+                result.append(path)
+
+        return result
+
+    def get_edge_by_uuid(self, edge_name, uuid):
+        """retrieves a edge by id
+
+        :param edge_name: the edge name or type
+        :param uuid: the uuid value
+        """
+        edge_name = resolve_edge_name(edge_name)
+        pattern = os.sep.join([edge_name, '_ids', uuid])
+        for entry in self.glob(pattern):
+            edge_blob_id = self.read_blob(entry.oid)
+            return Edge.from_data(edge_name, **self.read_object(edge_blob_id))
+
+    def get_edges_by_uuids(self, edge_name, uuids):
+        """retrieves many edges of the same type by id, resolving all
+        the uuids against the ``_ids`` tree in a single pass.
+
+        :param edge_name: the edge name or type
+        :param uuids: an iterable of uuid values
+        :returns: a list of :py:class:`Edge` in the same order of the
+          given uuids, unknown uuids are skipped.
+        """
+        edge_name = resolve_edge_name(edge_name)
+        Definition = Edge.definition(edge_name)
+        ids = self.path_index.subtree(os.sep.join([edge_name, '_ids'])) or {}
+
+        rows = []
+        for uuid in uuids:
+            oid = ids.get(uuid)
+            if oid is None or isinstance(oid, dict):
+                continue
+
+            edge_blob_id = self.read_blob(oid)
+            rows.append(self.read_object(edge_blob_id))
+
+        return Definition.build_many(rows)
+
+    def get_vertex_by_uuid(self, vertex_name, uuid):
+        """retrieves a vertex by id
+
+        :param vertex_name: the vertex name or type
+        :param uuid: the uuid value
+        """
+        vertex_name = resolve_vertex_name(vertex_name)
+        pattern = os.sep.join([vertex_name, '_ids', uuid])
+        for entry in self.glob(pattern):
+            vertex_blob_id = self.read_blob(entry.oid)
+            return Vertex.from_data(vertex_name, **self.read_object(vertex_blob_id))
+
+    def match_object_hashes(self, name, field_name, match_callback):
+        """resolves the objects whose indexed field matches a query.
+
+        Queries built with :py:class:`plural.query.predicate` that
+        compare by equality or prefix are answered straight from the
+        :py:attr:`value_index`, any other callable is called once per
+        distinct value of the field.
+
+        :param name: the edge or vertex name, ``*`` matches all of them
+        :param field_name: the field name, ``None`` matches all of them
+        :param match_callback: a callable that takes the value and returns a ``bool``
+        :returns: a generator of ``(name, object_hash)`` tuples
+        """
+        if name == '*':
+            names = sorted(self.path_index.root.keys())
+        else:
+            names = [name]
+
+        kind = getattr(match_callback, 'kind', None)
+        value = getattr(match_callback, 'value', None)
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+
+        for name in names:
+            if field_name:
+                fields = [field_name]
+            else:
+                fields = sorted((self.path_index.subtree(os.sep.join([name, 'indexes'])) or {}).keys())
+
+            object_hashes = set()
+            for field in fields:
+                if kind == 'equals' and isinstance(value, str):
+                    value_oid = pygit2.hash(value)
+                    object_hashes.update(self.value_index.equals(name, field, value_oid))
+                elif kind == 'prefix' and isinstance(value, str):
+                    object_hashes.update(self.value_index.startswith(name, field, value))
+                else:
+                    object_hashes.update(self.value_index.match(name, field, match_callback))
+
+            for object_hash in object_hashes:
+                yield name, object_hash
+
+    def match_edges_by_index(self, edge_name, field_name, match_callback):
+        """retrieves multiple edges by indexed field
+
+        :param edge_name: the edge name or type
+        :param field_name: the name of the indexed field
+        :param match_callback: a callable that takes the value and returns a ``bool``
+        """
+        edge_name = resolve_edge_name(edge_name)
+        for edge_name, blob_id in self.match_object_hashes(edge_name, field_name, match_callback):
+            data = self.read_object(blob_id)
+            Definition = Edge.definition(edge_name)
+            yield Definition(**data)
+
+    def match_vertices_by_index(self, vertex_name, field_name, match_callback):
+        """retrieves multiple vertices by indexed field
+
+        :param vertex_name: the vertex name or type
+        :param field_name: the name of the indexed field
+        :param match_callback: a callable that takes the value and returns a ``bool``
+        """
+        vertex_name = resolve_vertex_name(vertex_name)
+        for vertex_name, blob_id in self.match_object_hashes(vertex_name, field_name, match_callback):
+            data = self.read_object(blob_id)
+            Definition = Vertex.definition(vertex_name)
+            yield Definition(**data)
+
+    def neighbors(self, edge_or_uuid, label=None, direction=None):
+        """retrieves the nodes one hop away from an edge, in time
+        proportional to its number of relationships.
+
+        :param edge_or_uuid: an :py:class:`Edge` or its uuid
+        :param label: an optional relationship label
+        :param direction: an optional relationship direction: ``incoming``, ``outgoing`` or ``indirect``
+        :returns: a list of :py:class:`~plural.graph.Neighbor`
+        """
+        uuid = getattr(edge_or_uuid, 'uuid', edge_or_uuid)
+        return self.adjacency_index.neighbors(uuid, label=label, direction=direction)
+
+    def traverse(self, start, pattern=None, max_depth=None, resolve=False, batch_size=256):
+        """walks the relationships of an edge breadth-first, streaming
+        every node reachable within ``max_depth`` hops once, see
+        :py:meth:`~plural.graph.AdjacencyIndex.traverse`.
+
+        :param start: an :py:class:`Edge` or its uuid
+        :param pattern: an optional list of ``(label, direction)`` tuples, one per hop
+        :param max_depth: ``int`` - defaults to the length of the pattern or ``1``
+        :param resolve: ``bool`` - read the edges of each batch of nodes,
+          with one :py:meth:`get_edges_by_uuids` per edge name, into
+          the ``edge`` of the yielded hops
+        :param batch_size: ``int`` - how many nodes to resolve at once
+        :returns: a generator of :py:class:`~plural.graph.Hop`
+        """
+        uuid = getattr(start, 'uuid', start)
+        batches = self.adjacency_index.traverse(uuid, pattern=pattern, max_depth=max_depth, batch_size=batch_size)
+        for batch in batches:
+            if resolve:
+                edges = {}
+                uuids_by_name = OrderedDict()
+                for hop in batch:
+                    uuids_by_name.setdefault(hop.name, []).append(hop.uuid)
+
+                for name, uuids in uuids_by_name.items():
+                    for edge in self.get_edges_by_uuids(name, uuids):
+                        edges[edge.uuid] = edge
+
+                batch = [hop._replace(edge=edges.get(hop.uuid)) for hop in batch]
+
+            for hop in batch:
+                yield hop
+
+    def shortest_path(self, start, end, pattern=None, max_depth=6):
+        """
+        :param start: an :py:class:`Edge` or its uuid
+        :param end: an :py:class:`Edge` or its uuid
+        :param pattern: an optional list of ``(label, direction)`` tuples, one per hop
+        :param max_depth: ``int`` - the maximum number of hops
+        :returns: the list of uuids of one of the shortest paths from
+          ``start`` to ``end``, both included, or ``None``
+        """
+        return self.adjacency_index.shortest_path(
+            getattr(start, 'uuid', start),
+            getattr(end, 'uuid', end),
+            pattern=pattern,
+            max_depth=max_depth,
+        )
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from collections import OrderedDict
+
+from plural.util import AutoCodec
+from plural.exceptions import SerializerNotAvailable
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:  # pragma: no cover
+    simplejson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+NATIVE_TYPES = (basestring, bool, int, long, float, type(None))
+
+
+def canonical(value):
+    """converts a value into plain types with all the dict keys sorted,
+    so that serializers that keep the order of mappings produce the
+    same bytes for equal data.
+
+    :param value: the value
+    :returns: the converted value
+    """
+    if isinstance(value, dict):
+        return OrderedDict([(key, canonical(value[key])) for key in sorted(value)])
+
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+
+    if isinstance(value, NATIVE_TYPES):
+        return value
+
+    return canonical(AutoCodec().encode(value))
+
+
+class Serializer(object):
+    """turns the data of objects into the bytes of their blobs and back.
+
+    The blob id of an object is the hash of its bytes, so
+    :py:meth:`dumps` must always produce the same bytes for equal data.
+    """
+    name = None
+
+    def dumps(self, data):
+        raise NotImplementedError
+
+    def loads(self, blob):
+        raise NotImplementedError
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+
+class JSONSerializer(Serializer):
+    """sorted-key JSON through the standard library, reusing the same
+    encoder and decoder instead of creating new ones on every call."""
+    name = 'json'
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(sort_keys=True, default=AutoCodec().encode)
+        self.decoder = json.JSONDecoder()
+
+    def dumps(self, data):
+        return self.encoder.encode(data)
+
+    def loads(self, blob):
+        return self.decoder.decode(blob)
+
+
+class UJSONSerializer(JSONSerializer):
+    """writes the same canonical JSON as :py:class:`JSONSerializer` and
+    reads it with ``ujson``"""
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise SerializerNotAvailable('the ujson serializer requires the "ujson" package')
+
+        super(UJSONSerializer, self).__init__()
+
+    def loads(self, blob):
+        return ujson.loads(blob, precise_float=True)
+
+
+class SimpleJSONSerializer(JSONSerializer):
+    """writes the same canonical JSON as :py:class:`JSONSerializer` and
+    reads it with ``simplejson``"""
+    name = 'simplejson'
+
+    def __init__(self):
+        if simplejson is None:
+            raise SerializerNotAvailable('the simplejson serializer requires the "simplejson" package')
+
+        super(SimpleJSONSerializer, self).__init__()
+        self.decoder = simplejson.JSONDecoder()
+
+
+class MsgPackSerializer(Serializer):
+    """``msgpack`` maps with sorted keys. Blobs written as JSON can
+    still be read."""
+    name = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise SerializerNotAvailable('the msgpack serializer requires the "msgpack" package')
+
+        self.json = JSONSerializer()
+
+    def dumps(self, data):
+        return msgpack.packb(canonical(data), use_bin_type=True)
+
+    def loads(self, blob):
+        if blob[:1] == b'{':
+            return self.json.loads(blob)
+
+        return msgpack.unpackb(blob, raw=False)
+
+
+SERIALIZERS = OrderedDict([(cls.name, cls) for cls in (
+    JSONSerializer,
+    UJSONSerializer,
+    SimpleJSONSerializer,
+    MsgPackSerializer,
+)])
+
+
+def get_serializer(serializer):
+    """
+    :param serializer: a :py:class:`Serializer` instance or the name of one
+    :returns: a :py:class:`Serializer` instance
+    """
+    if isinstance(serializer, Serializer):
+        return serializer
+
+    if serializer not in SERIALIZERS:
+        raise SerializerNotAvailable('unknown serializer {}, options: {}'.format(repr(serializer), ', '.join(SERIALIZERS)))
+
+    return SERIALIZERS[serializer]()
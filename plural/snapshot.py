@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from plural.index import TreeIndex
+from plural.reader import PluralReader
+from plural.binary import BinaryFormat
+
+
+class Snapshot(PluralReader):
+    """read-only view of a :py:class:`~plural.store.PluralStore` at a
+    commit, created by :py:meth:`~plural.store.PluralStore.snapshot`.
+
+    Reads only see the tree of the commit, never the paths staged or
+    committed afterwards, and never touch the index or the lock of the
+    store, so many threads can read from the same snapshot while
+    another one keeps writing. Deserialized objects are shared with
+    the :py:attr:`~plural.store.PluralStore.object_cache` of the store.
+
+    :param store: a :py:class:`~plural.store.PluralStore`
+    :param commit: a ``pygit2.Commit`` or ``None`` for an empty snapshot
+    """
+
+    def __init__(self, store, commit=None):
+        self.store = store
+        self.repository = store.repository
+        self.commit = commit
+        self.serializer = store.serializer
+        self.object_cache = store.object_cache
+        self.binary_format = BinaryFormat(
+            store.serializer,
+            load_schema=self.load_schema,
+            schemas=store.binary_format.schemas,
+        )
+        self._path_index = TreeIndex(self.repository, commit is not None and commit.tree or None)
+
+    @property
+    def commit_id(self):
+        """the id of the commit or ``None``"""
+        return self.commit is not None and self.commit.id or None
+
+    @property
+    def path_index(self):
+        """the :py:class:`~plural.index.TreeIndex` of the tree of the commit"""
+        return self._path_index
+
+    def read_blob(self, oid):
+        """
+        :param oid: a blob id
+        :returns: ``bytes`` - the data of the blob
+        """
+        return self.repository[oid].data
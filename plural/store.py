@@ -17,15 +17,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import json
 import pygit2
-from fnmatch import fnmatch
+import threading
+from collections import OrderedDict
 
-from pygit2 import GIT_FILEMODE_BLOB
 from pygit2 import GIT_RESET_HARD
+from pygit2 import GIT_DELTA_DELETED
 from pygit2 import init_repository
-from pygit2 import IndexEntry
 from pygit2 import Signature
+from plural.models.meta.edges import SUBJECTS
 from plural.models.meta.edges import edge_has_index
 from plural.models.meta.vertices import vertex_has_index
 from plural.models.meta.edges import is_edge_subclass
@@ -34,24 +34,79 @@ from plural.models.edges import Edge
 from plural.models.vertices import Vertex
 from plural.models.edges import resolve_edge_name
 from plural.models.vertices import resolve_vertex_name
+from plural.models.element import AUTO_CODEC
+from plural.models.proxy import LazyProjection
+from plural.index import PathIndex
+from plural.index import parse_index_path
+from plural.pack import PackWriter
+from plural.reader import PluralReader
+from plural.snapshot import Snapshot
+from plural.cache import LRUCache
+from plural.serializer import get_serializer
+from plural.binary import BinaryFormat
+from plural.binary import is_native
+from plural.parallel import ParallelQuery
+from plural.concurrency import CommitFuture
+from plural.concurrency import GroupCommitter
+from plural.concurrency import synchronized
 from plural.util import generate_uuid
 from plural.util import serialize_commit
-from plural.util import AutoCodec
+from plural.util import write_tree
+from plural.util import checkout_changes
+from plural.util import diff_trees
 
 
-class PluralStore(object):
+class PluralStore(PluralReader):
     """Data store that manipulates a single git repository
 
     :param path: ``bytes`` - the path to the git repository ``string``
     :param bare: ``bool`` - manipulate git objects only
     :param author_name: ``unicode`` - the name of the default git author.
     :param author_email: ``unicode`` - the email of the default git author.
+    :param pack_threshold: ``int`` - the number of new blobs in a
+      transaction from which they are written to the object database
+      as a single packfile at :py:meth:`commit` time instead of as
+      loose objects. ``None`` writes every blob as a loose object
+      right away. The packfiles are never consolidated, run ``git
+      gc`` on the repository from time to time.
+    :param blob_id_cache_size: ``int`` - how many of the most recently
+      written field values to remember the blob id of, see :py:meth:`create_blob`.
+    :param checkout: how :py:meth:`commit` updates the working
+      directory of non-bare stores: ``'changed'`` only writes and
+      removes the files changed by the commit, ``'hard'`` resets the
+      whole working directory and ``None`` leaves it untouched, only
+      updating the branch and the index.
+    :param object_cache_size: ``int`` - how many deserialized objects
+      to keep in :py:attr:`object_cache`, see :py:meth:`read_object`.
+    :param object_cache_max_bytes: ``int`` - the maximum total size,
+      in serialized bytes, of the objects kept in :py:attr:`object_cache`.
+    :param serializer: the name of the
+      :py:class:`~plural.serializer.Serializer` of the objects, one of
+      ``json``, ``ujson``, ``simplejson`` or ``msgpack``, or an
+      instance of one. The blob ids of the objects depend on it, so a
+      repository should always be written with the same serializer.
+    :param group_commit_delay: ``float`` - enables group commit: the
+      commits requested through :py:meth:`commit_async` within this
+      many seconds of each other are made as a single git commit.
+      ``None`` commits every request right away.
+    :param group_commit_size: ``int`` - the maximum number of commit
+      requests in a group commit.
     """
+    max_cached_value_size = 256
+
     def __init__(self, path=None, bare=False,
                  author_name='hexastore',
                  author_email='hexastore@git',
                  default_branch='refs/heads/master',
-                 repository=None):
+                 repository=None,
+                 pack_threshold=256,
+                 blob_id_cache_size=4096,
+                 checkout='changed',
+                 object_cache_size=4096,
+                 object_cache_max_bytes=64 * 1024 * 1024,
+                 serializer='json',
+                 group_commit_delay=None,
+                 group_commit_size=64):
         path = path or self.__class__.__name__.lower()
         self.path = path
         self.bare = bare
@@ -60,6 +115,274 @@ class PluralStore(object):
         self.commiter = Signature(author_name, author_email)
         self.queries = []
         self.default_branch = default_branch
+        self.pack_threshold = pack_threshold
+        self.checkout = checkout
+        self.serializer = get_serializer(serializer)
+        self.binary_format = BinaryFormat(self.serializer, load_schema=self.load_schema)
+        self.written_schemas = set()
+        self.lock = threading.RLock()
+        self.group_committer = None
+        if group_commit_delay is not None:
+            self.group_committer = GroupCommitter(
+                self.commit_group, self.lock,
+                delay=group_commit_delay,
+                max_size=group_commit_size,
+            )
+        self.pack = PackWriter()
+        self.staged = OrderedDict()
+        self.blob_id_cache = LRUCache(blob_id_cache_size)
+        self.object_cache = LRUCache(object_cache_size, max_size=object_cache_max_bytes)
+        self._path_index = None
+        self._value_index = None
+        self._adjacency_index = None
+        self.indexed_commit = None
+        self.stale_index = False
+
+    @property
+    def path_index(self):
+        """the :py:class:`~plural.index.PathIndex` of all the blob paths
+        of the repository index and of the :py:attr:`staged` paths,
+        built once on first use and kept up to date by the store as
+        entries are added or removed.
+        """
+        if self._path_index is None:
+            self.sync_index()
+            self.read_head_tree()
+            self._path_index = PathIndex.from_index(self.repository.index)
+            for path, oid in self.staged.items():
+                if oid is None:
+                    self._path_index.remove(path)
+                else:
+                    self._path_index.add(path, oid)
+
+        return self._path_index
+
+    def get_head_commit_id(self):
+        """
+        :returns: the id of the commit of ``HEAD`` or ``None`` in an empty repository
+        """
+        if self.repository.head_is_unborn:
+            return None
+
+        return self.repository.head.target
+
+    def sync_index(self):
+        """resets the repository index to the tree of
+        :py:attr:`indexed_commit` when :py:meth:`refresh` moved it.
+        """
+        if self.stale_index:
+            self.repository.index.read_tree(self.repository[self.indexed_commit].tree)
+            self.stale_index = False
+
+    def read_head_tree(self):
+        """reads the tree of ``HEAD`` into the repository index the first
+        time the store uses it, when the store is bare or the index is
+        empty, so a reopened store reads and commits on top of the data
+        that is already committed.
+        """
+        if self.indexed_commit is not None:
+            return
+
+        head = self.get_head_commit_id()
+        if head is None:
+            return
+
+        index = self.repository.index
+        if self.bare or not len(index):
+            index.read_tree(self.repository[head].tree)
+
+        self.indexed_commit = head
+
+    def refresh(self):
+        """catches up with the commits made by other processes or
+        stores since the :py:attr:`path_index` was built or last
+        refreshed.
+
+        Only the paths that differ between the tree of
+        :py:attr:`indexed_commit` and the tree of ``HEAD`` are applied
+        to the in-memory indexes, paths staged by this store are left
+        as they are. The repository index is only reset to the new
+        tree before the next write.
+
+        :returns: ``int`` - the number of changed paths
+        """
+        with self.lock:
+            head = self.get_head_commit_id()
+            if head is None or head == self.indexed_commit:
+                return 0
+
+            count = 0
+            if self._path_index is not None:
+                old_tree = None
+                if self.indexed_commit is not None:
+                    old_tree = self.repository[self.indexed_commit].tree
+
+                for delta in diff_trees(old_tree, self.repository[head].tree).deltas:
+                    if delta.status == GIT_DELTA_DELETED:
+                        path = delta.old_file.path
+                        if path not in self.staged:
+                            self.unindex_path(path)
+                    else:
+                        path = delta.new_file.path
+                        if path not in self.staged:
+                            self.index_path(path, delta.new_file.id)
+
+                    count += 1
+
+            self.indexed_commit = head
+            self.stale_index = True
+            return count
+
+    def read_blob(self, oid):
+        """
+        :param oid: a blob id
+        :returns: ``bytes`` - the data of the blob, including the blobs
+          buffered by the current transaction.
+        """
+        if self.pack:
+            data = self.pack.get(oid)
+            if data is not None:
+                return data
+
+        return self.repository[oid].data
+
+    def create_blob(self, data, packed=False, cached=False):
+        """creates a blob, buffering it until the next :py:meth:`commit`
+        unless ``pack_threshold`` is ``None``.
+
+        With ``cached`` the blob ids of values up to
+        ``max_cached_value_size`` bytes are kept in
+        :py:attr:`blob_id_cache`, so repeated values skip the hashing
+        and the write altogether. Its ``hits`` and ``misses`` counters
+        tell how effective it is.
+
+        :param data: ``bytes``
+        :param packed: ``bool`` - always buffer the blob to be packed
+        :param cached: ``bool`` - whether the value is likely to be
+          repeated, like the field values, as opposed to the uuids and
+          objects that are unique to each node
+        :returns: the blob id
+        """
+        cacheable = cached and isinstance(data, basestring) and len(data) <= self.max_cached_value_size
+        if cacheable:
+            blob_id = self.blob_id_cache.get(data)
+            if blob_id is not None:
+                return blob_id
+
+        if packed or self.pack_threshold is not None:
+            blob_id = self.pack.add_blob(data)
+        else:
+            blob_id = self.repository.create_blob(data)
+
+        if cacheable:
+            self.blob_id_cache.set(data, blob_id)
+
+        return blob_id
+
+    def write_objects(self, packed=False):
+        """writes the blobs buffered by the current transaction into the
+        object database, as a single packfile when there are at least
+        ``pack_threshold`` of them or as loose objects otherwise.
+
+        :param packed: ``bool`` - always write a packfile
+        """
+        if packed or len(self.pack) >= (self.pack_threshold or 0):
+            self.pack.write(self.repository)
+        else:
+            for data in self.pack.objects.values():
+                self.repository.create_blob(data)
+
+            self.pack.clear()
+
+    def index_path(self, path, oid):
+        """registers a blob path in the in-memory indexes of the store
+
+        :param path: ``string`` - the full path of the blob
+        :param oid: the blob id
+        """
+        if self._path_index is None:
+            return
+
+        previous = self._path_index.get(path)
+        self._path_index.add(path, oid)
+        if self._value_index is not None:
+            if previous is not None:
+                self._value_index.remove(path, previous)
+            self._value_index.add(path, oid)
+        if self._adjacency_index is not None:
+            if previous is not None:
+                self._adjacency_index.remove(path, previous)
+            self._adjacency_index.add(path, oid)
+
+    def unindex_path(self, path):
+        """removes a blob path from the in-memory indexes of the store
+
+        :param path: ``string`` - the full path of the blob
+        """
+        if self._path_index is None:
+            return
+
+        oid = self._path_index.remove(path)
+        if oid is not None and self._value_index is not None:
+            self._value_index.remove(path, oid)
+        if oid is not None and self._adjacency_index is not None:
+            self._adjacency_index.remove(path, oid)
+
+    def stage(self, path, oid):
+        """stages a blob path for the next :py:meth:`commit`.
+
+        Staged paths are kept in :py:attr:`staged` and only applied to
+        the repository index, in a single batch, by
+        :py:meth:`write_index`. Reads see them right away through the
+        :py:attr:`path_index`.
+
+        :param path: ``string`` - the full path of the blob
+        :param oid: the blob id, or ``None`` to remove the path
+        """
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+
+        self.staged[path] = oid
+        if oid is None:
+            self.unindex_path(path)
+        else:
+            self.index_path(path, oid)
+
+    def remove_path(self, path):
+        """stages the removal of a blob path
+
+        :param path: ``string`` - the full path of the blob
+        """
+        self.stage(path, None)
+
+    def write_index(self, trees=None):
+        """writes the buffered blobs and applies all the staged paths on
+        top of the tree of the repository index, then reads the
+        resulting tree back into the index, which is also saved to
+        disk for non-bare stores.
+
+        :param trees: an optional ``dict`` of paths nested by tree,
+          applied after the staged paths, see :py:func:`~plural.util.write_tree`
+        :returns: the id of the tree
+        """
+        self.write_objects()
+        self.sync_index()
+        self.read_head_tree()
+        index = self.repository.index
+        if not self.staged and not trees:
+            return index.write_tree()
+
+        base_tree = None
+        if len(index):
+            base_tree = self.repository[index.write_tree()]
+
+        tree_id = write_tree(self.repository, self.staged, base_tree, trees)
+        index.read_tree(tree_id)
+        if not self.bare:
+            index.write()
+
+        self.staged.clear()
+        return tree_id
 
     def add_remote(self, name, url):
         """adds a remote repository
@@ -69,22 +392,84 @@ class PluralStore(object):
         """
         self.repository.remotes.create(name, url)
 
-    def serialize(self, obj):
+    def serialize(self, obj, name=None):
         """serializes an object, meant for internal use only.
 
+        Objects of edges declared with ``object_format = 'binary'``
+        are written with :py:attr:`binary_format`.
+
         :param obj: a hashable object
+        :param name: the optional name of the edge of the object
         :returns: ``string``
         """
-        default = AutoCodec().encode
-        return json.dumps(obj, sort_keys=True, default=default)
+        Definition = SUBJECTS.get(name)
+        if Definition is None or Definition.object_format != 'binary':
+            return self.serializer.dumps(obj)
+
+        layout = Definition.__layout__
+        self.write_schema(name, layout)
+        return self.binary_format.dumps_layout(name, layout, obj)
+
+    def encode_fields(self, name, obj):
+        """encodes the field values of an object with the codecs of its
+        definition, meant for internal use only.
+
+        :param name: the edge name
+        :param obj: a ``dict`` with the field values, either decoded or encoded
+        :returns: a tuple ``(values, encoded)`` with the values of the
+          object blob and the encoded values of the ``indexes/<field>``
+          blobs. Objects of edges declared with ``object_format =
+          'binary'`` keep their dates and numbers decoded, so they are
+          written with the native types of :py:attr:`binary_format`.
+        """
+        Definition = SUBJECTS.get(name)
+        if Definition is None:
+            return obj, obj
+
+        codecs = Definition.__codecs__
+        binary = Definition.object_format == 'binary'
+        values = {}
+        encoded = {}
+        for key, value in obj.items():
+            codec = codecs.get(key, AUTO_CODEC)
+            value = codec.decode(value)
+            encoded[key] = codec.encode(value)
+            if binary and is_native(value):
+                values[key] = value
+            else:
+                values[key] = encoded[key]
+
+        return values, encoded
+
+    def write_schema(self, name, layout):
+        """stages the ``<Edge>/_schemas/<fingerprint>`` blob with the
+        field names of a layout written by :py:attr:`binary_format`,
+        so its objects can still be read after the definition changes.
+
+        :param name: the edge name
+        :param layout: a tuple of field names
+        """
+        fingerprint = self.binary_format.register(name, layout)
+        if (name, fingerprint) in self.written_schemas:
+            return
 
-    def deserialize(self, string):
-        """deserialize a string into an object, meant for internal use only.
+        path = self.schema_path(name, fingerprint)
+        if path not in self.path_index:
+            self.stage(path, self.create_blob(self.serializer.dumps(list(layout))))
 
-        :param string: a hashable object
-        :returns: ``a hashable object``
+        self.written_schemas.add((name, fingerprint))
+
+    def load_schemas(self):
+        """registers all the ``<Edge>/_schemas`` layouts of the
+        repository in :py:attr:`binary_format`, so that copies of it
+        sent to other processes can read every binary object.
         """
-        return json.loads(string)
+        for name, Definition in SUBJECTS.items():
+            if Definition.object_format != 'binary':
+                continue
+
+            for entry in self.path_index.iter_prefix(os.path.join(name, '_schemas')):
+                self.binary_format.register(name, self.serializer.loads(self.read_blob(entry.oid)))
 
     def iter_versions(self, branch='master'):
         """iterates over all the commits of the repo
@@ -102,7 +487,9 @@ class PluralStore(object):
         return results
 
     def add_spo(self, edge, predicate, data):
-        """creates a staged entry of edge, predicate and object
+        """creates a staged entry of edge, predicate and object, the
+        blob ids of the ``indexes/<field>`` values other than the
+        ``uuid`` are cached, see :py:meth:`create_blob`.
 
         :param edge:
         :param predicate:
@@ -110,9 +497,10 @@ class PluralStore(object):
         :returns: ``bytes`` - the blob id
         """
         edge = resolve_edge_name(edge)
-        blob_id = self.repository.create_blob(data)
-        entry = IndexEntry(os.path.join(edge, predicate), blob_id, GIT_FILEMODE_BLOB)
-        self.repository.index.add(entry)
+        path = os.path.join(edge, predicate)
+        key, object_hash = parse_index_path(path)
+        blob_id = self.create_blob(data, cached=key is not None and key[1] != 'uuid')
+        self.stage(path, blob_id)
         return blob_id
 
     def create(self, element, **obj):
@@ -137,38 +525,55 @@ class PluralStore(object):
         :returns: an instance of the given vertex
 
         """
-        vertex = resolve_vertex_name(vertex)
-        predicate_ids = []
+        with self.lock:
+            vertex = resolve_vertex_name(vertex)
+            predicate_ids = []
 
-        vertex_uuid = obj.pop('uuid', generate_uuid())
-        obj['uuid'] = vertex_uuid
+            vertex_uuid = obj.pop('uuid', generate_uuid())
+            obj['uuid'] = vertex_uuid
 
-        vertex_data = self.serialize(obj)
-        object_hash = bytes(pygit2.hash(vertex_data))
-        object_path = os.path.join(vertex, 'objects')
+            vertex_data = self.serialize(obj)
+            object_hash = bytes(pygit2.hash(vertex_data))
+            object_path = os.path.join(vertex, 'objects')
 
-        id_path = os.path.join(vertex, '_ids')
-        uuid_path = os.path.join(vertex, '_uuids')
+            id_path = os.path.join(vertex, '_ids')
+            uuid_path = os.path.join(vertex, '_uuids')
 
-        original_obj = obj.copy()
-        origin = obj.pop('origin')
-        target = obj.pop('target')
+            original_obj = obj.copy()
+            origin = obj.pop('origin')
+            target = obj.pop('target')
 
-        indexes = {}
-        for key in obj.keys():
-            value = obj.get(key, None)
-            if vertex_has_index(vertex, key):
-                indexes[key] = value
+            indexes = {}
+            for key in obj.keys():
+                value = obj.get(key, None)
+                if vertex_has_index(vertex, key):
+                    indexes[key] = value
+
+                predicate_path = os.path.join(vertex, 'indexes', key)
+                predicate_ids.append(self.add_spo(predicate_path, object_hash, value))
 
-            predicate_path = os.path.join(vertex, 'indexes', key)
-            predicate_ids.append(self.add_spo(predicate_path, object_hash, value))
+            self.add_spo(id_path, vertex_uuid, object_hash)
+            self.add_spo(uuid_path, object_hash, vertex_uuid)
 
-        self.add_spo(id_path, vertex_uuid, object_hash)
-        self.add_spo(uuid_path, object_hash, vertex_uuid)
+            # self.add_spo(object_path, object_hash, vertex_data)
+            for path, from_uuid, to_uuid in self.get_relationship_paths(vertex, origin, target):
+                self.add_spo(path, from_uuid, to_uuid)
 
+            return Vertex.from_data(vertex, **original_obj)
+
+    def get_relationship_paths(self, vertex, origin, target):
+        """the relationship paths that :py:meth:`create_vertex` writes
+        between two edges
+
+        :param vertex: the vertex name or type
+        :param origin: the origin :py:class:`Edge`
+        :param target: the target :py:class:`Edge`
+        :returns: a list of ``(path, from_uuid, to_uuid)`` tuples, the
+          blob of ``<path>/<from_uuid>`` is the ``to_uuid``
+        """
         origin_name = resolve_edge_name(origin)
         target_name = resolve_edge_name(target)
-        RelationhipModel = Vertex.definition(vertex)
+        RelationhipModel = Vertex.definition(resolve_vertex_name(vertex))
 
         label = RelationhipModel.label
         # call('Car/incoming/bought_by/Person', 'chuck-uuid', 'car-uuid'),
@@ -184,35 +589,41 @@ class PluralStore(object):
             'label': label
         }
         direction = RelationhipModel.direction
-        # self.add_spo(object_path, object_hash, vertex_data)
 
         if direction == 'incoming':
-            from_uuid = origin.uuid
             ctx['from'] = origin_name
-            to_uuid = target.uuid
             ctx['to'] = target_name
-            vertex_path = vertex_path_template.format(**ctx)
-            self.add_spo(vertex_path, from_uuid, to_uuid)
+            return [(vertex_path_template.format(**ctx), origin.uuid, target.uuid)]
 
         elif direction == 'outgoing':
-            from_uuid = target.uuid
             ctx['from'] = target_name
-            to_uuid = origin.uuid
             ctx['to'] = origin_name
-            vertex_path = vertex_path_template.format(**ctx)
-            self.add_spo(vertex_path, from_uuid, to_uuid)
+            return [(vertex_path_template.format(**ctx), target.uuid, origin.uuid)]
 
         elif direction == 'indirect':
-            from_uuid = target.uuid
-            to_uuid = origin.uuid
+            return [
+                (vertex_path_template.format(target_name, origin_name, **ctx), target.uuid, origin.uuid),
+                (vertex_path_template.format(origin_name, target_name, **ctx), origin.uuid, target.uuid),
+            ]
 
-            path = vertex_path_template.format(target_name, origin_name, **ctx)
-            self.add_spo(path, from_uuid, to_uuid)
+        return []
 
-            path = vertex_path_template.format(origin_name, target_name, **ctx)
-            self.add_spo(path, to_uuid, from_uuid)
+    def get_vertex_paths(self, vertex):
+        """resolves every blob path of a vertex: the paths of
+        :py:meth:`get_related_paths` and the relationship paths between
+        its origin and target that still point to its target.
+
+        :param vertex: a :py:class:`Vertex` instance
+        :returns: a list of paths
+        """
+        paths = self.get_related_paths(resolve_vertex_name(vertex), vertex.uuid)
+        for path, from_uuid, to_uuid in self.get_relationship_paths(vertex, vertex._origin, vertex._target):
+            path = os.path.join(path, from_uuid)
+            oid = self.path_index.get(path)
+            if oid is not None and self.read_blob(oid) == to_uuid:
+                paths.append(path)
 
-        return RelationhipModel.from_data(vertex, **original_obj)
+        return paths
 
     def create_edge(self, edge, **obj):
         """creates a staged edge entry including its indexed fields.
@@ -222,43 +633,157 @@ class PluralStore(object):
         :returns: an instance of the given edge
 
         """
-        predicate_ids = []
+        with self.lock:
+            predicate_ids = []
 
-        edge = resolve_edge_name(edge)
-        edge_uuid = obj.pop('uuid', generate_uuid())
-        obj['uuid'] = edge_uuid
+            edge = resolve_edge_name(edge)
+            edge_uuid = obj.pop('uuid', generate_uuid())
+            obj['uuid'] = edge_uuid
 
-        edge_data = self.serialize(obj)
-        object_hash = bytes(pygit2.hash(edge_data))
-        object_path = os.path.join(edge, 'objects')
+            values, encoded = self.encode_fields(edge, obj)
+            edge_data = self.serialize(values, edge)
+            object_hash = bytes(pygit2.hash(edge_data))
+            object_path = os.path.join(edge, 'objects')
 
-        id_path = os.path.join(edge, '_ids')
-        uuid_path = os.path.join(edge, '_uuids')
+            id_path = os.path.join(edge, '_ids')
+            uuid_path = os.path.join(edge, '_uuids')
 
-        indexes = {}
-        for key in obj.keys():
-            value = obj.get(key, None)
-            if edge_has_index(edge, key):
-                indexes[key] = value
+            indexes = {}
+            for key in obj.keys():
+                value = encoded.get(key, None)
+                if edge_has_index(edge, key):
+                    indexes[key] = value
+
+                predicate_path = os.path.join(edge, 'indexes', key)
+                predicate_ids.append(self.add_spo(predicate_path, object_hash, value))
+
+            self.add_spo(object_path, object_hash, edge_data)
+            self.add_spo(id_path, edge_uuid, object_hash)
+            self.add_spo(uuid_path, object_hash, edge_uuid)
+
+            return Edge.from_data(edge, **encoded)
+
+    def update_edge(self, edge, uuid, changes):
+        """stages the changes of the fields of an existing edge.
+
+        The object hash of the edge changes with its data, so all its
+        entries move to the new hash, but the blobs of the fields that
+        did not change are reused as they are and only the new values
+        and the object itself are written.
+
+        :param edge: the edge name or type
+        :param uuid: the uuid of the edge
+        :param changes: a ``dict`` with the new field values, encoded
+          with the codecs of the definition like in :py:meth:`create_edge`
+        :returns: the updated edge or ``None`` if it does not exist
+        """
+        edge = resolve_edge_name(edge)
+        with self.lock:
+            id_path = os.path.join(edge, '_ids', uuid)
+            id_blob_id = self.path_index.get(id_path)
+            if id_blob_id is None:
+                return None
+
+            old_hash = self.read_blob(id_blob_id)
+            old_obj = self.read_object(old_hash)
+            obj = dict(old_obj)
+            obj.update(changes)
+            obj['uuid'] = uuid
+
+            values, encoded = self.encode_fields(edge, obj)
+            edge_data = self.serialize(values, edge)
+            object_hash = bytes(pygit2.hash(edge_data))
+            if object_hash == old_hash:
+                return Edge.from_data(edge, **encoded)
+
+            # every blob is written before staging any path, so a value
+            # that cannot be written leaves the edge untouched
+            entries = []
+            for key, value in encoded.items():
+                blob_id = None
+                if key not in changes:
+                    blob_id = self.path_index.get(os.path.join(edge, 'indexes', key, old_hash))
+                if blob_id is None:
+                    blob_id = self.create_blob(value, cached=key != 'uuid')
+
+                entries.append((os.path.join(edge, 'indexes', key, object_hash), blob_id))
+
+            uuid_blob_id = self.path_index.get(os.path.join(edge, '_uuids', old_hash)) or self.create_blob(uuid)
+            entries.append((os.path.join(edge, 'objects', object_hash), self.create_blob(edge_data)))
+            entries.append((os.path.join(edge, '_ids', uuid), self.create_blob(object_hash)))
+            entries.append((os.path.join(edge, '_uuids', object_hash), uuid_blob_id))
+
+            for key in old_obj.keys():
+                self.remove_path(os.path.join(edge, 'indexes', key, old_hash))
+
+            self.remove_path(os.path.join(edge, 'objects', old_hash))
+            self.remove_path(os.path.join(edge, '_uuids', old_hash))
+            for path, blob_id in entries:
+                self.stage(path, blob_id)
+
+            return Edge.from_data(edge, **encoded)
+
+    def update(self, edge, **changes):
+        """updates some fields of an existing edge, see :py:meth:`update_edge`
+
+        :param edge: an :py:class:`Edge` instance
+        :param ``**changes``: the new field values
+        :returns: the updated edge or ``None`` if it does not exist
+        """
+        updated = self.update_edge(edge, edge.uuid, changes)
+        if updated is not None:
+            self.queries.append(
+                ' '.join(map(bytes, ['UPDATE EDGE', repr(updated)]))
+            )
 
-            predicate_path = os.path.join(edge, 'indexes', key)
-            predicate_ids.append(self.add_spo(predicate_path, object_hash, value))
+        return updated
 
-        self.add_spo(object_path, object_hash, edge_data)
-        self.add_spo(id_path, edge_uuid, object_hash)
-        self.add_spo(uuid_path, object_hash, edge_uuid)
+    def upsert(self, edge, **obj):
+        """updates the edge with the given ``uuid`` when it exists,
+        creates it otherwise.
 
-        return Edge.from_data(edge, **obj)
+        :param edge: a string or a :py:class:`Edge` subclass reference
+        :param ``**obj``: the field values, optionally including the
+          ``uuid``, without it a new edge is always created
+        :returns: an instance of the given edge
+        """
+        with self.lock:
+            uuid = obj.get('uuid')
+            updated = self.update_edge(edge, uuid, obj) if uuid else None
+            if updated is not None:
+                self.queries.append(
+                    ' '.join(map(bytes, ['UPDATE EDGE', repr(updated)]))
+                )
+                return updated
+
+            new = self.create_edge(edge, **obj)
+            self.queries.append(
+                ' '.join(map(bytes, ['CREATE EDGE', repr(new)]))
+            )
+            return new
 
+    @synchronized
     def save_nodes(self, *nodes):
         """creates staged entries for all the given edge nodes, regardless of type
 
+        A :py:class:`~plural.models.proxy.LazyProjection` only has some
+        of the fields of its edge, so only these are updated and the
+        others are kept, see :py:meth:`update_edge`.
+
         :param ``*nodes``: a list of edge instances
         """
 
         result = []
         for node in nodes:
-            n = self.create_edge(node.__class__.__name__, **node.to_dict())
+            name = node.__class__.__name__
+            data = node.to_dict()
+            n = None
+            if isinstance(node, LazyProjection):
+                n = self.update_edge(name, node.uuid, data)
+
+            if n is None:
+                n = self.create_edge(name, **data)
+
             result.append(n)
 
         return result
@@ -273,127 +798,244 @@ class PluralStore(object):
         auto_commit = kw.pop('auto_commit', True)
         result = self.save_nodes(*nodes)
         if auto_commit:
-            self.commit()
+            self.commit_and_wait()
         return result
 
-    def trace_path(self, entries):
-        return map(lambda entry: (entry.path, bytes(entry.oid)), entries)
-
-    def glob(self, pattern, treeish=None):
-        treeish = treeish or self.repository.index
-        return filter(lambda entry: fnmatch(entry.path, pattern), treeish)
-
-    def scan_all(self, edge_name=None, treeish=None, pattern='*'):
-        """scans all nodes
-
-        :returns: a generator that produces :py:class:`Edge` instances with the scanned data
-        """
-        edge_name = resolve_edge_name(edge_name)
-        treeish = treeish or self.repository.index
-        pattern = os.path.join(edge_name, 'objects', pattern)
-        for entry in self.glob(pattern):
-            blob = self.repository[entry.oid]
-            data = self.deserialize(blob.data)
-            yield Edge.from_data(edge_name, **data)
-
     def delete(self, *nodes, **kw):
         """deletes and (optionally) commits all given nodes
 
-        :param ``*nodes``: a list of edge instances to be deleted
+        :param ``*nodes``: a list of edge or vertex instances to be deleted
         :param auto_commit: ``bool`` - default: ``False``
         :returns: a list with the deleted nodes
         """
         auto_commit = kw.pop('auto_commit', False)
-        deleted = []
-        for node in nodes:
-            for path, oid in self.trace_path(self.glob('*{}*'.format(node.uuid))):
-                map(self.repository.index.remove, node.get_related_blob_paths(self.repository))
+        with self.lock:
+            for node in nodes:
+                if isinstance(node, Vertex):
+                    paths = self.get_vertex_paths(node)
+                else:
+                    paths = self.get_related_paths(resolve_edge_name(node), node.uuid)
+
+                map(self.remove_path, paths)
                 self.queries.append(
                     ' '.join(map(bytes, ['DELETE', node]))
                 )
-            deleted.append(node)
 
         if auto_commit:
-            self.commit()
+            self.commit_and_wait()
 
         return nodes
 
-    def get_edge_by_uuid(self, edge_name, uuid):
-        """retrieves a edge by id
-
-        :param edge_name: the edge name or type
-        :param uuid: the uuid value
-        """
-        edge_name = resolve_edge_name(edge_name)
-        pattern = os.sep.join([edge_name, '_ids', uuid])
-        for entry in self.glob(pattern):
-            edge_blob_id = self.repository[entry.oid].data
-            blob = self.repository[edge_blob_id]
-            return Edge.from_data(edge_name, **self.deserialize(blob.data))
-
-    def get_vertex_by_uuid(self, vertex_name, uuid):
-        """retrieves a vertex by id
-
-        :param vertex_name: the vertex name or type
-        :param uuid: the uuid value
-        """
-        vertex_name = resolve_vertex_name(vertex_name)
-        pattern = os.sep.join([vertex_name, '_ids', uuid])
-        for entry in self.glob(pattern):
-            vertex_blob_id = self.repository[entry.oid].data
-            blob = self.repository[vertex_blob_id]
-            return Vertex.from_data(vertex_name, **self.deserialize(blob.data))
-
-    def match_edges_by_index(self, edge_name, field_name, match_callback):
-        """retrieves multiple edges by indexed field
-
-        :param edge_name: the edge name or type
-        :param uuid: the uuid value
-        """
-        edge_name = resolve_edge_name(edge_name)
-        pattern = os.sep.join([edge_name or '*', 'indexes', '*'])
-        # for index, oid in filter(lambda (index, oid): field_name in index, self.glob(pattern)):
-        for index, oid in self.trace_path(self.glob(pattern)):
-            path, blob_id = os.path.split(index)
-            edge_name = path.split(os.sep)[0]
-            value = self.repository[oid].data
-            if match_callback(value):
-                blob = self.repository[blob_id]
-                data = self.deserialize(blob.data)
-                Definition = Edge.definition(edge_name)
-                yield Definition(**data)
-
-    def match_vertices_by_index(self, vertex_name, field_name, match_callback):
-        """retrieves multiple vertices by indexed field
-
-        :param vertex_name: the vertex name or type
-        :param uuid: the uuid value
-        """
-        vertex_name = resolve_vertex_name(vertex_name)
-        pattern = os.sep.join([vertex_name or '*', 'indexes', '*'])
-        # for index, oid in filter(lambda (index, oid): field_name in index, self.glob(pattern)):
-        for index, oid in self.trace_path(self.glob(pattern)):
-            path, blob_id = os.path.split(index)
-            vertex_name = path.split(os.sep)[0]
-            value = self.repository[oid].data
-            if match_callback(value):
-                blob = self.repository[blob_id]
-                data = self.deserialize(blob.data)
-                Definition = Vertex.definition(vertex_name)
-                yield Definition(**data)
+    def delete_many(self, edge, uuids, auto_commit=False):
+        """deletes and (optionally) commits many edges of the same type
+        by uuid, looking up only the paths of each one, unknown uuids
+        are skipped.
+
+        :param edge: the edge name or type
+        :param uuids: an iterable of uuid values
+        :param auto_commit: ``bool`` - default: ``False``
+        :returns: ``int`` - the number of deleted edges
+        """
+        edge = resolve_edge_name(edge)
+        count = 0
+        with self.lock:
+            for uuid in uuids:
+                paths = self.get_related_paths(edge, uuid)
+                if paths:
+                    map(self.remove_path, paths)
+                    count += 1
+
+            self.queries.append('DELETE {} {}'.format(count, edge))
+
+        if auto_commit:
+            self.commit_and_wait()
+
+        return count
+
+    def snapshot(self, commit_id=None):
+        """creates a read-only view of the store at a commit, isolated
+        from the writes that happen after it.
+
+        ::
+
+            >>> snapshot = store.snapshot()
+            >>> store.create_edge(Document, title='Draft')
+            >>> list(snapshot.scan_all(Document))  # does not see the draft
+
+        :param commit_id: a commit id or any revision understood by
+          ``git rev-parse``, defaults to ``HEAD``
+        :returns: a :py:class:`~plural.snapshot.Snapshot`
+        """
+        if commit_id is None:
+            if self.repository.head_is_unborn:
+                return Snapshot(self)
+
+            commit_id = self.repository.head.target
+
+        if isinstance(commit_id, basestring):
+            target = self.repository.revparse_single(commit_id)
+        else:
+            target = self.repository[commit_id]
 
+        return Snapshot(self, target.peel(pygit2.Commit))
+
+    def parallel(self, processes=None, ordered=True, prefix_length=1, treeish=None):
+        """creates a pool of processes to run full scans and index
+        matches of the committed data in parallel.
+
+        ::
+
+            >>> with store.parallel(processes=32, ordered=False) as parallel:
+            ...     for document in parallel.scan_all(Document):
+            ...         print document.title
+
+        :param processes: ``int`` - the number of worker processes, defaults to the number of cpus
+        :param ordered: ``bool`` - stream the results in object hash order
+        :param prefix_length: ``int`` - the length of the object hash prefix of each partition
+        :param treeish: an optional ``pygit2.Tree`` or tree id, defaults to the tree of ``HEAD``
+        :returns: a :py:class:`~plural.parallel.ParallelQuery`
+        """
+        self.load_schemas()
+        return ParallelQuery(self, processes, ordered, prefix_length, treeish, self.binary_format)
+
+    @synchronized
+    def bulk_load(self, edge, items, query=None):
+        """creates many edges at once and commits them, writing all the
+        new blobs into a single packfile and the paths of the edges
+        straight into the tree of their type instead of staging them
+        one by one.
+
+        Paths already staged are committed along.
+
+        :param edge: a string or a :py:class:`Edge` subclass reference
+        :param items: an iterable of dictionaries with the field values
+        :param query: an optional commit message
+        :returns: the commit id
+        """
+        edge = resolve_edge_name(edge)
+        add_blob = self.pack.add_blob
+        indexes = {}
+        objects = {}
+        ids = {}
+        uuids = {}
+
+        count = 0
+        for obj in items:
+            obj = dict(obj)
+            edge_uuid = obj.pop('uuid', None) or generate_uuid()
+            if isinstance(edge_uuid, unicode):
+                edge_uuid = edge_uuid.encode('utf-8')
+
+            obj['uuid'] = edge_uuid
+
+            values, obj = self.encode_fields(edge, obj)
+            object_hash = add_blob(self.serialize(values, edge))
+            object_name = object_hash.hex
+            for key, value in obj.items():
+                if isinstance(key, unicode):
+                    key = key.encode('utf-8')
+
+                column = indexes.get(key)
+                if column is None:
+                    column = indexes[key] = {}
+
+                column[object_name] = self.create_blob(value, packed=True, cached=key != 'uuid')
+
+            objects[object_name] = object_hash
+            ids[edge_uuid] = add_blob(object_name)
+            uuids[object_name] = add_blob(edge_uuid)
+            count += 1
+
+        tree = {'indexes': indexes, 'objects': objects, '_ids': ids, '_uuids': uuids}
+        if self._path_index is not None:
+            for entry in self._path_index.iter_node(tree, edge):
+                self.index_path(entry.path, entry.oid)
+
+        self.queries.append('BULK LOAD {} {}'.format(count, edge))
+        self.write_objects(packed=True)
+        return self.commit_tree(self.write_index({edge: tree}), query)
+
+    @synchronized
     def commit(self, query=None):
         """creates a commit with the staged objects"""
+        return self.commit_tree(self.write_index(), query)
+
+    def commit_async(self, query=None):
+        """requests a commit of the staged objects without waiting for it.
+
+        With group commit enabled the requests of all the callers
+        within ``group_commit_delay`` seconds are made as a single git
+        commit whose message combines their queries, otherwise the
+        commit is made right away. Either way no commit is made when
+        nothing changed the tree of ``HEAD`` and the future resolves to
+        the current commit.
+
+        :param query: an optional commit message
+        :returns: a :py:class:`~plural.concurrency.CommitFuture` that
+          resolves to the id of the commit
+        """
+        if self.group_committer is not None:
+            return self.group_committer.submit(query)
+
+        future = CommitFuture(query)
+        future.set_result(self.commit_group(query))
+        return future
+
+    def commit_and_wait(self):
+        """commits the staged objects, through the group committer when enabled
+
+        :returns: the commit id
+        """
+        if self.group_committer is None:
+            return self.commit()
+
+        return self.commit_async().result()
+
+    @synchronized
+    def commit_group(self, query=None):
+        """commits on behalf of a group of callers, reusing the current
+        commit when the resulting tree is the one of ``HEAD``, like
+        when their changes were already committed by a previous group.
+
+        :param query: the messages given by the callers, appended to the
+          queries run since the last commit
+        :returns: the commit id
+        """
+        tree_id = self.write_index()
+        head = self.get_head_commit_id()
+        if head is not None and self.repository[head].tree_id == tree_id:
+            self.queries = []
+            return head
+
+        if query and self.queries:
+            query = '\n'.join(sorted(set(self.queries)) + [query])
+
+        return self.commit_tree(tree_id, query)
+
+    def close(self):
+        """commits all the pending group commit requests and stops
+        the background thread of the group committer.
+        """
+        if self.group_committer is not None:
+            self.group_committer.stop()
+
+    def commit_tree(self, tree_id, query=None):
+        """creates a commit pointing to the given tree
+
+        :param tree_id: the id of the tree
+        :param query: an optional commit message, defaults to the queries run since the last commit
+        :returns: the commit id
+        """
         author = None
 
         if not query:
             query = '\n'.join(sorted(set(self.queries)))
 
-        # commit
-        tree_id = self.repository.index.write_tree()
         parent_commits = []
+        previous_tree = None
         if self.repository.references.objects:
             parent_commits = [self.repository.head.target]
+            previous_tree = self.repository[self.repository.head.target].tree
 
         commit_id = self.repository.create_commit(
             self.default_branch,
@@ -405,6 +1047,13 @@ class PluralStore(object):
         )
         self.queries = []
         self.repository.head.set_target(commit_id)
-        if not self.bare:
+        self.indexed_commit = commit_id
+        if self.bare or not self.checkout:
+            return commit_id
+
+        if self.checkout == 'hard':
             self.repository.reset(commit_id, GIT_RESET_HARD)
+        else:
+            checkout_changes(self.repository, previous_tree, self.repository[tree_id])
+
         return commit_id
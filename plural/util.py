@@ -16,10 +16,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 from uuid import uuid4
 # from time import mktime
 from decimal import Decimal
 from datetime import datetime, date, time
+from pygit2 import GIT_DELTA_DELETED
+from pygit2 import GIT_FILEMODE_BLOB
+from pygit2 import GIT_FILEMODE_TREE
 
 
 def generate_uuid():
@@ -42,10 +46,139 @@ def serialize_commit(commit):
     return data
 
 
+def write_tree(repository, changes, tree=None, trees=None):
+    """writes a tree with the given changes applied on top of another
+    tree, only rewriting the subtrees that contain changed paths.
+
+    :param repository: a ``pygit2.Repository``
+    :param changes: a ``dict`` mapping blob paths to their blob id, or
+      to ``None`` for paths that should be removed.
+    :param tree: the base ``pygit2.Tree``, or ``None`` to start from an empty tree.
+    :param trees: an optional ``dict`` of changes already nested by
+      tree, like ``{'Tag': {'_ids': {uuid: blob_id}}}``, applied after
+      the ``changes``.
+    :returns: the id of the new tree
+    """
+    nested = {}
+    for path, oid in changes.items():
+        parts = path.split(os.sep)
+        node = nested
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+
+        node[parts[-1]] = oid
+
+    if trees:
+        merge_changes(nested, trees)
+
+    return write_subtree(repository, nested, tree) or repository.TreeBuilder().write()
+
+
+def merge_changes(nested, changes):
+    for name, change in changes.items():
+        node = nested.get(name)
+        if isinstance(change, dict) and isinstance(node, dict):
+            merge_changes(node, change)
+        else:
+            nested[name] = change
+
+
+def write_subtree(repository, changes, tree=None):
+    if tree is None:
+        builder = repository.TreeBuilder()
+    else:
+        builder = repository.TreeBuilder(tree)
+
+    for name, change in changes.items():
+        if isinstance(change, dict):
+            subtree = None
+            if tree is not None and name in tree and tree[name].filemode == GIT_FILEMODE_TREE:
+                subtree = repository[tree[name].id]
+
+            change = write_subtree(repository, change, subtree)
+            if change is not None:
+                builder.insert(name, change, GIT_FILEMODE_TREE)
+                continue
+
+        if change is None:
+            if builder.get(name) is not None:
+                builder.remove(name)
+        else:
+            builder.insert(name, change, GIT_FILEMODE_BLOB)
+
+    if not len(builder):
+        return None
+
+    return builder.write()
+
+
+def diff_trees(old_tree, new_tree):
+    """
+    :param old_tree: a ``pygit2.Tree``, or ``None`` for the empty tree
+    :param new_tree: a ``pygit2.Tree``
+    :returns: a ``pygit2.Diff`` of the blobs that differ between the trees
+    """
+    if old_tree is None:
+        return new_tree.diff_to_tree(swap=True)
+
+    return old_tree.diff_to_tree(new_tree)
+
+
+def checkout_changes(repository, old_tree, new_tree):
+    """updates only the files of the working directory that differ
+    between two trees, instead of checking out the whole tree.
+
+    :param repository: a non-bare ``pygit2.Repository``
+    :param old_tree: the ``pygit2.Tree`` currently checked out, or ``None``
+    :param new_tree: the ``pygit2.Tree`` to check out
+    :returns: the number of changed files
+    """
+    diff = diff_trees(old_tree, new_tree)
+    workdir = os.path.abspath(repository.workdir)
+    count = 0
+    for delta in diff.deltas:
+        if delta.status == GIT_DELTA_DELETED:
+            remove_file(workdir, delta.old_file.path)
+        else:
+            write_file(workdir, delta.new_file.path, repository[delta.new_file.id].data)
+
+        count += 1
+
+    return count
+
+
+def write_file(workdir, path, data):
+    filename = os.path.join(workdir, path)
+    parent = os.path.dirname(filename)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    with open(filename, 'wb') as fd:
+        fd.write(data)
+
+
+def remove_file(workdir, path):
+    filename = os.path.join(workdir, path)
+    if os.path.exists(filename):
+        os.remove(filename)
+
+    parent = os.path.dirname(filename)
+    while parent != workdir and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
 class AutoCodec(object):
     def decode(self, obj):
         return obj
 
+    def decode_many(self, objs):
+        return list(objs)
+
+    def encode_many(self, objs):
+        encode = self.encode
+        return [encode(obj) for obj in objs]
+
     def encode(self, obj):
         if isinstance(obj, (datetime, date, time)):
             return obj.isoformat()
@@ -89,3 +89,12 @@ class Document(Edge):
         incoming_vertex('authored_by', Author).through(AuthoredDocument),
         outgoing_vertex('tagged_by', Tag).through(TaggedDocument),
     ]
+
+
+class Invoice(Edge):
+    object_format = 'binary'
+    indexes = {'number'}
+    fields = {
+        'number': codec.Unicode,
+        'issued_at': codec.DateTime,
+    }
@@ -52,3 +52,52 @@ def test_codecs_null_fields(context):
         'uuid': 'deadbeefdeadbeefdeadbeefdeadbeef',
         'metadata': '',
     })
+
+
+@with_hexastore('vehicles')
+def test_update_with_codecs(context):
+    store = context.store
+
+    tesla = store.create_edge(Car, brand='Tesla', max_speed='160.4')
+    store.commit()
+
+    updated = store.update(tesla, last_used=datetime(2018, 1, 1), max_speed=Decimal('250.5'))
+    updated.last_used.should.equal(datetime(2018, 1, 1))
+    updated.max_speed.should.equal(Decimal('250.5'))
+    store.update(tesla, last_used='2017/08/18 16:20:00').last_used.should.equal(datetime(2017, 8, 18, 16, 20))
+    store.commit()
+
+    object_hash = store.read_blob(store.path_index.get('Car/_ids/{}'.format(tesla.uuid)))
+    store.read_blob(store.path_index.get('Car/indexes/last_used/{}'.format(object_hash))).should.equal('2017-08-18T16:20:00')
+    store.read_blob(store.path_index.get('Car/indexes/max_speed/{}'.format(object_hash))).should.equal('250.5')
+    store.get_edge_by_uuid(Car, tesla.uuid).to_dict().should.equal({
+        'brand': 'Tesla',
+        'last_used': '2017-08-18T16:20:00',
+        'max_speed': '250.5',
+        'uuid': tesla.uuid,
+    })
+
+    store.update.when.called_with(tesla, brand='Tesla Motors', mileage=42).should.throw(TypeError)
+    store.staged.should.be.empty
+
+
+@with_hexastore('vehicles')
+def test_merge_projection(context):
+    store = context.store
+
+    tesla = store.create_edge(Car, brand='Tesla', max_speed='160.4', last_used=datetime(2017, 8, 18, 16, 20))
+    store.commit()
+
+    car, = store.scan_all(Car, fields=['last_used', 'max_speed'], lazy=True)
+    isinstance(car, Car).should.be.true
+    car.last_used.should.equal(datetime(2017, 8, 18, 16, 20))
+    store.merge(car).should.equal([tesla])
+
+    car.max_speed = Decimal('250.5')
+    store.merge(car)
+    store.get_edge_by_uuid(Car, tesla.uuid).to_dict().should.equal({
+        'brand': 'Tesla',
+        'last_used': '2017-08-18T16:20:00',
+        'max_speed': '250.5',
+        'uuid': tesla.uuid,
+    })
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
+from datetime import datetime
+from plural import Plural
 from plural.query import predicate
 from tests.functional.helpers import list_file_tree
 from tests.functional.scenarios import with_hexastore
 from tests.edges import Document
+from tests.edges import Invoice
+from tests.edges import Tag
 
 
 @with_hexastore('cms')
@@ -98,6 +102,22 @@ def test_create_edge(context):
     ]))
 
 
+@with_hexastore('cms-delete')
+def test_delete_updates_working_directory(context):
+    store = context.store
+
+    docs1 = store.create_edge(Document, title='Essay', content='content1')
+    docs2 = store.create_edge(Document, title='Blog', content='content2')
+    store.commit()
+    list_file_tree(store.path).should.have.length_of(12)
+
+    store.delete(docs2)
+    store.commit()
+
+    list_file_tree(store.path).should.have.length_of(6)
+    store.get_edge_by_uuid(Document, docs1.uuid).should.equal(docs1)
+
+
 @with_hexastore('cms-bare', bare=True)
 def test_bare(context):
     store = context.store
@@ -158,3 +178,252 @@ def test_bare(context):
     list_file_tree(store.path).should.have.length_of(36)
     store.delete(docs2, auto_commit=True)
     list_file_tree(store.path).should.have.length_of(45)
+
+
+@with_hexastore('cms-bulk')
+def test_bulk_load(context):
+    store = context.store
+
+    uuid1 = 'deadbeefdeadbeefdeadbeefdeadbeef'
+    uuid2 = '1c3b00da1c3b00da1c3b00da1c3b00da'
+
+    store.bulk_load(Document, [
+        {'uuid': uuid1, 'title': 'Essay', 'content': 'content1'},
+        {'uuid': uuid2, 'title': 'Blog', 'content': 'content2'},
+    ])
+
+    sorted(list_file_tree(store.path)).should.equal(sorted([
+        'Document/_ids/1c3b00da1c3b00da1c3b00da1c3b00da',
+        'Document/_ids/deadbeefdeadbeefdeadbeefdeadbeef',
+        'Document/_uuids/c5a61004c0bab3a5ee1244e719ade9ebd381f892',
+        'Document/_uuids/fae1f98f713ead9b174a8d953ded3f70c42e6542',
+        'Document/indexes/content/c5a61004c0bab3a5ee1244e719ade9ebd381f892',
+        'Document/indexes/content/fae1f98f713ead9b174a8d953ded3f70c42e6542',
+        'Document/indexes/title/c5a61004c0bab3a5ee1244e719ade9ebd381f892',
+        'Document/indexes/title/fae1f98f713ead9b174a8d953ded3f70c42e6542',
+        'Document/indexes/uuid/c5a61004c0bab3a5ee1244e719ade9ebd381f892',
+        'Document/indexes/uuid/fae1f98f713ead9b174a8d953ded3f70c42e6542',
+        'Document/objects/c5a61004c0bab3a5ee1244e719ade9ebd381f892',
+        'Document/objects/fae1f98f713ead9b174a8d953ded3f70c42e6542',
+    ]))
+    store.get_edge_by_uuid(Document, uuid2).should.equal(
+        Document(uuid=uuid2, title='Blog', content='content2'))
+
+
+@with_hexastore('cms-bulk-staged', bare=True)
+def test_bulk_load_with_staged_paths(context):
+    store = context.store
+
+    essay = store.create_edge(Document, uuid='uuid1', title='Essay', content='content1')
+    store.commit()
+    draft = store.create_edge(Document, uuid='uuid2', title='Draft', content='content2')
+    list(store.match_edges_by_index(Document, 'title', predicate('title').matches('Blog'))).should.equal([])
+
+    store.bulk_load(Document, [
+        {'uuid': 'uuid3', 'title': 'Blog', 'content': 'content3'},
+        {'uuid': u'uuid4', 'title': 'Blog', 'content': 'content4'},
+    ])
+
+    store.staged.should.be.empty
+    store.get_edge_by_uuid(Document, 'uuid3').title.should.equal('Blog')
+    sorted(edge.uuid for edge in store.match_edges_by_index(
+        Document, 'title', predicate('title').matches('Blog'))).should.equal(['uuid3', 'uuid4'])
+    set(Plural(store.path, bare=True).scan_all(Document)).should.equal(set(store.scan_all(Document)))
+    sorted(edge.uuid for edge in store.scan_all(Document)).should.equal(['uuid1', 'uuid2', 'uuid3', 'uuid4'])
+    store.get_edges_by_uuids(Document, ['uuid1', 'uuid2']).should.equal([essay, draft])
+
+
+@with_hexastore('cms-parallel', bare=True)
+def test_parallel(context):
+    store = context.store
+
+    store.bulk_load(Document, [
+        {'title': 'Document {}'.format(number), 'content': 'content'}
+        for number in range(40)
+    ])
+    documents = set(store.scan_all(Document))
+
+    with store.parallel(processes=2, prefix_length=2) as parallel:
+        set(parallel.scan_all(Document)).should.equal(documents)
+
+        query = predicate('title').regex.matches('Document 1[0-9]$')
+        set(parallel.match_edges_by_index(Document, 'title', query)).should.equal(
+            set(store.match_edges_by_index(Document, 'title', query)))
+
+
+@with_hexastore('cms-binary')
+def test_binary_object_format(context):
+    store = context.store
+
+    invoice = store.create_edge(Invoice, number='0001', customer='Acme')
+    store.commit()
+
+    paths = list_file_tree(store.path)
+    [path for path in paths if '/_schemas/' in path].should.have.length_of(1)
+    blob = store.read_blob(store.path_index.get('Invoice/_ids/{}'.format(invoice.uuid)))
+    store.read_blob(store.path_index.get('Invoice/objects/{}'.format(blob)))[:1].should.equal(b'\xc1')
+
+    reopened = Plural(store.path)
+    reopened.get_edge_by_uuid(Invoice, invoice.uuid).should.equal(invoice)
+    list(reopened.scan_all(Invoice)).should.equal([invoice])
+
+
+@with_hexastore('cms-binary-types')
+def test_binary_object_format_types(context):
+    store = context.store
+
+    created = store.create_edge(Invoice, number='0001', issued_at=datetime(2017, 1, 1))
+    merged, = store.merge(Invoice(number='0002', issued_at=datetime(2017, 1, 2)))
+    extra = store.create_edge(Invoice, **{u'n\xf6te': u'x', 'number': u'0003'})
+    store.commit()
+
+    for invoice in (created, merged):
+        object_hash = store.read_blob(store.path_index.get('Invoice/_ids/{}'.format(invoice.uuid)))
+        store.read_object(object_hash)['issued_at'].should.be.a(datetime)
+        store.read_blob(store.path_index.get('Invoice/indexes/issued_at/{}'.format(object_hash))).should.equal(
+            invoice.issued_at.isoformat(),
+        )
+        store.get_edge_by_uuid(Invoice, invoice.uuid).issued_at.should.equal(invoice.issued_at)
+
+    store.get_edge_by_uuid(Invoice, extra.uuid).should.equal(extra)
+    sorted(invoice.number for invoice in store.scan_all(Invoice)).should.equal(['0001', '0002', '0003'])
+
+
+@with_hexastore('cms-snapshot', bare=True)
+def test_snapshot(context):
+    store = context.store
+
+    store.snapshot().get_edges_by_uuids(Tag, ['uuid1']).should.equal([])
+
+    python = store.create_edge(Tag, uuid='uuid1', name='python')
+    first_commit = store.commit()
+    snapshot = store.snapshot()
+
+    git = store.create_edge(Tag, uuid='uuid2', name='git')
+    list(snapshot.scan_all(Tag)).should.equal([python])
+    store.commit()
+
+    snapshot.get_edge_by_uuid(Tag, 'uuid2').should.be.none
+    snapshot.commit_id.should.equal(first_commit)
+    set(store.snapshot().scan_all(Tag)).should.equal({python, git})
+    set(store.snapshot(first_commit).scan_all(Tag)).should.equal({python})
+
+    paths = [entry.path for entry in store.repository.index]
+    [entry.path for entry in store.path_index].should.equal(paths)
+    [entry.path for entry in store.snapshot().path_index].should.equal(paths)
+
+    query = predicate('name').startswith('g')
+    list(store.snapshot('HEAD').match_edges_by_index(Tag, 'name', query)).should.equal([git])
+    list(store.snapshot('HEAD~1').match_edges_by_index(Tag, 'name', query)).should.equal([])
+
+
+@with_hexastore('cms-update')
+def test_update(context):
+    store = context.store
+
+    essay = store.create_edge(Document, title='Essay', content='content1')
+    store.commit()
+
+    def content_blob_id():
+        object_hash = store.read_blob(store.path_index.get('Document/_ids/{}'.format(essay.uuid)))
+        return store.path_index.get('Document/indexes/content/{}'.format(object_hash))
+
+    original_content_blob_id = content_blob_id()
+
+    blog = store.update(essay, title='Blog')
+    blog.uuid.should.equal(essay.uuid)
+    blog.title.should.equal('Blog')
+    blog.content.should.equal('content1')
+    store.commit()
+
+    content_blob_id().should.equal(original_content_blob_id)
+    store.get_edge_by_uuid(Document, essay.uuid).should.equal(blog)
+    list(store.match_edges_by_index(Document, 'title', predicate('title').matches('Essay'))).should.equal([])
+    list_file_tree(store.path).should.have.length_of(6)
+
+    store.update(Document(uuid='unknown-uuid'), title='Blog').should.be.none
+    store.upsert(Document, uuid=essay.uuid, content='content2').content.should.equal('content2')
+    store.upsert(Document, uuid='deadbeefdeadbeefdeadbeefdeadbeef', title='Draft', content='content3')
+    store.commit()
+
+    sorted(document.title for document in store.scan_all(Document)).should.equal(['Blog', 'Draft'])
+    list_file_tree(store.path).should.have.length_of(12)
+
+
+
+@with_hexastore('cms-upsert')
+def test_upsert_without_uuid(context):
+    store = context.store
+
+    draft = store.upsert(Document, title='Draft', content='content1')
+    draft.uuid.should.be.a(basestring)
+    store.commit()
+
+    store.get_edge_by_uuid(Document, draft.uuid).should.equal(draft)
+    store.upsert(Document, uuid=draft.uuid, title='Essay').title.should.equal('Essay')
+    store.upsert(Document, title='Blog', content='content2')
+    store.commit()
+
+    sorted(document.title for document in store.scan_all(Document)).should.equal(['Blog', 'Essay'])
+
+@with_hexastore('cms-refresh', bare=True)
+def test_refresh(context):
+    reader = context.store
+    writer = Plural(reader.path, bare=True)
+    reader.get_edge_by_uuid(Tag, 'uuid1').should.be.none
+
+    python = writer.create_edge(Tag, uuid='uuid1', name='python')
+    writer.commit()
+    reader.get_edge_by_uuid(Tag, 'uuid1').should.be.none
+
+    reader.refresh().should.equal(5)
+    reader.refresh().should.equal(0)
+    reader.get_edge_by_uuid(Tag, 'uuid1').should.equal(python)
+    list(reader.match_edges_by_index(Tag, 'name', predicate('name').matches('python'))).should.equal([python])
+
+    writer.delete(python)
+    git = writer.create_edge(Tag, uuid='uuid2', name='git')
+    writer.commit()
+
+    reader.refresh().should.equal(10)
+    list(reader.scan_all(Tag)).should.equal([git])
+    list(reader.match_edges_by_index(Tag, 'name', predicate('name').matches('python'))).should.equal([])
+
+    plural = reader.create_edge(Tag, uuid='uuid3', name='plural')
+    reader.commit()
+    set(writer.snapshot().scan_all(Tag)).should.equal({git, plural})
+
+
+@with_hexastore('cms-reopen', bare=True)
+def test_reopen_bare(context):
+    store = context.store
+    essay = store.create_edge(Document, uuid='uuid1', title='Essay', content='content1')
+    store.commit()
+
+    reopened = Plural(store.path, bare=True)
+    reopened.get_edge_by_uuid(Document, 'uuid1').should.equal(essay)
+    blog = reopened.create_edge(Document, uuid='uuid2', title='Blog', content='content2')
+    reopened.commit()
+
+    writer = Plural(store.path, bare=True)
+    draft = writer.create_edge(Document, uuid='uuid3', title='Draft', content='content3')
+    writer.commit()
+
+    set(Plural(store.path, bare=True).scan_all(Document)).should.equal({essay, blog, draft})
+    set(writer.snapshot().scan_all(Document)).should.equal({essay, blog, draft})
+    len(writer.get_versions()).should.equal(3)
+
+
+@with_hexastore('cms-commit-async', bare=True)
+def test_commit_async_without_changes(context):
+    store = context.store
+
+    store.create_edge(Tag, uuid='uuid1', name='python')
+    head = store.commit_async('tag python').result()
+
+    store.commit_async('nothing').result().should.equal(head)
+    store.repository.head.target.should.equal(head)
+
+    store.update(store.get_edge_by_uuid(Tag, 'uuid1'), name='python')
+    store.commit_async('same name').result().should.equal(head)
+    store.repository[head].parents.should.have.length_of(0)
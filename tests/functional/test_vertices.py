@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 from decimal import Decimal
+from plural import Plural
+from plural.graph import Neighbor
 from tests.functional.scenarios import with_hexastore
 from tests.edges import Car, Person
 from tests.vertices import CarPurchase
 from tests.vertices import CarSale
+from tests.vertices import CarDeal
 
 
 @with_hexastore('vehicles')
@@ -131,3 +134,80 @@ def test_codecs_null_fields(context):
         'tested_at': '',
         'price': '',
     })
+
+
+@with_hexastore('vehicles')
+def test_neighbors(context):
+    store = context.store
+
+    tesla = store.create_edge(Car, uuid='deadbeefdeadbeefdeadbeefdeadbeef', brand='Tesla')
+    elon = store.create_edge(Person, uuid='bad1d3a5bad1d3a5bad1d3a5bad1d3a5', name='Elon Musk')
+    chuck = store.create_edge(Person, uuid='1c3b00da1c3b00da1c3b00da1c3b00da', name='Chuck Norris')
+    store.commit()
+
+    store.neighbors(tesla).should.equal([])
+    store.create_vertex(CarPurchase, origin=chuck, target=tesla)
+    store.create_vertex(CarDeal, origin=elon, target=chuck)
+
+    store.neighbors(tesla).should.equal([
+        Neighbor(chuck.uuid, 'Person', 'bought_by', 'incoming'),
+    ])
+    store.neighbors(chuck.uuid).should.equal([
+        Neighbor(tesla.uuid, 'Car', 'bought_by', 'incoming'),
+        Neighbor(elon.uuid, 'Person', 'dealed_with', 'indirect'),
+    ])
+    store.neighbors(chuck, direction='indirect').should.equal([
+        Neighbor(elon.uuid, 'Person', 'dealed_with', 'indirect'),
+    ])
+    store.commit()
+
+    store.snapshot().neighbors(elon, label='dealed_with').should.equal([
+        Neighbor(chuck.uuid, 'Person', 'dealed_with', 'indirect'),
+    ])
+    Plural(store.path).neighbors(tesla).should.equal([
+        Neighbor(chuck.uuid, 'Person', 'bought_by', 'incoming'),
+    ])
+
+
+@with_hexastore('vehicles')
+def test_traverse(context):
+    store = context.store
+
+    tesla = store.create_edge(Car, uuid='deadbeefdeadbeefdeadbeefdeadbeef', brand='Tesla')
+    elon = store.create_edge(Person, uuid='bad1d3a5bad1d3a5bad1d3a5bad1d3a5', name='Elon Musk')
+    chuck = store.create_edge(Person, uuid='1c3b00da1c3b00da1c3b00da1c3b00da', name='Chuck Norris')
+    store.create_vertex(CarPurchase, origin=chuck, target=tesla)
+    store.create_vertex(CarDeal, origin=elon, target=chuck)
+
+    [(hop.uuid, hop.depth) for hop in store.traverse(tesla, max_depth=3)].should.equal([
+        (chuck.uuid, 1),
+        (elon.uuid, 2),
+    ])
+    [hop.edge for hop in store.traverse(tesla, max_depth=2, resolve=True)].should.equal([chuck, elon])
+    store.shortest_path(tesla, elon).should.equal([tesla.uuid, chuck.uuid, elon.uuid])
+
+
+@with_hexastore('vehicles')
+def test_delete_relationships(context):
+    store = context.store
+
+    tesla = store.create_edge(Car, uuid='deadbeefdeadbeefdeadbeefdeadbeef', brand='Tesla')
+    model3 = store.create_edge(Car, uuid='0123456701234567012345670123456a', brand='Tesla')
+    elon = store.create_edge(Person, uuid='bad1d3a5bad1d3a5bad1d3a5bad1d3a5', name='Elon Musk')
+    chuck = store.create_edge(Person, uuid='1c3b00da1c3b00da1c3b00da1c3b00da', name='Chuck Norris')
+    store.create_vertex(CarPurchase, origin=chuck, target=tesla)
+    store.create_vertex(CarDeal, origin=elon, target=chuck)
+    store.commit()
+
+    store.get_related_paths('Person', chuck.uuid).should.have.length_of(8)
+    store.delete(chuck)
+    store.commit()
+
+    store.neighbors(tesla).should.equal([])
+    store.neighbors(elon).should.equal([])
+    [entry.path for entry in store.path_index if chuck.uuid in entry.path].should.equal([])
+    Plural(store.path).get_edge_by_uuid(Person, elon.uuid).should.equal(elon)
+
+    store.delete_many(Car, [tesla.uuid, 'unknown-uuid'], auto_commit=True).should.equal(1)
+    list(store.scan_all(Car)).should.equal([model3])
+    [entry.path for entry in store.path_index if tesla.uuid in entry.path].should.equal([])
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import pickle
+from datetime import date
+from datetime import datetime
+from decimal import Decimal
+
+from dateutil.tz import tzutc
+from mock import MagicMock
+
+from plural.binary import BinaryFormat
+from plural.binary import schema_fingerprint
+from plural.binary import is_binary
+from plural.binary import is_native
+from plural.exceptions import ObjectSchemaNotFound
+
+
+LAYOUT = ('uuid', 'brand', 'made', 'price')
+
+
+def test_binary_format_round_trip():
+    ('BinaryFormat.loads() should return the data given to dumps_layout(), with its types')
+
+    serializer = BinaryFormat()
+    data = {
+        'uuid': 'uuid1',
+        'brand': u'Citro\xebn',
+        'made': datetime(2017, 1, 2, 3, 4, 5, 6),
+        'price': Decimal('12.50'),
+        'sold': date(2017, 2, 1),
+        'synced': datetime(2017, 1, 2, tzinfo=tzutc()),
+        'wheels': 4,
+        'huge': 1 << 80,
+        'ratio': 0.25,
+        'electric': True,
+        'owner': None,
+        'metadata': {'b': [1, 2], 'a': u'x'},
+        'notes': u'x' * 300,
+    }
+
+    blob = serializer.dumps_layout('Car', LAYOUT, data)
+
+    is_binary(blob).should.be.true
+    serializer.loads(blob).should.equal(data)
+    serializer.dumps_layout('Car', LAYOUT, dict(data)).should.equal(blob)
+
+
+def test_binary_format_skips_field_names():
+    ('BinaryFormat.dumps_layout() should only write the names of the fields outside of the layout')
+
+    blob = BinaryFormat().dumps_layout('Car', LAYOUT, {'uuid': 'uuid1', 'brand': 'Tesla', 'color': 'red'})
+
+    blob.should_not.contain('brand')
+    blob.should.contain('color')
+
+
+def test_binary_format_unicode_field_names():
+    ('BinaryFormat.dumps_layout() should write the names of the extra fields in UTF-8')
+
+    serializer = BinaryFormat()
+    blob = serializer.dumps_layout('Car', LAYOUT, {'uuid': 'uuid1', u'n\xf6te': u'x'})
+
+    serializer.loads(blob).should.equal({'uuid': 'uuid1', u'n\xf6te': u'x'})
+
+
+def test_is_native():
+    ('is_native() should tell the values kept in their own type from the ones written as strings')
+
+    is_native(datetime(2017, 1, 2)).should.be.true
+    is_native(date(2017, 1, 2)).should.be.true
+    is_native(Decimal('1.5')).should.be.true
+    is_native(4).should.be.true
+    is_native('2017-01-02').should.be.false
+    is_native(None).should.be.false
+
+
+def test_binary_format_fallback():
+    ('BinaryFormat.loads() should read other blobs with the fallback serializer')
+
+    fallback = MagicMock(name='fallback')
+    serializer = BinaryFormat(fallback)
+
+    serializer.loads('{"uuid": "uuid1"}').should.equal(fallback.loads.return_value)
+    fallback.loads.assert_called_once_with('{"uuid": "uuid1"}')
+    serializer.dumps({'uuid': 'uuid1'}).should.equal(fallback.dumps.return_value)
+
+
+def test_binary_format_load_schema():
+    ('BinaryFormat.loads() should call load_schema() once for unknown layouts')
+
+    blob = BinaryFormat().dumps_layout('Car', LAYOUT, {'uuid': 'uuid1', 'brand': 'Tesla'})
+    load_schema = MagicMock(return_value=list(LAYOUT))
+    serializer = BinaryFormat(load_schema=load_schema)
+
+    serializer.loads(blob).should.equal({'uuid': 'uuid1', 'brand': 'Tesla'})
+    serializer.loads(blob).should.equal({'uuid': 'uuid1', 'brand': 'Tesla'})
+
+    load_schema.assert_called_once_with('Car', schema_fingerprint(LAYOUT))
+
+
+def test_binary_format_unknown_schema():
+    ('BinaryFormat.loads() should raise ObjectSchemaNotFound for unknown layouts')
+
+    blob = BinaryFormat().dumps_layout('Car', LAYOUT, {'uuid': 'uuid1'})
+
+    BinaryFormat().loads.when.called_with(blob).should.throw(ObjectSchemaNotFound)
+    BinaryFormat(load_schema=lambda name, fingerprint: None).loads.when.called_with(blob).should.throw(ObjectSchemaNotFound)
+
+
+def test_binary_format_pickle():
+    ('BinaryFormat should keep its registered layouts when pickled')
+
+    serializer = BinaryFormat(load_schema=MagicMock())
+    blob = serializer.dumps_layout('Car', LAYOUT, {'uuid': 'uuid1'})
+
+    copy = pickle.loads(pickle.dumps(serializer))
+
+    copy.load_schema.should.be.none
+    copy.loads(blob).should.equal({'uuid': 'uuid1'})
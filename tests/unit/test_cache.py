@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from plural.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    ('LRUCache.set() should evict the least recently used item when full')
+
+    cache = LRUCache(max_items=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a').should.equal(1)
+    cache.set('c', 3)
+
+    ('a' in cache).should.be.true
+    ('b' in cache).should.be.false
+    ('c' in cache).should.be.true
+    cache.should.have.length_of(2)
+
+
+def test_lru_cache_max_size():
+    ('LRUCache.set() should evict items when the total size exceeds max_size')
+
+    cache = LRUCache(max_items=10, max_size=10)
+    cache.set('a', 'x' * 4)
+    cache.set('b', 'x' * 4)
+    cache.set('c', 'x' * 4)
+
+    ('a' in cache).should.be.false
+    cache.size.should.equal(8)
+
+    cache.set('b', 'x')
+    cache.size.should.equal(5)
+
+
+def test_lru_cache_counters():
+    ('LRUCache.get() should count hits and misses')
+
+    cache = LRUCache()
+    cache.set('a', 1)
+
+    cache.get('a')
+    cache.get('a')
+    cache.get('b').should.be.none
+
+    cache.hits.should.equal(2)
+    cache.misses.should.equal(1)
+
+
+def test_lru_cache_explicit_size():
+    ('LRUCache.set() should account the given size instead of measuring the value')
+
+    cache = LRUCache(max_items=10, max_size=10)
+    cache.set('a', {'uuid': 'a'}, 6)
+    cache.set('b', {'uuid': 'b'}, 6)
+
+    ('a' in cache).should.be.false
+    cache.size.should.equal(6)
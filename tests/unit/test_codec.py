@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import bz2
+import zlib
+from datetime import datetime
+from decimal import Decimal
+
+from dateutil.tz import tzoffset
+from dateutil.tz import tzutc
+from mock import patch
+
+from plural import codec
+from plural.codec import parse_isoformat
+from plural.exceptions import CodecNotAvailable
+
+
+TEXT = u'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 20
+
+
+def test_compressed_round_trip():
+    ('the compression codecs should decode what they encode')
+
+    for Codec in (codec.Gzip, codec.Bzip2):
+        encoded = Codec().encode(TEXT)
+
+        encoded[1:].should.match(r'^[A-Za-z0-9+/=]+$')
+        len(encoded).should.be.lower_than(len(TEXT))
+        Codec().decode(encoded).should.equal(TEXT.encode('utf-8'))
+        Codec().decode(unicode(encoded)).should.equal(TEXT.encode('utf-8'))
+
+
+def test_compressed_header():
+    ('the compression codecs should tell the algorithm of each value by its header byte')
+
+    codec.Gzip(level=9).encode(TEXT)[:1].should.equal('\x01')
+    codec.Bzip2(level=1).encode(TEXT)[:1].should.equal('\x02')
+    codec.Gzip().decode(codec.Bzip2().encode(TEXT)).should.equal(TEXT.encode('utf-8'))
+
+
+def test_compressed_threshold():
+    ('the compression codecs should keep values below the threshold, or that do not shrink, as they are')
+
+    codec.Gzip().encode('short value').should.equal('\x00short value')
+    codec.Gzip(threshold=4).encode('abcdef').should.equal('\x00abcdef')
+    codec.Gzip(threshold=4096).encode(TEXT)[:1].should.equal('\x00')
+    codec.Gzip().decode('\x00short value').should.equal('short value')
+    codec.Gzip().encode('').should.equal('')
+    codec.Gzip().decode('').should.equal('')
+
+
+def test_compressed_legacy_values():
+    ('the compression codecs should decode values written without a header byte as they are, unless compressed')
+
+    codec.Gzip().decode(zlib.compress('value')).should.equal('value')
+    codec.Bzip2().decode(bz2.compress('value')).should.equal('value')
+    codec.Gzip().decode('plain value').should.equal('plain value')
+    codec.Gzip().decode('BZh plain value').should.equal('BZh plain value')
+
+
+def test_compressed_not_available():
+    ('the compression codecs should raise CodecNotAvailable when their module is not installed')
+
+    gzip = codec.Gzip()
+    encoded = gzip.encode(TEXT)
+
+    with patch.dict('plural.codec.COMPRESSORS', clear=True):
+        codec.Gzip.when.called_with().should.throw(CodecNotAvailable)
+
+    with patch.dict('plural.codec.DECOMPRESSORS', clear=True):
+        gzip.decode.when.called_with(encoded).should.throw(CodecNotAvailable)
+
+
+def test_codec_many():
+    ('Codec.encode_many() and decode_many() should transform whole columns in order')
+
+    numbers = codec.Number()
+
+    numbers.encode_many([Decimal('1.5'), None, Decimal('2')]).should.equal(['1.5', '', '2'])
+    numbers.decode_many(['1.5', None, '2']).should.equal([Decimal('1.5'), None, Decimal('2')])
+
+
+@patch('plural.codec.parse_datetime')
+def test_datetime_decode_many(parse_datetime):
+    ('DateTime.decode_many() should parse each distinct string once')
+
+    parse_datetime.side_effect = lambda string: 'parsed ' + string
+    now = datetime.now()
+
+    codec.DateTime().decode_many(['2017-01-01', now, '2017-01-02', '2017-01-01']).should.equal([
+        'parsed 2017-01-01', now, 'parsed 2017-01-02', 'parsed 2017-01-01',
+    ])
+    parse_datetime.call_count.should.equal(2)
+
+
+def test_parse_isoformat():
+    ('parse_isoformat() should parse the layouts of datetime.isoformat() only')
+
+    parse_isoformat('2017-08-18T16:20:00').should.equal(datetime(2017, 8, 18, 16, 20))
+    parse_isoformat('2017-08-18 16:20:00.25').should.equal(datetime(2017, 8, 18, 16, 20, 0, 250000))
+    parse_isoformat('2017-08-18T16:20:00Z').tzinfo.should.equal(tzutc())
+    parse_isoformat('2017-08-18T16:20:00.000001-03:30').should.equal(
+        datetime(2017, 8, 18, 16, 20, 0, 1, tzinfo=tzoffset(None, -12600)))
+
+    parse_isoformat('2017-02-30T16:20:00').should.be.none
+    parse_isoformat('Aug 18 2017 4:20pm').should.be.none
+
+
+@patch('plural.codec.parse_datetime')
+def test_datetime_fast_path(parse_datetime):
+    ('DateTime.decode() should only parse foreign layouts with dateutil')
+
+    codec.DateTime().decode('2017-08-18T16:20:00').should.equal(datetime(2017, 8, 18, 16, 20))
+    parse_datetime.called.should.be.false
+
+    codec.DateTime().decode('Aug 18 2017 4:20pm').should.equal(parse_datetime.return_value)
+    parse_datetime.assert_called_once_with('Aug 18 2017 4:20pm')
+
+
+def test_datetime_epoch():
+    ('DateTime(epoch=True) should write sortable epoch microseconds and still read ISO-8601')
+
+    epoch = codec.DateTime(epoch=True)
+    earlier = datetime(2017, 8, 18, 16, 20, 0, 5)
+    later = datetime(2017, 8, 18, 16, 21)
+
+    epoch.encode(earlier).should.equal('01503073200000005')
+    epoch.decode('01503073200000005').should.equal(earlier)
+    epoch.decode('2017-08-18T16:20:00.000005').should.equal(earlier)
+    epoch.encode(datetime(2017, 8, 18, 18, 20, 0, 5, tzinfo=tzoffset(None, 7200))).should.equal('01503073200000005')
+    (epoch.encode(earlier) < epoch.encode(later)).should.be.true
+
+
+def test_get_codec():
+    ('get_codec() should accept codec classes and instances')
+
+    gzip = codec.Gzip(level=1)
+
+    codec.get_codec(gzip).should.be(gzip)
+    codec.get_codec(codec.Unicode).should.be.a(codec.Unicode)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+
+from mock import MagicMock
+from plural.concurrency import CommitFuture
+from plural.concurrency import GroupCommitter
+from plural.exceptions import CommitTimeout
+
+
+def test_commit_future():
+    ('CommitFuture.result() should return the commit id or raise the error of the commit')
+
+    future = CommitFuture()
+    future.done().should.be.false
+    future.result.when.called_with(0.01).should.throw(CommitTimeout)
+
+    future.set_result('commit-id')
+    future.done().should.be.true
+    future.result().should.equal('commit-id')
+
+    failed = CommitFuture()
+    failed.set_exception(ValueError('boom'))
+    failed.result.when.called_with().should.throw(ValueError, 'boom')
+
+
+def test_group_committer_commit_batch():
+    ('GroupCommitter.commit_batch() should make one commit combining the queries of all the callers')
+
+    commit = MagicMock(return_value='commit-id')
+    committer = GroupCommitter(commit, threading.RLock())
+    batch = [CommitFuture('CREATE A'), CommitFuture(), CommitFuture('CREATE B')]
+
+    committer.commit_batch(batch)
+
+    commit.assert_called_once_with('CREATE A\nCREATE B')
+    [future.result() for future in batch].should.equal(['commit-id'] * 3)
+
+
+def test_group_committer_commit_batch_error():
+    ('GroupCommitter.commit_batch() should propagate the error of the commit to all the callers')
+
+    commit = MagicMock(side_effect=RuntimeError('conflict'))
+    committer = GroupCommitter(commit, threading.RLock())
+    batch = [CommitFuture(), CommitFuture()]
+
+    committer.commit_batch(batch)
+
+    commit.assert_called_once_with(None)
+    for future in batch:
+        future.result.when.called_with().should.throw(RuntimeError, 'conflict')
+
+
+def test_group_committer_groups_requests():
+    ('GroupCommitter.submit() should group the requests made within the delay')
+
+    commit = MagicMock(return_value='commit-id')
+    committer = GroupCommitter(commit, threading.RLock(), delay=60, max_size=3)
+
+    futures = [committer.submit('query {}'.format(number)) for number in range(3)]
+
+    [future.result(5) for future in futures].should.equal(['commit-id'] * 3)
+    commit.assert_called_once_with('query 0\nquery 1\nquery 2')
+
+    future = committer.submit()
+    committer.stop()
+
+    future.result(0).should.equal('commit-id')
+    commit.call_count.should.equal(2)
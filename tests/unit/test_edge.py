@@ -16,9 +16,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import json
+import pickle
+from decimal import Decimal
+from plural import codec
 from plural.models.edges import Edge
 from plural.models.meta.edges import edge_has_index
 from plural.exceptions import InvalidEdgeDefinition
+from tests.edges import Car
 from tests.edges import Person
 
 
@@ -73,7 +77,7 @@ def test_edge_from_dict_get_attribute():
     foobar.should.have.property('name').being.equal('Foo Bar')
     foobar.should.have.property('birthdate').being.equal('1973/07/04')
     foobar.should.have.property('uuid').being.equal('woot')
-    hash(foobar).should.equal(-4530108406577435520)
+    hash(foobar).should.equal(hash(('Person', 'woot')))
     hasattr(foobar, '__invalid__').should.be.false
     hasattr(foobar, 'invalid').should.be.false
 
@@ -109,3 +113,85 @@ def test_define_invalid_edge_invalid_indexes():
             indexes = 'invalid'
 
     declare.when.called.should.have.raised(InvalidEdgeDefinition)
+
+
+def test_define_edge_with_codec_instances():
+    ('Edge definitions should accept configured codec instances')
+
+    body = codec.Gzip(level=9, threshold=16)
+
+    class Article(Edge):
+        indexes = {'title'}
+        fields = {
+            'title': codec.Unicode,
+            'body': body,
+        }
+
+    Article.__codecs__['body'].should.be(body)
+    Article.__codecs__['title'].should.be.a(codec.Unicode)
+
+    article = Article(title=u'Title', body='text ' * 10)
+    article.to_dict()['body'][:1].should.equal('\x01')
+    article.body.should.equal('text ' * 10)
+
+
+def test_edge_build_many():
+    ('Edge.build_many() should create the same edges as the constructor')
+
+    rows = [
+        {'uuid': 'uuid1', 'brand': 'Tesla', 'last_used': '2017-08-18T16:20:00', 'color': 'red'},
+        {'uuid': 'uuid2', 'max_speed': '160.4', 'last_used': '2017-08-18T16:20:00'},
+        {'brand': 'Ferrari'},
+    ]
+
+    cars = Car.build_many(rows)
+
+    cars[:2].should.equal([Car(**rows[0]), Car(**rows[1])])
+    cars[1].max_speed.should.equal(Decimal('160.4'))
+    cars[2].brand.should.equal('Ferrari')
+    cars[2].uuid.should.be.a(basestring)
+
+
+def test_edge_compact_layout():
+    ('Edge subclasses should keep the values of their declared fields in slots')
+
+    Car.__layout__.should.equal(('uuid', 'brand', 'last_used', 'max_speed', 'metadata', 'model'))
+    Car.__slots__.should.equal(())
+
+    car = Car(uuid='uuid1', brand='Tesla', max_speed='160.4', color='red')
+    car.__values__.should.have.length_of(6)
+    car.__extra__.should.equal({'color': 'red'})
+    car.max_speed.should.equal(Decimal('160.4'))
+    ('model' in car).should.be.false
+
+    car.max_speed = 200
+    car.to_dict().should.equal({
+        'uuid': 'uuid1',
+        'brand': 'Tesla',
+        'max_speed': '200',
+        'color': 'red',
+    })
+
+
+def test_edge_pickle():
+    ('Edge instances should survive pickling')
+
+    car = Car(uuid='uuid1', brand='Tesla', color='red')
+
+    pickle.loads(pickle.dumps(car)).should.equal(car)
+    pickle.loads(pickle.dumps(car, 2)).should.equal(car)
+
+
+def test_edge_equality():
+    ('Edge instances should be equal when they have the same type, uuid and data')
+
+    car = Car(uuid='uuid1', brand='Tesla', max_speed='160.4')
+
+    car.should.equal(Car(uuid='uuid1', brand='Tesla', max_speed='160.4'))
+    car.should.equal(Car(uuid='uuid1', brand='Tesla', max_speed=Decimal('160.4')))
+    car.should_not.equal(Car(uuid='uuid2', brand='Tesla', max_speed='160.4'))
+    car.should_not.equal(Car(uuid='uuid1', brand='Ferrari', max_speed='160.4'))
+    car.should_not.equal(Person(uuid='uuid1', brand='Tesla', max_speed='160.4'))
+    (car != Car(uuid='uuid1', brand='Tesla', max_speed='160.4')).should.be.false
+
+    {car, Car(uuid='uuid1', brand='Tesla', max_speed='160.4')}.should.have.length_of(1)
@@ -15,6 +15,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import warnings
 from mock import MagicMock
 from plural.models.edges import Edge
 from plural.models.edges import resolve_edge_name
@@ -85,3 +86,15 @@ def test_get_related_blob_paths():
         'Car/indexes/max_speed/4616f0d04cf8d19dbe59f14a8225487e40061ba8',
         'Car/indexes/model/4616f0d04cf8d19dbe59f14a8225487e40061ba8',
     ])
+
+
+def test_get_related_blob_paths_is_deprecated():
+    ('Edge.get_related_blob_paths() should warn that it is deprecated')
+
+    car = Car(uuid='deadbeef')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        car.get_related_blob_paths(MagicMock(name='repository'), blob_id='hash1')
+
+    caught.should.have.length_of(1)
+    caught[0].category.should.equal(DeprecationWarning)
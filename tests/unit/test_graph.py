@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from plural.graph import Hop
+from plural.graph import Neighbor
+from plural.graph import Relationship
+from plural.graph import AdjacencyIndex
+from plural.graph import parse_relationship_path
+from plural.graph import format_relationship_path
+
+
+def test_parse_relationship_path():
+    ('parse_relationship_path() should tell which edge the uuid of the path belongs to')
+
+    parse_relationship_path('Car/incoming/bought_by/Person/chuck-uuid').should.equal(
+        Relationship('Person', 'Car', 'bought_by', 'incoming', 'chuck-uuid'),
+    )
+    parse_relationship_path('Car/outgoing/sold_by/Person/car-uuid').should.equal(
+        Relationship('Car', 'Person', 'sold_by', 'outgoing', 'car-uuid'),
+    )
+    parse_relationship_path('Car/indexes/brand/hash1').should.be.none
+    parse_relationship_path('Car/_ids/car-uuid').should.be.none
+
+
+def test_format_relationship_path():
+    ('format_relationship_path() should build the paths parsed by parse_relationship_path()')
+
+    for path in ['Car/incoming/bought_by/Person/chuck-uuid', 'Car/outgoing/sold_by/Person/car-uuid']:
+        format_relationship_path(parse_relationship_path(path)).should.equal(path)
+
+
+def create_adjacency_index():
+    index = AdjacencyIndex(read_blob=lambda oid: oid)
+    index.add('Car/incoming/bought_by/Person/chuck-uuid', 'car-uuid')
+    index.add('Car/outgoing/sold_by/Person/car-uuid', 'elon-uuid')
+    index.add('Person/indirect/deal/Person/chuck-uuid', 'elon-uuid')
+    index.add('Person/indirect/deal/Person/elon-uuid', 'chuck-uuid')
+    index.add('Car/indexes/brand/hash1', 'tesla')
+    return index
+
+
+def test_adjacency_index_neighbors():
+    ('AdjacencyIndex.neighbors() should find the nodes on either end of the relationships')
+
+    index = create_adjacency_index()
+
+    index.should.have.length_of(3)
+    index.neighbors('car-uuid').should.equal([
+        Neighbor('chuck-uuid', 'Person', 'bought_by', 'incoming'),
+        Neighbor('elon-uuid', 'Person', 'sold_by', 'outgoing'),
+    ])
+    index.neighbors('elon-uuid').should.equal([
+        Neighbor('chuck-uuid', 'Person', 'deal', 'indirect'),
+        Neighbor('car-uuid', 'Car', 'sold_by', 'outgoing'),
+    ])
+    index.neighbors('chuck-uuid', direction='incoming').should.equal([
+        Neighbor('car-uuid', 'Car', 'bought_by', 'incoming'),
+    ])
+    index.neighbors('chuck-uuid', label='deal').should.equal([
+        Neighbor('elon-uuid', 'Person', 'deal', 'indirect'),
+    ])
+    index.neighbors('unknown-uuid').should.equal([])
+
+
+def test_adjacency_index_remove():
+    ('AdjacencyIndex.remove() should only unlink the relationship of the given path')
+
+    index = create_adjacency_index()
+    index.remove('Car/outgoing/sold_by/Person/car-uuid', 'elon-uuid')
+    index.remove('Car/indexes/brand/hash1', 'tesla')
+
+    index.neighbors('car-uuid').should.equal([
+        Neighbor('chuck-uuid', 'Person', 'bought_by', 'incoming'),
+    ])
+    index.neighbors('elon-uuid').should.equal([
+        Neighbor('chuck-uuid', 'Person', 'deal', 'indirect'),
+    ])
+
+
+def test_adjacency_index_get_relationships():
+    ('AdjacencyIndex.get_relationships() should list the paths of both ends of the relationships of a node')
+
+    index = create_adjacency_index()
+
+    [(format_relationship_path(relationship), uuid) for relationship, uuid in index.get_relationships('elon-uuid')].should.equal([
+        ('Person/indirect/deal/Person/elon-uuid', 'chuck-uuid'),
+        ('Person/indirect/deal/Person/chuck-uuid', 'elon-uuid'),
+        ('Car/outgoing/sold_by/Person/car-uuid', 'elon-uuid'),
+    ])
+    index.get_relationships('unknown-uuid').should.equal([])
+
+
+def create_chain_index(size):
+    index = AdjacencyIndex(read_blob=lambda oid: oid)
+    for position in range(size - 1):
+        index.add('Node/outgoing/next/Node/node{}'.format(position), 'node{}'.format(position + 1))
+
+    return index
+
+
+def test_adjacency_index_traverse():
+    ('AdjacencyIndex.traverse() should yield each reachable node once, in batches, up to max_depth')
+
+    index = create_adjacency_index()
+
+    list(index.traverse('car-uuid', max_depth=2)).should.equal([[
+        Hop('chuck-uuid', 'Person', 1, 'car-uuid', None),
+        Hop('elon-uuid', 'Person', 1, 'car-uuid', None),
+    ]])
+    list(index.traverse('car-uuid', pattern=[('bought_by', None), ('deal', 'indirect')])).should.equal([[
+        Hop('chuck-uuid', 'Person', 1, 'car-uuid', None),
+        Hop('elon-uuid', 'Person', 2, 'chuck-uuid', None),
+    ]])
+    list(index.traverse('unknown-uuid')).should.equal([])
+
+    batches = list(create_chain_index(10).traverse('node0', max_depth=20, batch_size=4))
+    [len(batch) for batch in batches].should.equal([4, 4, 1])
+    [hop.depth for hop in batches[-1]].should.equal([9])
+
+
+def test_adjacency_index_shortest_path():
+    ('AdjacencyIndex.shortest_path() should return the uuids of the path or None')
+
+    index = create_adjacency_index()
+    index.add('Car/incoming/bought_by/Person/elon-uuid', 'car-uuid')
+
+    index.shortest_path('chuck-uuid', 'elon-uuid').should.equal(['chuck-uuid', 'elon-uuid'])
+    index.shortest_path('chuck-uuid', 'elon-uuid', pattern=[('bought_by', None)]).should.equal(
+        ['chuck-uuid', 'car-uuid', 'elon-uuid'],
+    )
+    create_chain_index(10).shortest_path('node0', 'node9', max_depth=8).should.be.none
+    create_chain_index(10).shortest_path('node0', 'node9').should.be.none
+    create_chain_index(10).shortest_path('node9', 'node0', max_depth=9).should.have.length_of(10)
+    index.shortest_path('chuck-uuid', 'unknown-uuid').should.be.none
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from collections import namedtuple
+from mock import MagicMock
+from plural.index import PathIndex
+from plural.index import TreeIndex
+from plural.index import PathEntry
+from plural.index import ValueIndex
+
+
+def create_index():
+    return PathIndex([
+        ('Car/_ids/uuid1', 'hash1'),
+        ('Car/_ids/uuid2', 'hash2'),
+        ('Car/indexes/brand/hash1', 'tesla'),
+        ('Car/indexes/brand/hash2', 'ferrari'),
+        ('Car/objects/hash1', 'object1'),
+        ('Person/_ids/uuid3', 'hash3'),
+    ])
+
+
+def test_path_index_get():
+    ('PathIndex.get() should return the oid of exact paths only')
+
+    index = create_index()
+
+    index.should.have.length_of(6)
+    index.get('Car/_ids/uuid1').should.equal('hash1')
+    index.get('Car/_ids/uuid9').should.be.none
+    index.get('Car/_ids').should.be.none
+    index.get('Car/_ids/uuid1/nested').should.be.none
+    ('Car/indexes/brand/hash2' in index).should.be.true
+
+
+def test_path_index_iter_prefix():
+    ('PathIndex.iter_prefix() should only yield entries under the given tree')
+
+    index = create_index()
+
+    sorted(index.iter_prefix('Car/indexes')).should.equal([
+        PathEntry('Car/indexes/brand/hash1', 'tesla'),
+        PathEntry('Car/indexes/brand/hash2', 'ferrari'),
+    ])
+    list(index.iter_prefix('Boat')).should.equal([])
+
+
+def test_path_index_iter_order():
+    ('PathIndex should iterate in the sorted path order of the repository index')
+
+    index = PathIndex([
+        ('Car/objects/hash2', 'object2'),
+        ('Car.v2/objects/hash1', 'object3'),
+        ('Car/objects/hash1', 'object1'),
+        ('Boat/_ids/uuid1', 'hash4'),
+    ])
+
+    [entry.path for entry in index].should.equal([
+        'Boat/_ids/uuid1',
+        'Car.v2/objects/hash1',
+        'Car/objects/hash1',
+        'Car/objects/hash2',
+    ])
+    [entry.path for entry in index.glob('Car*/objects/*')].should.equal([
+        'Car.v2/objects/hash1',
+        'Car/objects/hash1',
+        'Car/objects/hash2',
+    ])
+
+
+def test_path_index_glob():
+    ('PathIndex.glob() should match like fnmatch')
+
+    index = create_index()
+
+    sorted(index.glob('Car/_ids/*')).should.equal([
+        PathEntry('Car/_ids/uuid1', 'hash1'),
+        PathEntry('Car/_ids/uuid2', 'hash2'),
+    ])
+    sorted(index.glob('*hash1*')).should.equal([
+        PathEntry('Car/indexes/brand/hash1', 'tesla'),
+        PathEntry('Car/objects/hash1', 'object1'),
+    ])
+    list(index.glob('Person/_ids/uuid3')).should.equal([
+        PathEntry('Person/_ids/uuid3', 'hash3'),
+    ])
+
+
+def test_path_index_remove():
+    ('PathIndex.remove() should delete the path and prune empty trees')
+
+    index = create_index()
+
+    index.remove('Person/_ids/uuid3').should.equal('hash3')
+    index.remove('Person/_ids/uuid3').should.be.none
+
+    index.should.have.length_of(5)
+    index.subtree('Person').should.be.none
+    index.subtree('Car').should.have.key('_ids')
+
+
+def test_path_index_sorted_items_cache():
+    ('PathIndex should only sort the children of the trees changed since the last iteration')
+
+    index = create_index()
+    list(index)
+
+    ids = index.subtree('Car/_ids')
+    objects = index.subtree('Car/objects')
+    ids.order.should.equal([('uuid1', 'hash1'), ('uuid2', 'hash2')])
+    objects.order.should.equal([('hash1', 'object1')])
+
+    index.add('Car/_ids/uuid0', 'hash0')
+    ids.order.should.be.none
+    objects.order.should.equal([('hash1', 'object1')])
+
+    [entry.path for entry in index.iter_prefix('Car/_ids')].should.equal([
+        'Car/_ids/uuid0',
+        'Car/_ids/uuid1',
+        'Car/_ids/uuid2',
+    ])
+
+    index.remove('Car/_ids/uuid1')
+    [entry.path for entry in index.iter_prefix('Car/_ids')].should.equal([
+        'Car/_ids/uuid0',
+        'Car/_ids/uuid2',
+    ])
+
+
+TreeEntry = namedtuple('TreeEntry', ['name', 'id', 'type'])
+
+
+class TreeStub(list):
+    def __init__(self, repository, entries):
+        super(TreeStub, self).__init__(entries)
+        self.repository = repository
+
+    def __getitem__(self, path):
+        name, _, rest = path.partition('/')
+        for entry in self:
+            if entry.name == name:
+                if not rest:
+                    return entry
+                if entry.type == 'tree':
+                    return self.repository[entry.id][rest]
+
+        raise KeyError(path)
+
+
+def create_tree_index():
+    repository = {}
+    repository['ids'] = TreeStub(repository, [
+        TreeEntry('uuid1', 'hash1', 'blob'),
+        TreeEntry('uuid2', 'hash2', 'blob'),
+    ])
+    repository['car'] = TreeStub(repository, [
+        TreeEntry('_ids', 'ids', 'tree'),
+        TreeEntry('objects', 'objects', 'tree'),
+    ])
+    repository['objects'] = TreeStub(repository, [
+        TreeEntry('hash1', 'object1', 'blob'),
+    ])
+    root = TreeStub(repository, [TreeEntry('Car', 'car', 'tree')])
+    return TreeIndex(repository, root)
+
+
+def test_tree_index():
+    ('TreeIndex should resolve paths and prefixes of a git tree')
+
+    index = create_tree_index()
+
+    index.get('Car/_ids/uuid1').should.equal('hash1')
+    index.get('Car/_ids/uuid9').should.be.none
+    index.get('Car/_ids').should.be.none
+    index.subtree('Car').should.equal({'_ids': {}, 'objects': {}})
+    index.subtree('Car/_ids').should.equal({'uuid1': 'hash1', 'uuid2': 'hash2'})
+    index.subtree('Boat').should.be.none
+    index.root.keys().should.equal(['Car'])
+    sorted(index.glob('Car/*/hash1')).should.equal([
+        PathEntry('Car/objects/hash1', 'object1'),
+    ])
+    index.should.have.length_of(3)
+    index.add.when.called_with('Car/_ids/uuid3', 'hash3').should.throw(TypeError)
+    [entry.path for entry in index].should.equal(['Car/_ids/uuid1', 'Car/_ids/uuid2', 'Car/objects/hash1'])
+
+
+def test_tree_index_caches_trees():
+    ('TreeIndex should resolve paths of the trees already read from its cache')
+
+    index = create_tree_index()
+    index.subtree('Car/_ids')
+    index.tree = None
+
+    index.get('Car/_ids/uuid2').should.equal('hash2')
+    TreeIndex(index.repository, None).get('Car/_ids/uuid2').should.be.none
+
+
+def test_value_index_equals():
+    ('ValueIndex.equals() should group object hashes by the blob id of their value')
+
+    index = create_index()
+    index.add('Car/indexes/brand/hash3', 'tesla')
+    values = ValueIndex(index, read_blob=None)
+
+    values.equals('Car', 'brand', 'tesla').should.equal({'hash1', 'hash3'})
+    values.equals('Car', 'brand', 'volvo').should.equal(set())
+
+    values.add('Car/indexes/brand/hash4', 'volvo')
+    values.remove('Car/indexes/brand/hash1', 'tesla')
+
+    values.equals('Car', 'brand', 'tesla').should.equal({'hash3'})
+    values.equals('Car', 'brand', 'volvo').should.equal({'hash4'})
+
+
+def test_value_index_startswith():
+    ('ValueIndex.startswith() should read each distinct value only once')
+
+    blobs = {
+        'tesla': 'Tesla',
+        'ferrari': 'Ferrari',
+        'fiat': 'Fiat',
+    }
+    read_blob = MagicMock(side_effect=blobs.__getitem__)
+    values = ValueIndex(create_index(), read_blob)
+
+    values.startswith('Car', 'brand', 'F').should.equal({'hash2'})
+    values.add('Car/indexes/brand/hash3', 'fiat')
+    values.add('Car/indexes/brand/hash4', 'fiat')
+    values.startswith('Car', 'brand', 'F').should.equal({'hash2', 'hash3', 'hash4'})
+    values.startswith('Car', 'brand', 'Fi').should.equal({'hash3', 'hash4'})
+
+    read_blob.call_count.should.equal(3)
+
+
+def test_value_index_match():
+    ('ValueIndex.match() should call the callback once per distinct value')
+
+    values = ValueIndex(create_index(), read_blob=lambda oid: oid.upper())
+    callback = MagicMock(side_effect=lambda value: value == 'TESLA')
+
+    values.match('Car', 'brand', callback).should.equal({'hash1'})
+    callback.call_count.should.equal(2)
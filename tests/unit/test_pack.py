@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import struct
+import shutil
+import tempfile
+import pygit2
+from mock import patch, MagicMock
+from plural.pack import PackWriter
+from plural.pack import encode_object_header
+
+
+def test_encode_object_header():
+    ('encode_object_header() should encode the type and a variable-length size')
+
+    encode_object_header(3, 5).should.equal(b'\x35')
+    encode_object_header(3, 16).should.equal(b'\xb0\x01')
+    encode_object_header(3, 300).should.equal(b'\xbc\x12')
+
+
+def test_pack_writer_add_blob():
+    ('PackWriter.add_blob() should buffer blobs by their git blob id')
+
+    pack = PackWriter()
+
+    oid = pack.add_blob('Tesla')
+    pack.add_blob(u'Tesla')
+
+    oid.should.equal(pygit2.hash('Tesla'))
+    pack.should.have.length_of(1)
+    pack.get(oid).should.equal('Tesla')
+    (oid in pack).should.be.true
+
+
+def test_pack_writer_build_index():
+    ('PackWriter.build_index() should sort the object ids and fill the fanout table')
+
+    pack = PackWriter()
+    entries = [
+        (b'\x02' * 20, 1, 12),
+        (b'\x01' * 20, 2, 40),
+    ]
+
+    index = pack.build_index(entries, b'P' * 20)
+
+    index[:8].should.equal(b'\377tOc\x00\x00\x00\x02')
+    fanout = struct.unpack('>256I', index[8:8 + 1024])
+    fanout[0].should.equal(0)
+    fanout[1].should.equal(1)
+    fanout[255].should.equal(2)
+    index[1032:1072].should.equal(b'\x01' * 20 + b'\x02' * 20)
+    struct.unpack('>2I', index[1072:1080]).should.equal((2, 1))
+    struct.unpack('>2I', index[1080:1088]).should.equal((40, 12))
+    index[1088:1108].should.equal(b'P' * 20)
+    len(index).should.equal(1128)
+
+
+@patch('plural.pack.os.rename', wraps=os.rename)
+def test_pack_writer_write_order(rename):
+    ('PackWriter.write() should move the pack into place before writing its index')
+
+    repository = MagicMock(name='repository', path=tempfile.mkdtemp())
+    try:
+        pack = PackWriter()
+        pack.add_blob('Tesla')
+        filename = pack.write(repository)
+
+        [os.path.splitext(target)[1] for source, target in [c[0] for c in rename.call_args_list]].should.equal(['.pack', '.idx'])
+        rename.call_args_list[0][0][1].should.equal(filename)
+        sorted(os.listdir(os.path.dirname(filename))).should.equal([
+            os.path.basename(filename)[:-5] + '.idx',
+            os.path.basename(filename),
+        ])
+        pack.should.have.length_of(0)
+    finally:
+        shutil.rmtree(repository.path)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from mock import MagicMock
+from plural import parallel
+from plural.parallel import iter_tree_prefix
+from plural.parallel import scan_partition
+from plural.parallel import match_partition
+from plural.query import predicate
+from plural.serializer import JSONSerializer
+
+
+class EntryStub(object):
+
+    def __init__(self, name, id=None, type='blob'):
+        self.name = name
+        self.id = id or name
+        self.type = type
+
+
+def create_repository(tree_path, entries, blobs):
+    tree = [EntryStub(name, oid) for name, oid in entries]
+    root = {tree_path: EntryStub(tree_path, 'tree-id', 'tree')}
+    objects = {'root-id': root, 'tree-id': tree}
+    objects.update(dict([(oid, MagicMock(data=data)) for oid, data in blobs.items()]))
+
+    repository = MagicMock(name='repository')
+    repository.__getitem__.side_effect = objects.__getitem__
+    return repository
+
+
+def test_iter_tree_prefix():
+    ('iter_tree_prefix() should only yield the sorted entries that start with the prefix')
+
+    tree = [EntryStub(name) for name in ['0a', '1b', '1c', '2d']]
+
+    [entry.name for entry in iter_tree_prefix(tree, '1')].should.equal(['1b', '1c'])
+    [entry.name for entry in iter_tree_prefix(tree, '3')].should.equal([])
+    [entry.name for entry in iter_tree_prefix(tree, '')].should.have.length_of(4)
+
+
+def test_scan_partition():
+    ('scan_partition() should deserialize the objects of its partition only')
+
+    parallel.worker['repository'] = create_repository('Car/objects', [
+        ('0a', '0a'),
+        ('1b', '1b'),
+    ], {
+        '0a': '{"uuid": "uuid1"}',
+        '1b': '{"uuid": "uuid2"}',
+    })
+
+    scan_partition(('root-id', 'Car', '1', JSONSerializer())).should.equal(
+        ('Car', [{'uuid': 'uuid2'}]))
+    scan_partition(('root-id', 'Boat', '1', JSONSerializer())).should.equal(
+        ('Boat', []))
+
+
+def test_match_partition():
+    ('match_partition() should match each distinct value once and deserialize the matching objects')
+
+    parallel.worker['repository'] = create_repository('Car/indexes/brand', [
+        ('1a', 'blob-tesla'),
+        ('1b', 'blob-ferrari'),
+        ('1c', 'blob-tesla'),
+    ], {
+        'blob-tesla': 'Tesla',
+        'blob-ferrari': 'Ferrari',
+        '1a': '{"uuid": "uuid1"}',
+        '1c': '{"uuid": "uuid3"}',
+    })
+    match_callback = MagicMock(side_effect=predicate('brand').matches('Tesla'))
+
+    match_partition(('root-id', 'Car', 'brand', '1', match_callback, JSONSerializer())).should.equal(
+        ('Car', [('1a', {'uuid': 'uuid1'}), ('1c', {'uuid': 'uuid3'})]))
+    match_callback.call_count.should.equal(2)
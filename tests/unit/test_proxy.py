@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from decimal import Decimal
+
+from mock import MagicMock
+from plural.models.proxy import LazyElement
+from plural.models.proxy import LazyProjection
+from tests.edges import Car
+
+
+def test_lazy_element():
+    ('LazyElement should only read its data once, on the first attribute access')
+
+    read_data = MagicMock(return_value={'uuid': 'uuid1', 'brand': 'Tesla'})
+    car = LazyElement(Car, read_data)
+
+    read_data.called.should.be.false
+    isinstance(car, Car).should.be.true
+
+    car.brand.should.equal('Tesla')
+    car.uuid.should.equal('uuid1')
+    car.should.equal(Car(uuid='uuid1', brand='Tesla'))
+    hash(car).should.equal(hash(Car(uuid='uuid1', brand='Tesla')))
+    read_data.assert_called_once_with()
+
+
+def test_lazy_projection():
+    ('LazyProjection should read and decode each projected field on its first access')
+
+    values = {'uuid': 'uuid1', 'max_speed': '160.4'}
+    read_field = MagicMock(side_effect=values.get)
+    car = LazyProjection(Car, ['uuid', 'max_speed', 'brand'], read_field)
+
+    isinstance(car, Car).should.be.true
+    car.max_speed.should.equal(Decimal('160.4'))
+    car.max_speed.should.equal(Decimal('160.4'))
+    read_field.assert_called_once_with('max_speed')
+
+    car.brand.should.be.none
+    car.to_dict().should.equal({'uuid': 'uuid1', 'max_speed': '160.4'})
+    car.__getattr__.when.called_with('model').should.throw(AttributeError)
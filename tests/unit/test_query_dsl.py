@@ -99,3 +99,26 @@ def test_query_matches_string_generates_lambda_filter_with_a_list_of_values():
     result.should.equal([
         "Foo Bar",
     ])
+
+
+def test_query_startswith_generates_filter_with_a_list_of_values():
+    ('predicate("field").startswith("string") with a list of values')
+
+    query = predicate('name').startswith('Foo')
+    result = list(filter(query, LIST_OF_VALUES))
+
+    result.should.equal([
+        "Foo Bar",
+    ])
+
+
+def test_query_exposes_kind_and_value():
+    ('predicate() queries should expose the kind and value of the comparison')
+
+    query = predicate('name').matches('Foo Bar')
+    query.kind.should.equal('equals')
+    query.value.should.equal('Foo Bar')
+
+    query = predicate('name').startswith('Foo')
+    query.kind.should.equal('prefix')
+    query.value.should.equal('Foo')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# <Plural - Git-powered graph database library>
+# Copyright (C) <2017>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import pickle
+from datetime import datetime
+
+from mock import patch
+
+from plural.util import AutoCodec
+from plural.exceptions import SerializerNotAvailable
+from plural.serializer import canonical
+from plural.serializer import get_serializer
+from plural.serializer import JSONSerializer
+from plural.serializer import MsgPackSerializer
+
+
+def test_canonical():
+    ('canonical() should sort the keys of nested dicts and encode non-native values')
+
+    data = canonical({'b': 1, 'a': {'d': [datetime(2017, 1, 1)], 'c': None}})
+
+    data.keys().should.equal(['a', 'b'])
+    data['a'].keys().should.equal(['c', 'd'])
+    data['a']['d'].should.equal(['2017-01-01T00:00:00'])
+
+
+def test_json_serializer_is_compatible():
+    ('JSONSerializer.dumps() should produce the same bytes as json.dumps(sort_keys=True)')
+
+    serializer = JSONSerializer()
+    data = {'uuid': 'abc', 'name': u'Tesla', 'at': datetime(2017, 1, 1), 'nested': {'z': 1, 'y': 2.5}}
+
+    serializer.dumps(data).should.equal(json.dumps(data, sort_keys=True, default=AutoCodec().encode))
+    serializer.loads(serializer.dumps({'a': 1})).should.equal({'a': 1})
+
+
+def test_get_serializer():
+    ('get_serializer() should accept names and instances and reject unknown names')
+
+    serializer = JSONSerializer()
+
+    get_serializer(serializer).should.be(serializer)
+    get_serializer('json').should.be.a(JSONSerializer)
+    get_serializer.when.called_with('yaml').should.throw(SerializerNotAvailable)
+
+
+def test_serializers_are_picklable():
+    ('serializers should be picklable so they can be sent to worker processes')
+
+    pickle.loads(pickle.dumps(JSONSerializer())).should.be.a(JSONSerializer)
+
+
+@patch('plural.serializer.msgpack', None)
+def test_msgpack_serializer_not_available():
+    ('MsgPackSerializer() should raise SerializerNotAvailable without msgpack')
+
+    MsgPackSerializer.when.called_with().should.throw(SerializerNotAvailable)
+
+
+@patch('plural.serializer.msgpack')
+def test_msgpack_serializer_reads_json(msgpack):
+    ('MsgPackSerializer.loads() should still read blobs written as JSON')
+
+    serializer = MsgPackSerializer()
+
+    serializer.loads('{"a": 1}').should.equal({'a': 1})
+    msgpack.unpackb.called.should.be.false
+
+    serializer.loads('\x81\xa1a\x01').should.equal(msgpack.unpackb.return_value)
+    msgpack.unpackb.assert_called_once_with('\x81\xa1a\x01', raw=False)
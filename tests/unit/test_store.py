@@ -15,9 +15,12 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from pygit2 import GIT_FILEMODE_BLOB
+import pygit2
 from mock import patch, call, MagicMock, ANY
 
+from plural.index import PathIndex
+from plural.index import PathEntry
+from plural.query import predicate
 from plural.store import PluralStore
 from tests.edges import Car
 from tests.edges import Person
@@ -134,19 +137,221 @@ def test_get_versions(context, serialize_commit, pygit2):
     ])
 
 
-@with_graph_store('/path/to/folder')
-@patch('plural.store.IndexEntry')
-def test_add_spo(context, IndexEntry):
-    ('PluralStore.add_spo() should add an IndexEntry to the repo')
+@with_graph_store('/path/to/folder', pack_threshold=None)
+def test_add_spo(context):
+    ('PluralStore.add_spo() should stage the path of the blob')
 
     context.store.repository.create_blob.return_value = 'blob-id'
-    IndexEntry.return_value = 'index-entry'
 
     context.store.add_spo('edge', 'predicate', 'object')
     context.store.repository.create_blob.assert_called_once_with('object')
-    context.store.repository.index.add.assert_called_once_with('index-entry')
-    IndexEntry.assert_called_once_with(
-        'edge/predicate', 'blob-id', GIT_FILEMODE_BLOB)
+    context.store.repository.index.add.called.should.be.false
+    context.store.staged.should.equal({'edge/predicate': 'blob-id'})
+
+
+@with_graph_store('/path/to/folder')
+def test_add_spo_buffered(context):
+    ('PluralStore.add_spo() should buffer the blob until the commit')
+
+    blob_id = context.store.add_spo('edge', 'predicate', 'object')
+
+    blob_id.should.equal(pygit2.hash('object'))
+    context.store.repository.create_blob.called.should.be.false
+    context.store.read_blob(blob_id).should.equal('object')
+    context.store.read_blob(blob_id.hex).should.equal('object')
+
+    context.store.write_objects()
+
+    context.store.repository.create_blob.assert_called_once_with('object')
+    context.store.pack.should.have.length_of(0)
+
+
+@with_graph_store('/path/to/folder', pack_threshold=None)
+def test_staged_paths_are_readable(context):
+    ('PluralStore.stage() should make staged paths visible to reads before the commit')
+
+    context.store.repository.index = []
+    context.store.stage('Car/_ids/uuid1', 'hash1')
+
+    context.store.lookup('Car/_ids/uuid1').should.equal(PathEntry('Car/_ids/uuid1', 'hash1'))
+
+    context.store.remove_path('Car/_ids/uuid1')
+
+    context.store.lookup('Car/_ids/uuid1').should.be.none
+    context.store.staged.should.equal({'Car/_ids/uuid1': None})
+
+
+@with_graph_store('/path/to/folder', pack_threshold=None)
+@patch('plural.store.write_tree')
+def test_write_index(context, write_tree):
+    ('PluralStore.write_index() should apply all the staged paths to the index in a single batch')
+
+    index = context.store.repository.index
+    index.__len__.return_value = 2
+    index.write_tree.return_value = 'base-tree-id'
+    write_tree.side_effect = lambda repository, changes, tree, trees: dict(changes)
+
+    context.store.stage('edge/predicate1', 'blob1')
+    context.store.stage('edge/predicate2', 'blob2')
+
+    context.store.write_index().should.equal({
+        'edge/predicate1': 'blob1',
+        'edge/predicate2': 'blob2',
+    })
+
+    write_tree.assert_called_once_with(
+        context.store.repository, ANY,
+        context.store.repository.__getitem__.return_value, None)
+    context.store.repository.__getitem__.assert_called_once_with('base-tree-id')
+    index.read_tree.assert_called_once_with(ANY)
+    index.add.called.should.be.false
+    context.store.staged.should.be.empty
+
+
+@with_graph_store('/path/to/folder', pack_threshold=None)
+def test_add_spo_caches_blob_ids(context):
+    ('PluralStore.add_spo() should not write the same value twice')
+
+    context.store.repository.create_blob.return_value = 'blob-id'
+
+    context.store.add_spo('Person/indexes/country', 'hash1', 'BR').should.equal('blob-id')
+    context.store.add_spo('Person/indexes/country', 'hash2', 'BR').should.equal('blob-id')
+
+    context.store.repository.create_blob.assert_called_once_with('BR')
+    context.store.blob_id_cache.hits.should.equal(1)
+    context.store.blob_id_cache.misses.should.equal(1)
+
+
+@with_graph_store('/path/to/folder', pack_threshold=None)
+def test_add_spo_does_not_cache_unique_blobs(context):
+    ('PluralStore.add_spo() should only cache the blob ids of the field values')
+
+    context.store.add_spo('Person/_ids', 'uuid1', 'hash1')
+    context.store.add_spo('Person/_uuids', 'hash1', 'uuid1')
+    context.store.add_spo('Person/objects', 'hash1', '{}')
+    context.store.add_spo('Person/indexes/uuid', 'hash1', 'uuid1')
+
+    context.store.repository.create_blob.assert_has_calls([
+        call('hash1'),
+        call('uuid1'),
+        call('{}'),
+        call('uuid1'),
+    ])
+    context.store.blob_id_cache.should.have.length_of(0)
+    context.store.blob_id_cache.misses.should.equal(0)
+
+
+@with_graph_store('/path/to/folder', pack_threshold=1)
+@patch('plural.store.PackWriter.write')
+def test_write_objects_packed(context, write_pack):
+    ('PluralStore.write_objects() should write a packfile when the transaction reaches the pack_threshold')
+
+    context.store.add_spo('edge', 'predicate', 'object')
+    context.store.write_objects()
+
+    write_pack.assert_called_once_with(context.store.repository)
+    context.store.repository.create_blob.called.should.be.false
+
+
+@with_graph_store('/path/to/folder')
+@patch('plural.store.checkout_changes')
+def test_commit_checkout_changed(context, checkout_changes):
+    ('PluralStore.commit() should only check out the files changed by the commit by default')
+
+    repository = context.store.repository
+    repository.create_commit.return_value = 'commit-id'
+    repository.index.write_tree.return_value = 'tree-id'
+
+    context.store.commit('message').should.equal('commit-id')
+
+    repository.head.set_target.assert_called_once_with('commit-id')
+    repository.reset.called.should.be.false
+    checkout_changes.assert_called_once_with(
+        repository,
+        repository.__getitem__.return_value.tree,
+        repository.__getitem__.return_value,
+    )
+
+
+@with_graph_store('/path/to/folder', checkout='hard')
+def test_commit_checkout_hard(context):
+    ('PluralStore.commit() should reset the whole working directory when checkout is "hard"')
+
+    repository = context.store.repository
+    repository.create_commit.return_value = 'commit-id'
+
+    context.store.commit('message')
+
+    repository.reset.assert_called_once_with('commit-id', ANY)
+
+
+@with_graph_store('/path/to/folder', checkout=None)
+@patch('plural.store.checkout_changes')
+def test_commit_without_checkout(context, checkout_changes):
+    ('PluralStore.commit() should only update the branch when checkout is None')
+
+    repository = context.store.repository
+    repository.create_commit.return_value = 'commit-id'
+
+    context.store.commit('message')
+
+    repository.head.set_target.assert_called_once_with('commit-id')
+    repository.reset.called.should.be.false
+    checkout_changes.called.should.be.false
+
+
+@with_graph_store('/path/to/folder')
+@patch('plural.store.PluralStore.commit_group')
+def test_commit_async_without_group_commit(context, commit_group):
+    ('PluralStore.commit_async() should commit right away when group commit is disabled')
+
+    commit_group.return_value = 'commit-id'
+
+    future = context.store.commit_async('message')
+
+    future.done().should.be.true
+    future.result().should.equal('commit-id')
+    commit_group.assert_called_once_with('message')
+
+
+@with_graph_store('/path/to/folder', group_commit_delay=60)
+@patch('plural.store.PluralStore.commit_tree')
+@patch('plural.store.PluralStore.write_index')
+def test_commit_group(context, write_index, commit_tree):
+    ('PluralStore.commit_group() should reuse the current commit when the tree is the one of HEAD')
+
+    repository = context.store.repository
+    repository.head_is_unborn = False
+    repository.head.target = 'commit-id'
+    repository.__getitem__.return_value.tree_id = 'tree-id'
+    write_index.return_value = 'tree-id'
+    commit_tree.return_value = 'new-commit-id'
+
+    context.store.queries.append('UPDATE EDGE node')
+    context.store.commit_group('message').should.equal('commit-id')
+    commit_tree.called.should.be.false
+    context.store.queries.should.equal([])
+    repository.__getitem__.assert_called_once_with('commit-id')
+
+    write_index.return_value = 'new-tree-id'
+    context.store.queries.append('DELETE node')
+    context.store.commit_group().should.equal('new-commit-id')
+    commit_tree.assert_called_once_with('new-tree-id', None)
+
+
+@with_graph_store('/path/to/folder', group_commit_delay=60)
+@patch('plural.store.PluralStore.commit_tree')
+@patch('plural.store.PluralStore.write_index')
+def test_commit_group_with_query(context, write_index, commit_tree):
+    ('PluralStore.commit_group() should keep the queries of the other callers along with the given messages')
+
+    context.store.repository.head_is_unborn = True
+    write_index.return_value = 'tree-id'
+
+    context.store.queries.extend(['DELETE node', 'CREATE EDGE node'])
+    context.store.commit_group('message1\nmessage2')
+
+    commit_tree.assert_called_once_with('tree-id', 'CREATE EDGE node\nDELETE node\nmessage1\nmessage2')
 
 
 @with_graph_store('/path/to/folder')
@@ -307,3 +512,174 @@ def test_create_vertex_indirect(context, add_spo, git_object_hash):
         call('Person/indirect/dealed_with/Person', 'chuck-uuid', 'elon-uuid'),
         call('Person/indirect/dealed_with/Person', 'elon-uuid', 'chuck-uuid'),
     ])
+
+
+@with_graph_store('/path/to/folder')
+def test_lookup(context):
+    ('PluralStore.lookup() should resolve exact paths with a keyed read')
+
+    context.store._path_index = PathIndex([
+        ('Car/_ids/uuid1', 'hash1'),
+    ])
+    treeish = {'Car/_ids/uuid2': MagicMock(id='hash2')}
+
+    context.store.lookup('Car/_ids/uuid1').should.equal(
+        ('Car/_ids/uuid1', 'hash1'))
+    context.store.lookup('Car/_ids/uuid2').should.be.none
+    context.store.lookup('Car/_ids/uuid2', treeish).should.equal(
+        ('Car/_ids/uuid2', 'hash2'))
+    context.store.lookup('Car/_ids/uuid1', treeish).should.be.none
+
+
+@with_graph_store('/path/to/folder')
+def test_scan_all_fields(context):
+    ('PluralStore.scan_all() should read projected fields from their index blobs only')
+
+    context.store._path_index = PathIndex([
+        ('Car/objects/hash1', 'hash1'),
+        ('Car/indexes/brand/hash1', 'blob-Tesla'),
+        ('Car/indexes/uuid/hash1', 'blob-uuid1'),
+    ])
+    blobs = {
+        'blob-Tesla': MagicMock(data='Tesla'),
+        'blob-uuid1': MagicMock(data='uuid1'),
+    }
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+
+    cars = list(context.store.scan_all(Car, fields=['brand']))
+
+    cars.should.equal([Car(uuid='uuid1', brand='Tesla')])
+
+
+@with_graph_store('/path/to/folder')
+@patch('plural.models.element.Element.build_many')
+def test_scan_all_batches(context, build_many):
+    ('PluralStore.scan_all() should build the edges of each type in batches')
+
+    context.store._path_index = PathIndex([
+        ('Car/objects/hash1', 'hash1'),
+        ('Car/objects/hash2', 'hash2'),
+        ('Car/objects/hash3', 'hash3'),
+        ('Person/objects/hash4', 'hash4'),
+    ])
+    blobs = dict([
+        ('hash{}'.format(number), MagicMock(data='{{"uuid": "uuid{}"}}'.format(number)))
+        for number in range(1, 5)
+    ])
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+    build_many.side_effect = lambda rows: [row['uuid'] for row in rows]
+
+    sorted(context.store.scan_all(batch_size=2)).should.equal(['uuid1', 'uuid2', 'uuid3', 'uuid4'])
+
+    sorted([len(rows) for (rows, ), kw in build_many.call_args_list]).should.equal([1, 1, 2])
+
+
+@with_graph_store('/path/to/folder')
+def test_scan_all_lazy(context):
+    ('PluralStore.scan_all() should only read lazy edges on their first access')
+
+    context.store._path_index = PathIndex([
+        ('Car/objects/hash1', 'hash1'),
+    ])
+    blobs = {
+        'hash1': MagicMock(data='{"uuid": "uuid1", "brand": "Tesla"}'),
+    }
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+
+    cars = list(context.store.scan_all(Car, lazy=True))
+
+    context.store.repository.__getitem__.called.should.be.false
+    cars[0].brand.should.equal('Tesla')
+    cars.should.equal([Car(uuid='uuid1', brand='Tesla')])
+    context.store.repository.__getitem__.assert_called_once_with('hash1')
+
+
+@with_graph_store('/path/to/folder')
+def test_read_object_cached(context):
+    ('PluralStore.read_object() should only deserialize each blob once')
+
+    blobs = {
+        'hash1': MagicMock(data='{"uuid": "uuid1", "brand": "Tesla"}'),
+    }
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+
+    context.store.read_object('hash1').should.equal({'uuid': 'uuid1', 'brand': 'Tesla'})
+    context.store.read_object('hash1').should.equal({'uuid': 'uuid1', 'brand': 'Tesla'})
+
+    context.store.repository.__getitem__.assert_called_once_with('hash1')
+    context.store.object_cache.hits.should.equal(1)
+    context.store.object_cache.size.should.equal(len(blobs['hash1'].data))
+
+
+@with_graph_store('/path/to/folder')
+def test_get_edges_by_uuids(context):
+    ('PluralStore.get_edges_by_uuids() should resolve many uuids in a single pass')
+
+    context.store._path_index = PathIndex([
+        ('Car/_ids/uuid1', 'id-blob1'),
+        ('Car/_ids/uuid2', 'id-blob2'),
+    ])
+    blobs = {
+        'id-blob1': MagicMock(data='hash1'),
+        'id-blob2': MagicMock(data='hash2'),
+        'hash1': MagicMock(data='{"uuid": "uuid1", "brand": "Tesla"}'),
+        'hash2': MagicMock(data='{"uuid": "uuid2", "brand": "Ferrari"}'),
+    }
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+
+    cars = context.store.get_edges_by_uuids(Car, ['uuid2', 'unknown', 'uuid1'])
+
+    cars.should.equal([
+        Car(uuid='uuid2', brand='Ferrari'),
+        Car(uuid='uuid1', brand='Tesla'),
+    ])
+
+
+@with_graph_store('/path/to/folder')
+@patch('plural.store.pygit2.hash')
+def test_match_edges_by_index_equality(context, git_object_hash):
+    ('PluralStore.match_edges_by_index() should resolve equality queries without reading values')
+
+    git_object_hash.side_effect = lambda value: 'blob-{}'.format(value)
+    context.store._path_index = PathIndex([
+        ('Car/indexes/brand/hash1', 'blob-Tesla'),
+        ('Car/indexes/brand/hash2', 'blob-Ferrari'),
+        ('Car/indexes/model/hash1', 'blob-Model S'),
+    ])
+    blobs = {
+        'hash1': MagicMock(data='{"uuid": "uuid1", "brand": "Tesla"}'),
+    }
+    context.store.repository.__getitem__.side_effect = blobs.__getitem__
+
+    cars = list(context.store.match_edges_by_index(Car, 'brand', predicate('brand').matches('Tesla')))
+
+    cars.should.equal([
+        Car(uuid='uuid1', brand='Tesla'),
+    ])
+    git_object_hash.assert_called_once_with('Tesla')
+
+
+@with_graph_store('/path/to/folder')
+def test_delete_vertex(context):
+    ('PluralStore.delete() should remove the paths of a vertex and of its relationship')
+
+    context.store._path_index = PathIndex()
+    tesla = context.store.create_edge(Car, uuid='car-uuid', brand='Tesla')
+    chuck = context.store.create_edge(Person, uuid='chuck-uuid', name='Chuck Norris')
+    purchase = context.store.create_vertex(CarPurchase, uuid='purchase-uuid', origin=chuck, target=tesla)
+    sale = context.store.create_vertex(CarSale, uuid='sale-uuid', origin=chuck, target=tesla)
+
+    context.store.delete(purchase).should.equal((purchase, ))
+
+    removed = sorted(path for path, oid in context.store.staged.items() if oid is None)
+    removed.should.have.length_of(4)
+    removed[0].should.equal('Car/incoming/bought_by/Person/chuck-uuid')
+    removed[1].should.match(r'^CarPurchase/_ids/purchase-uuid$')
+    removed[2].should.match(r'^CarPurchase/_uuids/\w{40}$')
+    removed[3].should.match(r'^CarPurchase/indexes/uuid/\w{40}$')
+    [entry.path for entry in context.store.path_index.iter_prefix('CarPurchase')].should.equal([])
+    context.store.neighbors(tesla, label='bought_by').should.equal([])
+    context.store.neighbors(tesla, label='sold_by').should.have.length_of(1)
+    context.store.get_edge_by_uuid(Car, 'car-uuid').should.equal(tesla)
+    context.store.get_edge_by_uuid(Person, 'chuck-uuid').should.equal(chuck)
+    context.store.get_related_paths('CarSale', sale.uuid).should.have.length_of(3)
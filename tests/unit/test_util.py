@@ -16,7 +16,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from datetime import datetime
+from mock import Mock
 from mock import patch
+from plural.util import diff_trees
 from plural.util import generate_uuid
 from plural.util import serialize_commit
 
@@ -56,3 +58,16 @@ def test_serialize_commit():
         },
         'date': datetime(2017, 8, 14, 4, 48, 31, 704968),
         'message': 'testing serialize commit'})
+
+
+def test_diff_trees():
+    ('diff_trees() should diff against the empty tree when there is no old tree')
+
+    old_tree = Mock(name='old_tree')
+    new_tree = Mock(name='new_tree')
+
+    diff_trees(old_tree, new_tree).should.equal(old_tree.diff_to_tree.return_value)
+    old_tree.diff_to_tree.assert_called_once_with(new_tree)
+
+    diff_trees(None, new_tree).should.equal(new_tree.diff_to_tree.return_value)
+    new_tree.diff_to_tree.assert_called_once_with(swap=True)